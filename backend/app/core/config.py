@@ -35,6 +35,39 @@ class Settings(BaseSettings):
         "http://localhost:5173"
     ]
     
+    # Captura
+    PACKET_STORE_CAPACITY: int = 2_000_000  # Filas del ring de cabeceras (58 bytes de PACKET_DTYPE + 8 de la referencia al payload: ~132 MB, sin contar los payloads)
+    CAPTURE_SNAPLEN: int = 262144  # Bytes capturados por trama por defecto (CaptureRequest.snaplen)
+    FRAME_BUFFER_BYTES: int = 64 * 1024 * 1024  # Tramas crudas retenidas para exportar (0 = desactivado)
+    PCAP_DIR: str = "captures"  # Directorio de ficheros pcap/pcapng para el modo offline
+    SPOOL_ENABLED: bool = False  # Guardar las tramas en disco en segmentos rotatorios
+    SPOOL_DIR: str = "captures/spool"
+    SPOOL_SEGMENT_BYTES: int = 64 * 1024 * 1024
+    SPOOL_SEGMENT_SECONDS: int = 300
+    SPOOL_MAX_BYTES: int = 2 * 1024 * 1024 * 1024  # Retención total del spool (suma de todas las sesiones)
+    MAX_CAPTURE_SESSIONS: int = 8  # Sesiones de captura simultáneas (incluida la por defecto)
+    FLOW_IDLE_TIMEOUT: int = 30  # Segundos sin paquetes para expirar un flujo
+    FLOW_ACTIVE_TIMEOUT: int = 300  # Segundos tras los que se emite un registro parcial de un flujo largo
+    FLOW_TABLE_MAX: int = 500_000  # Flujos activos como máximo
+    FLOW_HISTORY: int = 10_000  # Registros de flujos expirados retenidos
+    HEAVY_HITTERS_CAPACITY: int = 1024  # Claves vigiladas por cada top-K (error ≤ total / capacidad)
+    SKETCH_WIDTH: int = 1 << 16  # Columnas de cada Count-Min sketch (potencia de 2; error ≤ e/ancho × total)
+    SKETCH_DEPTH: int = 4  # Filas (confianza 1 - e^-profundidad); 4 sketches (paquetes y bytes por celda) × 4 MiB = 16 MiB por sesión
+    HLL_PRECISION: int = 12  # Registros 2^p de los HyperLogLog globales (4 KiB, error ~1.6%)
+    HLL_SMALL_PRECISION: int = 10  # HyperLogLog por minuto y por fuente (1 KiB, error ~3.3%)
+    DISTINCT_WINDOW_MINUTES: int = 60  # Minutos retenidos de hosts destino distintos por minuto
+    DISTINCT_TRACKED_SOURCES: int = 256  # Fuentes más pesadas con puertos/hosts distintos propios
+    TIMESERIES_SECONDS: int = 3600  # Buckets por segundo retenidos (1 h)
+    TIMESERIES_MINUTES: int = 1440  # Buckets por minuto (24 h)
+    TIMESERIES_HOURS: int = 168  # Buckets por hora (7 días)
+    NETWORK_GRAPH_MAX_NODES: int = 5000  # Nodos (IPs) del grafo del mapa de red
+    NETWORK_GRAPH_MAX_EDGES: int = 20000  # Conexiones origen→destino del grafo
+    STATS_CACHE_SIZE: int = 256  # Respuestas de estadísticas cacheadas por (endpoint, parámetros, versión)
+    PASSIVE_DNS_SIZE: int = 100_000  # Entradas IP → hostname del DNS pasivo
+    PASSIVE_DNS_MIN_TTL: int = 300  # Los clientes cachean más que el TTL: mínimo de vida de una entrada
+    PASSIVE_DNS_MAX_TTL: int = 86400
+    APP_LAYER_TRACKED_FLOWS: int = 100_000  # Flujos TCP cuyo primer segmento con datos ya se ha inspeccionado
+    
     # Ollama
     OLLAMA_URL: str = "http://localhost:11434"
     OLLAMA_MODEL: str = "llama3.2:3b"
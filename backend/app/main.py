@@ -7,7 +7,7 @@ import sys
 
 from .core.config import get_settings
 from .core.database import init_db, close_db
-from .routes import capture, stats, ai, system, auth
+from .routes import capture, stats, flows, ai, system, auth
 
 # Configurar logging con más detalle
 logging.basicConfig(
@@ -67,6 +67,7 @@ app.include_router(auth.router, prefix="/api", tags=["Autenticación"])
 # Rutas de funcionalidad
 app.include_router(capture.router)
 app.include_router(stats.router)
+app.include_router(flows.router)
 app.include_router(ai.router, prefix="/api/ai", tags=["AI"])
 app.include_router(system.router)
 
@@ -1,9 +1,14 @@
 """
-Modelos de base de datos para LeirEye
+Modelos de LeirEye: base de datos (SQLAlchemy) y API de captura (pydantic)
 """
 from .user import User, UserRole
+from .capture import CaptureRequest, CaptureStats, CaptureStatus, PacketData
 
 __all__ = [
     "User",
-    "UserRole"
+    "UserRole",
+    "PacketData",
+    "CaptureStats",
+    "CaptureRequest",
+    "CaptureStatus"
 ]
@@ -0,0 +1,82 @@
+"""Modelos de datos de la API de captura (pydantic)"""
+from pydantic import BaseModel, Field
+from typing import Optional, Dict, Literal
+from datetime import datetime
+
+
+class PacketData(BaseModel):
+    """Datos de un paquete capturado"""
+    timestamp: datetime
+    src_ip: str
+    dst_ip: str
+    src_port: Optional[int] = None
+    dst_port: Optional[int] = None
+    protocol: str
+    length: int
+    payload_preview: Optional[str] = None
+    flags: Optional[str] = None
+    process_name: Optional[str] = None  # Nombre del proceso que generó el paquete
+    pid: Optional[int] = None  # PID del proceso
+
+
+class CaptureStats(BaseModel):
+    """Estadísticas de captura"""
+    total_packets: int
+    tcp_packets: int
+    udp_packets: int
+    icmp_packets: int
+    other_packets: int
+    top_src_ips: Dict[str, int]
+    top_dst_ips: Dict[str, int]
+    top_ports: Dict[int, int]
+    total_bytes: int = 0
+    tcp_bytes: int = 0
+    udp_bytes: int = 0
+    icmp_bytes: int = 0
+    other_bytes: int = 0
+    top_src_ips_bytes: Dict[str, int] = {}  # Top-K por volumen en bytes
+    top_dst_ips_bytes: Dict[str, int] = {}
+    top_ports_bytes: Dict[int, int] = {}
+    capture_duration: float
+    sampled_packets: Optional[int] = None  # Paquetes realmente procesados (los totales son estimados)
+    sampling: Dict = {}
+    error_bounds: Dict = {}  # Cotas de error de los top-K (Space-Saving)
+
+
+class CaptureRequest(BaseModel):
+    """Request para iniciar captura"""
+    session_id: Optional[str] = Field(None, pattern=r"^[A-Za-z0-9_-]{1,64}$")  # None: sesión por defecto
+    interface: Optional[str] = None
+    packet_filter: Optional[str] = None
+    max_packets: int = Field(1000, ge=0)  # 0: sin límite (el buffer es un ring)
+    backend: Literal["scapy", "tpacket_v3", "pcap"] = "scapy"  # tpacket_v3: ring mmap AF_PACKET (Linux)
+    workers: int = Field(1, ge=1, le=64)  # >1: procesos en grupo PACKET_FANOUT (requiere tpacket_v3)
+    pcap_file: Optional[str] = None  # backend pcap: fichero dentro de PCAP_DIR
+    replay_speed: float = Field(0.0, ge=0)  # backend pcap: 0 = máxima velocidad, 1 = tiempo real, N = N×
+    sampling: Literal["none", "count", "random", "flow"] = "none"  # count: 1 de cada N; random/flow: probabilidad
+    sample_every: int = Field(1, ge=1)  # sampling=count
+    sample_probability: float = Field(1.0, gt=0, le=1)  # sampling=random/flow
+    snaplen: Optional[int] = Field(None, ge=64, le=262144)  # Bytes capturados por trama (None: CAPTURE_SNAPLEN)
+    stats_mode: Literal["exact", "sketch"] = "exact"  # sketch: contadores por clave Count-Min de memoria fija
+    sketch_width: Optional[int] = Field(None, ge=256, le=1 << 22)  # Potencia de 2 (None: SKETCH_WIDTH)
+    sketch_depth: Optional[int] = Field(None, ge=1, le=16)  # None: SKETCH_DEPTH
+
+
+class CaptureStatus(BaseModel):
+    """Status de la captura"""
+    session_id: str = "default"
+    is_running: bool
+    packets_captured: int
+    estimated_packets: Optional[int] = None  # Escalado por la tasa de muestreo
+    sampling: Dict = {}  # mode, rate, scale
+    stats_mode: str = "exact"  # exact | sketch
+    interface: Optional[str] = None
+    filter: Optional[str] = None
+    backend: Optional[str] = None
+    workers: int = 1
+    pcap_file: Optional[str] = None
+    buffered_packets: int = 0  # Paquetes retenidos en el ring de cabeceras
+    flows: Dict[str, int] = {}  # Tabla de flujos: active, expired, dropped, timers
+    stream: Dict[str, int] = {}  # Puente hacia WebSocket: subscribers, published, drops, high_water, capacity
+    kernel_stats: Dict[str, int] = {}  # Contadores del kernel: packets, drops, freeze_count
+    bpf_cache: Dict[str, int] = {}  # Caché de filtros BPF compilados: hits, misses, size
@@ -1,4 +1,4 @@
 """Rutas del API"""
-from . import auth, capture, stats, ai, system
+from . import auth, capture, stats, flows, ai, system
 
-__all__ = ["auth", "capture", "stats", "ai", "system"]
+__all__ = ["auth", "capture", "stats", "flows", "ai", "system"]
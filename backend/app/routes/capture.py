@@ -1,16 +1,28 @@
 """Rutas para captura de paquetes"""
-from fastapi import APIRouter, WebSocket, HTTPException
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, HTTPException, Depends
+from fastapi.responses import StreamingResponse
+from typing import Literal, Optional
 import json
 import logging
 import asyncio
 
 from ..models import CaptureRequest, CaptureStatus
-from ..services.packet_capture import capture_service
+from ..services.packet_capture import capture_service, PacketCaptureService
+from ..services.capture_sessions import session_manager, DEFAULT_SESSION
+from ..dependencies.auth import require_permission
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/capture", tags=["capture"])
 
 
+def get_session(session_id: Optional[str] = None) -> PacketCaptureService:
+    """Sesión de captura por ID (la por defecto si no se indica); 404 si no existe"""
+    try:
+        return session_manager.get(session_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Sesión de captura no encontrada: {session_id}")
+
+
 @router.get("/interfaces")
 async def get_interfaces():
     """Obtiene las interfaces de red disponibles"""
@@ -24,15 +36,27 @@ async def get_interfaces():
 
 @router.post("/start")
 async def start_capture(request: CaptureRequest):
-    """Inicia la captura de paquetes"""
+    """Inicia la captura de paquetes (en la sesión indicada, creándola si no existe)"""
     try:
-        capture_service.start_capture(
+        service = session_manager.start(
+            request.session_id or DEFAULT_SESSION,
             interface=request.interface,
             packet_filter=request.packet_filter,
-            max_packets=request.max_packets
+            max_packets=request.max_packets,
+            backend=request.backend,
+            workers=request.workers,
+            pcap_file=request.pcap_file,
+            replay_speed=request.replay_speed,
+            sampling=request.sampling,
+            sample_every=request.sample_every,
+            sample_probability=request.sample_probability,
+            snaplen=request.snaplen,
+            stats_mode=request.stats_mode,
+            sketch_width=request.sketch_width,
+            sketch_depth=request.sketch_depth
         )
-        return {"message": "Captura iniciada", "status": capture_service.get_status()}
-    except RuntimeError as e:
+        return {"message": "Captura iniciada", "status": service.get_status()}
+    except (RuntimeError, ValueError) as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error iniciando captura: {e}")
@@ -40,21 +64,23 @@ async def start_capture(request: CaptureRequest):
 
 
 @router.post("/reset")
-async def reset_capture():
+async def reset_capture(session_id: Optional[str] = None):
     """Resetea el estado de captura (para recovery)"""
+    service = get_session(session_id)
     try:
-        capture_service.reset()
-        return {"message": "Estado reseteado", "status": capture_service.get_status()}
+        service.reset()
+        return {"message": "Estado reseteado", "status": service.get_status()}
     except Exception as e:
         logger.error(f"Error reseteando captura: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.post("/stop")
-async def stop_capture():
+async def stop_capture(session_id: Optional[str] = None):
     """Detiene la captura"""
+    service = get_session(session_id)
     try:
-        stats = capture_service.stop_capture()
+        stats = service.stop_capture()
         return {
             "message": "Captura detenida",
             "stats": stats.model_dump()
@@ -65,95 +91,153 @@ async def stop_capture():
 
 
 @router.get("/status")
-async def get_status() -> CaptureStatus:
+async def get_status(session_id: Optional[str] = None) -> CaptureStatus:
     """Obtiene el status actual de captura"""
-    status = capture_service.get_status()
+    status = get_session(session_id).get_status()
     return CaptureStatus(**status)
 
 
 @router.get("/packets")
-async def get_packets(limit: int = 100):
-    """Obtiene últimos N paquetes capturados"""
-    packets = capture_service.get_packets(limit)
+async def get_packets(
+    limit: int = 100,
+    session_id: Optional[str] = None,
+    payload_format: Literal["hex", "ascii"] = "hex"
+):
+    """Obtiene últimos N paquetes capturados (payload renderizado en hex o ASCII)"""
+    packets = get_session(session_id).get_packets(limit)
     return {
         "count": len(packets),
-        "packets": [p.model_dump(mode='json') for p in packets]
+        "packets": [p.to_json(payload_format) for p in packets]
     }
 
 
 @router.post("/clear")
-async def clear_packets():
+async def clear_packets(session_id: Optional[str] = None):
     """Limpia el buffer de paquetes"""
-    capture_service.clear_packets()
+    get_session(session_id).clear_packets()
     return {"message": "Buffer limpiado"}
 
 
+@router.get("/export", dependencies=[Depends(require_permission("capture:export"))])
+async def export_capture(
+    format: Literal["pcap", "pcapng"] = "pcapng",
+    file: Optional[str] = None,
+    start: Optional[float] = None,
+    end: Optional[float] = None,
+    session_id: Optional[str] = None
+):
+    """
+    Exporta la captura actual (tramas retenidas), un fichero de PCAP_DIR o
+    un rango de tiempo del spool (start/end en epoch) como pcap/pcapng, por
+    streaming (transferencia por chunks).
+    """
+    service = get_session(session_id)
+    try:
+        media_type, filename, chunks = service.export_capture(format, pcap_file=file, start=start, end=end)
+    except RuntimeError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error exportando captura: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    # Iterador síncrono: Starlette lo consume en el threadpool sin bloquear el event loop
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+@router.get("/spool")
+async def get_spool(session_id: Optional[str] = None):
+    """Segmentos del spool en disco"""
+    spool = get_session(session_id).spool
+    if spool is None:
+        return {"enabled": False, "segments": [], "total_bytes": 0}
+    segments = spool.list_segments()
+    return {
+        "enabled": True,
+        "segments": segments,
+        "total_bytes": sum(s["bytes"] for s in segments),
+        "max_bytes": spool.max_bytes
+    }
+
+
+@router.get("/sessions")
+async def list_sessions():
+    """Sesiones de captura y su estado"""
+    return {"sessions": session_manager.list_sessions()}
+
+
+@router.delete("/sessions/{session_id}")
+async def delete_session(session_id: str):
+    """Detiene y elimina una sesión de captura"""
+    get_session(session_id)
+    session_manager.remove(session_id)
+    return {"message": "Sesión eliminada", "session_id": session_id}
+
+
 @router.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket):
+async def websocket_endpoint(
+    websocket: WebSocket,
+    session_id: Optional[str] = None,
+    payload_format: Literal["hex", "ascii"] = "hex"
+):
     """WebSocket para streaming de paquetes en tiempo real"""
+    try:
+        service = session_manager.get(session_id)
+    except KeyError:
+        await websocket.close(code=4404)
+        return
     await websocket.accept()
+    subscription = service.bridge.subscribe(asyncio.get_running_loop())
     
+    async def send_packets():
+        """Envía los paquetes en cuanto el thread de captura los publica (sin polling)"""
+        while True:
+            packets = await subscription.get()
+            logger.debug(f"Enviando {len(packets)} paquetes via WebSocket")
+            for packet in packets:
+                await websocket.send_json({
+                    "type": "packet",
+                    "data": packet.to_json(payload_format)
+                })
+    
+    sender = None
     try:
         # Enviar estado inicial
         await websocket.send_json({
             "type": "status",
-            "data": capture_service.get_status()
+            "data": service.get_status()
         })
         logger.info("WebSocket: Cliente conectado")
+        sender = asyncio.create_task(send_packets())
         
-        # Loop para enviar paquetes pendientes
+        # Escuchar comandos del cliente mientras el sender entrega paquetes
         while True:
-            try:
-                # Obtener paquetes pendientes de la queue (non-blocking)
-                pending_packets = capture_service.get_pending_packets()
-                
-                if pending_packets:
-                    logger.debug(f"Enviando {len(pending_packets)} paquetes via WebSocket")
-                
-                for packet in pending_packets:
-                    try:
-                        await websocket.send_json({
-                            "type": "packet",
-                            "data": packet.model_dump(mode='json')
-                        })
-                        logger.debug(f"Paquete enviado via WebSocket: {packet.src_ip} -> {packet.dst_ip}")
-                    except Exception as e:
-                        logger.error(f"Error enviando paquete: {e}")
-                        break
-                
-                # Escuchar comandos del cliente (con timeout para no bloquear)
-                try:
-                    data = await asyncio.wait_for(
-                        websocket.receive_text(),
-                        timeout=0.5
-                    )
-                    command = json.loads(data)
-                    
-                    if command.get("action") == "status":
-                        await websocket.send_json({
-                            "type": "status",
-                            "data": capture_service.get_status()
-                        })
-                    elif command.get("action") == "stats":
-                        stats = capture_service.stop_capture()
-                        await websocket.send_json({
-                            "type": "stats",
-                            "data": stats.model_dump(mode='json')
-                        })
-                except asyncio.TimeoutError:
-                    # Timeout normal, continuar
-                    pass
-                
-                # Pequeña pausa para no saturar CPU
-                await asyncio.sleep(0.1)
-                
-            except Exception as e:
-                logger.error(f"Error en loop WebSocket: {e}")
-                break
+            data = await websocket.receive_text()
+            command = json.loads(data)
+            
+            if command.get("action") == "status":
+                await websocket.send_json({
+                    "type": "status",
+                    "data": service.get_status()
+                })
+            elif command.get("action") == "stats":
+                stats = service.stop_capture()
+                await websocket.send_json({
+                    "type": "stats",
+                    "data": stats.model_dump(mode='json')
+                })
                 
+    except WebSocketDisconnect:
+        pass
     except Exception as e:
         logger.error(f"Error en WebSocket: {e}")
     finally:
+        service.bridge.unsubscribe(subscription)
+        if sender:
+            sender.cancel()
         try:
             await websocket.close()
         except:
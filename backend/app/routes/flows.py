@@ -0,0 +1,55 @@
+"""Rutas para la tabla de flujos"""
+from typing import Literal, Optional
+from fastapi import APIRouter, Query
+
+from .capture import get_session
+
+router = APIRouter(prefix="/api/flows", tags=["flows"])
+
+
+@router.get("")
+async def get_active_flows(
+    limit: int = Query(100, ge=1, le=10000),
+    sort: Literal["bytes", "packets", "last_seen"] = "bytes",
+    session_id: Optional[str] = None
+):
+    """Flujos activos (5-tupla bidireccional) ordenados por bytes, paquetes o actividad"""
+    service = get_session(session_id)
+    flows = service.get_flows(limit, sort)
+    return {
+        "count": len(flows),
+        "flows": flows,
+        "table": service.flows.get_stats()
+    }
+
+
+@router.get("/expired")
+async def get_expired_flows(
+    limit: int = Query(100, ge=1, le=10000),
+    session_id: Optional[str] = None
+):
+    """Registros de flujos expirados recientes (idle, active, finished o end)"""
+    service = get_session(session_id)
+    flows = service.get_expired_flows(limit)
+    return {
+        "count": len(flows),
+        "flows": flows,
+        "table": service.flows.get_stats()
+    }
+
+
+@router.get("/tcp")
+async def get_tcp_metrics(
+    group: Literal["remote", "process"] = "remote",
+    limit: int = Query(20, ge=1, le=1000),
+    sort: Literal["p50", "p90", "p99", "count", "retransmits"] = "p90",
+    session_id: Optional[str] = None
+):
+    """RTT del handshake (percentiles) y retransmisiones TCP por IP remota o por proceso"""
+    service = get_session(session_id)
+    entries = service.get_tcp_metrics(group, limit, sort)
+    return {
+        "group": group,
+        "count": len(entries),
+        "entries": entries
+    }
@@ -1,128 +1,299 @@
 """Rutas para estadísticas"""
-from fastapi import APIRouter
-from ..services.packet_capture import capture_service
-from ..services.geoip import is_private_ip, get_batch_locations, get_network_label
+import inspect
+from typing import Any, Callable, Dict, Literal, Optional, Sequence, Tuple
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from ..services.capture_sessions import session_manager
+from ..services.packet_sampler import sampling_summary
+from ..services.passive_dns import passive_dns
+from ..services.response_cache import etag_for, etag_matches, stats_cache
+from ..services.cardinality import relative_error
+from ..core.config import settings
+from ..services.geoip import get_batch_locations
 
 router = APIRouter(prefix="/api/stats", tags=["stats"])
 
+PROTOCOLS = ('tcp', 'udp', 'icmp', 'other')
 
-@router.get("/summary")
-async def get_summary():
-    """Obtiene resumen de estadísticas"""
-    status = capture_service.get_status()
-    packets = capture_service.packets
-    stats = capture_service.stats
+# Orden de los top-K: parámetro ``sort`` → métrica de SpaceSaving
+TOP_METRICS = {"packets": "count", "bytes": "volume"}
+
+# Resúmenes que copia cada ruta (además de los contadores escalares)
+TOP_STATS = ('top_ips_src', 'top_ips_dst', 'top_ports')
+DISTINCT_STATS = ('distinct_ips_src', 'distinct_ips_dst', 'distinct_ports', 'distinct_flows')
+
+
+class Uncached:
+    """Contenido que ``versioned_response`` sirve sin cachear ni ETag (p. ej. incompleto)"""
+
+    __slots__ = ("content",)
+
+    def __init__(self, content: Any):
+        self.content = content
+
+
+def get_session_stats(session_id: Optional[str] = None, keys: Sequence[str] = ()) -> Tuple[Dict, Dict]:
+    """
+    Totales estimados (escalados por el muestreo) de los contadores escalares
+    y los resúmenes ``keys``, y bloque ``sampling`` con la muestra cruda de
+    una sesión ("all" = agregado de todas); 404 si no existe
+    """
+    try:
+        sampled, estimated, sampler = session_manager.get_sampled_stats(session_id, keys)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Sesión de captura no encontrada: {session_id}")
+    return estimated, sampling_summary(sampled, estimated, sampler)
+
+
+async def versioned_response(
+    request: Request,
+    endpoint: str,
+    session_id: Optional[str],
+    params: Tuple,
+    build: Callable[[], Any]
+) -> Response:
+    """
+    Respuesta JSON de ``build`` cacheada por (endpoint, sesión, parámetros,
+    versión de las estadísticas) con ETag; 304 si el cliente ya la tiene.
+    Si ``build`` devuelve ``Uncached`` la respuesta no se guarda ni lleva ETag
+    """
+    try:
+        version = session_manager.get_stats_version(session_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Sesión de captura no encontrada: {session_id}")
+    key = (endpoint, session_id, params, version)
+    headers = {"ETag": etag_for(key), "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
     
+    body = stats_cache.get(key)
+    if body is None:
+        # La versión se lee antes de calcular: el contenido nunca es más antiguo que su ETag
+        content = build()
+        if inspect.isawaitable(content):
+            content = await content
+        if isinstance(content, Uncached):
+            return JSONResponse(jsonable_encoder(content.content), headers={"Cache-Control": "no-store"})
+        body = JSONResponse(jsonable_encoder(content)).body
+        stats_cache.put(key, body)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def distinct_totals(stats: Dict) -> Dict[str, int]:
+    """Valores distintos globales estimados con HyperLogLog"""
     return {
-        "total_packets": stats['total'],
-        "tcp": stats['tcp'],
-        "udp": stats['udp'],
-        "icmp": stats['icmp'],
-        "other": stats['other'],
-        "top_src_ips": dict(sorted(
-            stats['ips_src'].items(),
-            key=lambda x: x[1],
-            reverse=True
-        )[:5]),
-        "top_dst_ips": dict(sorted(
-            stats['ips_dst'].items(),
-            key=lambda x: x[1],
-            reverse=True
-        )[:5]),
-        "top_ports": dict(sorted(
-            stats['ports'].items(),
-            key=lambda x: x[1],
-            reverse=True
-        )[:10])
+        "src_ips": stats['distinct_ips_src'].count(),
+        "dst_ips": stats['distinct_ips_dst'].count(),
+        "ports": stats['distinct_ports'].count(),
+        "flows": stats['distinct_flows'].count(),
     }
 
 
+@router.get("/summary")
+async def get_summary(request: Request, session_id: Optional[str] = None):
+    """Obtiene resumen de estadísticas"""
+    def build():
+        stats, sampling = get_session_stats(session_id, TOP_STATS + DISTINCT_STATS)
+        return {
+            "total_packets": stats['total'],
+            "tcp": stats['tcp'],
+            "udp": stats['udp'],
+            "icmp": stats['icmp'],
+            "other": stats['other'],
+            "total_bytes": stats['bytes'],
+            "protocol_bytes": {protocol: stats[f'{protocol}_bytes'] for protocol in PROTOCOLS},
+            "top_src_ips": stats['top_ips_src'].top_dict(5),
+            "top_dst_ips": stats['top_ips_dst'].top_dict(5),
+            "top_ports": stats['top_ports'].top_dict(10),
+            "distinct": distinct_totals(stats),
+            "error_bounds": {
+                "top_src_ips": stats['top_ips_src'].error_bounds(5),
+                "top_dst_ips": stats['top_ips_dst'].error_bounds(5),
+                "top_ports": stats['top_ports'].error_bounds(10),
+            },
+            "sampling": sampling
+        }
+    
+    return await versioned_response(request, "summary", session_id, (), build)
+
+
 @router.get("/protocols")
-async def get_protocol_distribution():
+async def get_protocol_distribution(request: Request, session_id: Optional[str] = None):
     """Distribución de protocolos"""
-    stats = capture_service.stats
-    total = stats['total'] or 1
+    def build():
+        stats, sampling = get_session_stats(session_id)
+        total = stats['total'] or 1
+        total_bytes = stats['bytes'] or 1
+        distribution = {
+            protocol: {
+                "count": stats[protocol],
+                "percentage": (stats[protocol]/total)*100,
+                "bytes": stats[f'{protocol}_bytes'],
+                "bytes_percentage": (stats[f'{protocol}_bytes']/total_bytes)*100,
+            }
+            for protocol in PROTOCOLS
+        }
+        distribution["sampling"] = sampling
+        return distribution
     
-    return {
-        "tcp": {"count": stats['tcp'], "percentage": (stats['tcp']/total)*100},
-        "udp": {"count": stats['udp'], "percentage": (stats['udp']/total)*100},
-        "icmp": {"count": stats['icmp'], "percentage": (stats['icmp']/total)*100},
-        "other": {"count": stats['other'], "percentage": (stats['other']/total)*100}
-    }
+    return await versioned_response(request, "protocols", session_id, (), build)
 
 
 @router.get("/top-ips")
-async def get_top_ips(limit: int = 10):
-    """Top IPs origen y destino"""
-    stats = capture_service.stats
+async def get_top_ips(
+    request: Request,
+    limit: int = 10,
+    sort: Literal["packets", "bytes"] = "packets",
+    session_id: Optional[str] = None
+):
+    """Top IPs origen y destino por paquetes o por bytes"""
+    by = TOP_METRICS[sort]
     
-    return {
-        "top_src": dict(sorted(
-            stats['ips_src'].items(),
-            key=lambda x: x[1],
-            reverse=True
-        )[:limit]),
-        "top_dst": dict(sorted(
-            stats['ips_dst'].items(),
-            key=lambda x: x[1],
-            reverse=True
-        )[:limit])
-    }
+    def build():
+        stats, sampling = get_session_stats(session_id, ('top_ips_src', 'top_ips_dst'))
+        top_src, top_dst = stats['top_ips_src'], stats['top_ips_dst']
+        return {
+            "sort": sort,
+            "top_src": top_src.top_dict(limit, by),
+            "top_dst": top_dst.top_dict(limit, by),
+            "error_bounds": {
+                "top_src": top_src.error_bounds(limit, by),
+                "top_dst": top_dst.error_bounds(limit, by),
+            },
+            "sampling": sampling
+        }
+    
+    return await versioned_response(request, "top-ips", session_id, (limit, sort), build)
 
 
 @router.get("/top-ports")
-async def get_top_ports(limit: int = 15):
-    """Top puertos"""
-    stats = capture_service.stats
+async def get_top_ports(
+    request: Request,
+    limit: int = 15,
+    sort: Literal["packets", "bytes"] = "packets",
+    session_id: Optional[str] = None
+):
+    """Top puertos por paquetes o por bytes"""
+    def build():
+        stats, sampling = get_session_stats(session_id, ('top_ports',))
+        top = stats['top_ports']
+        return {
+            "sort": sort,
+            "ports": top.top_dict(limit, TOP_METRICS[sort]),
+            "error_bounds": top.error_bounds(limit, TOP_METRICS[sort]),
+            "sampling": sampling
+        }
     
+    return await versioned_response(request, "top-ports", session_id, (limit, sort), build)
+
+
+@router.get("/distinct")
+async def get_distinct(
+    limit: int = Query(20, ge=1, le=1000),
+    sort: Literal["ports", "hosts"] = "ports",
+    session_id: Optional[str] = None
+):
+    """
+    Valores distintos (HyperLogLog): IPs, puertos y flujos globales, hosts
+    destino distintos por minuto y puertos/hosts distintos de las fuentes más
+    pesadas (un origen con muchos puertos u hosts distintos sugiere un escaneo)
+    """
+    stats, sampling = get_session_stats(
+        session_id, DISTINCT_STATS + ('distinct_dst_per_minute', 'distinct_per_source')
+    )
     return {
-        "ports": dict(sorted(
-            stats['ports'].items(),
-            key=lambda x: x[1],
-            reverse=True
-        )[:limit])
+        "global": distinct_totals(stats),
+        "dst_hosts_per_minute": stats['distinct_dst_per_minute'].to_json(),
+        "per_source": stats['distinct_per_source'].top(limit, sort),
+        "relative_error": {
+            "global": relative_error(settings.HLL_PRECISION),
+            "per_minute_and_source": relative_error(settings.HLL_SMALL_PRECISION),
+        },
+        "sampling": sampling
     }
 
 
-@router.get("/network-map")
-async def get_network_map():
+@router.get("/timeseries")
+async def get_timeseries(
+    resolution: Literal["second", "minute", "hour"] = "second",
+    points: Optional[int] = Query(None, ge=1, le=86400),
+    session_id: Optional[str] = None
+):
     """
-    Datos para el mapa de red: nodos (IPs) y enlaces (conexiones)
+    Serie temporal de paquetes, bytes y protocolos (arrays contiguos con
+    huecos a 0) más pps y bps, a resolución de segundo, minuto u hora
     """
-    stats = capture_service.stats
-    connections = stats.get('connections', {})
-    
-    if not connections:
-        return {"nodes": [], "links": [], "summary": {"total_nodes": 0, "total_links": 0}}
-    
-    # Recopilar todas las IPs únicas
-    all_ips = set()
-    for conn_key in connections.keys():
-        parts = conn_key.split("->")
-        if len(parts) == 2:
-            all_ips.add(parts[0])
-            all_ips.add(parts[1])
+    stats, sampling = get_session_stats(session_id, ('timeseries',))
+    return {**stats['timeseries'].series(resolution, points), "sampling": sampling}
+
+
+@router.get("/count")
+async def get_point_count(
+    src_ip: Optional[str] = None,
+    dst_ip: Optional[str] = None,
+    port: Optional[int] = None,
+    session_id: Optional[str] = None
+):
+    """
+    Consulta puntual: paquetes y bytes desde una IP, hacia una IP, por puerto
+    o entre dos IPs. En modo sketch los valores son cotas superiores con su error.
+    """
+    queries = []
+    if src_ip:
+        queries.append(("src_ip", 'ips_src', src_ip))
+    if dst_ip:
+        queries.append(("dst_ip", 'ips_dst', dst_ip))
+    if port is not None:
+        queries.append(("port", 'ports', port))
+    if src_ip and dst_ip:
+        queries.append(("connection", 'connections', (src_ip, dst_ip)))
+    if not queries:
+        raise HTTPException(status_code=400, detail="Indica src_ip, dst_ip o port")
     
-    # Obtener geolocalización para todas las IPs
-    ip_list = list(all_ips)
-    geo_data = await get_batch_locations(ip_list)
+    try:
+        counts, sampling = session_manager.get_point_counts(session_id, [(key, item) for _, key, item in queries])
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Sesión de captura no encontrada: {session_id}")
+    result = {name: entry for (name, _, _), entry in zip(queries, counts)}
+    result["sampling"] = sampling
+    return result
+
+
+@router.get("/network-map")
+async def get_network_map(
+    request: Request,
+    since: Optional[int] = Query(None, ge=0),
+    metric: Literal["packets", "bytes"] = "packets",
+    session_id: Optional[str] = None
+):
+    """
+    Datos para el mapa de red: nodos (IPs con ID entero) y enlaces (conexiones).
+    ``traffic`` y ``value`` van en paquetes o en bytes según ``metric``; cada
+    nodo y enlace lleva además ambos valores (``packets`` y ``bytes``).
     
-    # Construir nodos
-    nodes = []
-    for ip in all_ips:
-        geo = geo_data.get(ip, {})
-        is_local = is_private_ip(ip)
+    Con ``since`` (el ``version`` de una respuesta anterior) solo se devuelven
+    los nodos y enlaces cambiados desde entonces para fusionarlos por ID; si
+    ``full`` es true el cliente debe sustituir el grafo (p. ej. tras un reset).
+    """
+    async def build():
+        try:
+            graph, sampling = session_manager.get_network_graph(session_id, since, metric)
+        except KeyError:
+            raise HTTPException(status_code=404, detail=f"Sesión de captura no encontrada: {session_id}")
         
-        # Calcular tráfico total (entrante + saliente)
-        traffic = stats['ips_src'].get(ip, 0) + stats['ips_dst'].get(ip, 0)
+        # Geolocalización y nombres solo de los nodos de la respuesta
+        ip_list = [node["ip"] for node in graph["nodes"]]
+        geo_data = await get_batch_locations(ip_list) if ip_list else {}
+        hostnames = passive_dns.lookup_many(ip_list)
         
-        nodes.append({
-            "id": ip,
-            "label": ip,
-            "isLocal": is_local,
-            "networkType": get_network_label(ip),
-            "traffic": traffic,
-            "geo": {
+        for node in graph["nodes"]:
+            ip = node["ip"]
+            geo = geo_data.get(ip, {})
+            hostname = hostnames.get(ip)
+            node["label"] = hostname or ip
+            node["hostname"] = hostname
+            node["geo"] = {
                 "country": geo.get("country", "Unknown"),
                 "countryCode": geo.get("countryCode", ""),
                 "city": geo.get("city", ""),
@@ -130,37 +301,13 @@ async def get_network_map():
                 "lat": geo.get("lat", 0),
                 "lon": geo.get("lon", 0)
             } if geo else None
-        })
-    
-    # Construir enlaces
-    links = []
-    for conn_key, count in connections.items():
-        parts = conn_key.split("->")
-        if len(parts) == 2:
-            src, dst = parts[0], parts[1]
-            # Solo agregar enlaces si ambos nodos existen
-            if src in all_ips and dst in all_ips:
-                links.append({
-                    "source": src,
-                    "target": dst,
-                    "value": count
-                })
-    
-    # Ordenar enlaces por valor (más tráfico primero)
-    links = sorted(links, key=lambda x: x['value'], reverse=True)
-    
-    # Estadísticas del mapa
-    local_nodes = sum(1 for n in nodes if n['isLocal'])
-    external_nodes = len(nodes) - local_nodes
+        
+        graph["sampling"] = sampling
+        # Nodos cuya geolocalización falló de forma transitoria (ip-api caído o limitado,
+        # más de 100 IPs nuevas): no se cachea, otra petición la completará
+        if any(node["ip"] not in geo_data for node in graph["nodes"]):
+            return Uncached(graph)
+        return graph
     
-    return {
-        "nodes": nodes,
-        "links": links,
-        "summary": {
-            "total_nodes": len(nodes),
-            "local_nodes": local_nodes,
-            "external_nodes": external_nodes,
-            "total_links": len(links),
-            "total_connections": sum(connections.values())
-        }
-    }
+    # Las etiquetas dependen también del DNS pasivo
+    return await versioned_response(request, "network-map", session_id, (since, metric, passive_dns.version), build)
@@ -10,6 +10,8 @@ from datetime import datetime
 import asyncio
 import json
 
+from .passive_dns import passive_dns
+
 logger = logging.getLogger(__name__)
 
 # Cache de explicaciones comunes (patrones conocidos)
@@ -189,8 +191,8 @@ class AIExplainerService:
         return f"{protocol}:{port}" if port else protocol
     
     def _detect_service(self, ip: str, domain: Optional[str] = None) -> Optional[str]:
-        """Detecta servicio conocido por IP o dominio."""
-        check_str = (domain or ip).lower()
+        """Detecta servicio conocido por dominio (o el nombre visto por DNS pasivo para la IP)."""
+        check_str = (domain or passive_dns.lookup(ip) or ip).lower()
         for service, description in KNOWN_SERVICES.items():
             if service in check_str:
                 return description
@@ -221,10 +223,13 @@ class AIExplainerService:
         3. Cachear resultado para futuras consultas
         """
         
+        # Nombre del destino según las respuestas DNS capturadas
+        dst_host = passive_dns.lookup(dst_ip)
+        
         # 1. Intentar cache de patrones conocidos
         cached = self._get_cached_explanation(protocol, dst_port)
         if cached:
-            service = self._detect_service(dst_ip)
+            service = self._detect_service(dst_ip, dst_host)
             return {
                 "source": "cache",
                 "app": service or cached.get("app", "Desconocido"),
@@ -235,30 +240,31 @@ class AIExplainerService:
                     "protocol": protocol,
                     "src": f"{src_ip}:{src_port}" if src_port else src_ip,
                     "dst": f"{dst_ip}:{dst_port}" if dst_port else dst_ip,
+                    "dst_host": dst_host,
                     "flags": flags,
                     "size": f"{length} bytes"
                 }
             }
         
         # 2. Detectar servicio por IP/dominio
-        service = self._detect_service(dst_ip)
+        service = self._detect_service(dst_ip, dst_host)
         
         # 3. Si Ollama no está disponible o no se quiere usar IA
         if not use_ai or not self.is_available:
             return self._generate_basic_explanation(
-                protocol, src_ip, dst_ip, src_port, dst_port, flags, length, service
+                protocol, src_ip, dst_ip, src_port, dst_port, flags, length, service, dst_host
             )
         
         # 4. Usar Ollama para explicación avanzada
         try:
             explanation = await self._query_ollama(
-                protocol, src_ip, dst_ip, src_port, dst_port, flags, length, service
+                protocol, src_ip, dst_ip, src_port, dst_port, flags, length, service, dst_host
             )
             return explanation
         except Exception as e:
             logger.error(f"Error con Ollama: {e}")
             return self._generate_basic_explanation(
-                protocol, src_ip, dst_ip, src_port, dst_port, flags, length, service
+                protocol, src_ip, dst_ip, src_port, dst_port, flags, length, service, dst_host
             )
     
     def _generate_basic_explanation(
@@ -270,7 +276,8 @@ class AIExplainerService:
         dst_port: Optional[int],
         flags: Optional[str],
         length: int,
-        service: Optional[str]
+        service: Optional[str],
+        dst_host: Optional[str] = None
     ) -> Dict[str, Any]:
         """Genera explicación básica sin IA."""
         
@@ -282,7 +289,7 @@ class AIExplainerService:
         if service:
             explanation = f"Tu dispositivo está {direction} {service}."
         else:
-            explanation = f"Conexión {protocol} desde {src_ip} hacia {dst_ip}."
+            explanation = f"Conexión {protocol} desde {src_ip} hacia {dst_host or dst_ip}."
         
         # Seguridad básica
         security = "ℹ️ Sin información adicional disponible."
@@ -301,6 +308,7 @@ class AIExplainerService:
                 "protocol": protocol,
                 "src": f"{src_ip}:{src_port}" if src_port else src_ip,
                 "dst": f"{dst_ip}:{dst_port}" if dst_port else dst_ip,
+                "dst_host": dst_host,
                 "flags": flags,
                 "size": f"{length} bytes"
             }
@@ -315,7 +323,8 @@ class AIExplainerService:
         dst_port: Optional[int],
         flags: Optional[str],
         length: int,
-        service: Optional[str]
+        service: Optional[str],
+        dst_host: Optional[str] = None
     ) -> Dict[str, Any]:
         """Consulta Ollama para generar explicación."""
         
@@ -326,6 +335,7 @@ PAQUETE:
 - Protocolo: {protocol}
 - Origen: {src_ip}:{src_port or 'N/A'}
 - Destino: {dst_ip}:{dst_port or 'N/A'}
+- Nombre del destino (DNS): {dst_host or 'Desconocido'}
 - Flags TCP: {flags or 'N/A'}
 - Tamaño: {length} bytes
 - Servicio detectado: {service or 'Desconocido'}
@@ -372,6 +382,7 @@ Responde SOLO con este JSON (sin markdown, sin explicación adicional):
                             "protocol": protocol,
                             "src": f"{src_ip}:{src_port}" if src_port else src_ip,
                             "dst": f"{dst_ip}:{dst_port}" if dst_port else dst_ip,
+                            "dst_host": dst_host,
                             "flags": flags,
                             "size": f"{length} bytes"
                         }
@@ -386,7 +397,7 @@ Responde SOLO con este JSON (sin markdown, sin explicación adicional):
         
         # Fallback a explicación básica
         return self._generate_basic_explanation(
-            protocol, src_ip, dst_ip, src_port, dst_port, flags, length, service
+            protocol, src_ip, dst_ip, src_port, dst_port, flags, length, service, dst_host
         )
     
     async def explain_alert(
@@ -0,0 +1,132 @@
+"""
+Nombres de host en el primer segmento de datos de un flujo TCP.
+
+- TLS: la extensión SNI (server_name) del ClientHello.
+- HTTP en claro: la cabecera ``Host`` de la petición.
+
+No se reensambla el flujo: solo se mira el segmento que empieza con un
+registro TLS Handshake/ClientHello o con un método HTTP, que en la práctica
+es el primer segmento de datos del cliente. ``FirstPayloadFilter`` recuerda
+los flujos (por sentido) cuyo primer segmento con datos ya se ha mirado, así
+que el resto de segmentos de un flujo ni siquiera llega a ``client_hostname``.
+Si el ClientHello no cabe en el segmento (o llega recortado por el snaplen)
+se descarta sin error.
+"""
+import struct
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+HOSTNAME_TTL = 3600  # Vida en el DNS pasivo de un nombre visto por SNI/Host (segundos)
+HTTP_HEADER_SCAN = 2048  # Bytes de la petición en los que se busca Host
+MAX_HOSTNAME = 253
+
+_TLS_HANDSHAKE = 0x16
+_TLS_CLIENT_HELLO = 0x01
+_TLS_EXT_SERVER_NAME = 0x0000
+_SNI_HOST_NAME = 0x00
+_U16 = struct.Struct("!H")
+
+_HTTP_METHODS = (b"GET ", b"POST", b"HEAD", b"PUT ", b"DELE", b"OPTI", b"PATC", b"CONN")
+_HTTP_FIRST_BYTES = frozenset(method[0] for method in _HTTP_METHODS)
+_HTTP_PREFIXES = frozenset(_HTTP_METHODS)
+_HTTP_HOST = b"\r\nhost:"
+
+
+def _valid_hostname(name: str) -> Optional[str]:
+    name = name.strip().rstrip(".").lower()
+    if not name or len(name) > MAX_HOSTNAME or not name.isascii():
+        return None
+    if any(char.isspace() or char in "/\\@" for char in name):
+        return None
+    return name
+
+
+def parse_tls_sni(payload) -> Optional[str]:
+    """Nombre del servidor (SNI) de un registro TLS ClientHello, o None"""
+    length = len(payload)
+    # Cabecera de registro (5) + cabecera de handshake (4) + versión (2) + random (32)
+    if length < 44 or payload[0] != _TLS_HANDSHAKE or payload[5] != _TLS_CLIENT_HELLO:
+        return None
+    offset = 43
+    offset += 1 + payload[offset]  # session_id
+    if offset + 2 > length:
+        return None
+    offset += 2 + _U16.unpack_from(payload, offset)[0]  # cipher_suites
+    if offset + 1 > length:
+        return None
+    offset += 1 + payload[offset]  # compression_methods
+    if offset + 2 > length:
+        return None
+    end = min(length, offset + 2 + _U16.unpack_from(payload, offset)[0])
+    offset += 2
+    while offset + 4 <= end:
+        ext_type = _U16.unpack_from(payload, offset)[0]
+        ext_len = _U16.unpack_from(payload, offset + 2)[0]
+        offset += 4
+        if ext_type == _TLS_EXT_SERVER_NAME:
+            # server_name_list: longitud (2) y entradas tipo (1) + longitud (2) + nombre
+            if offset + 5 > end or payload[offset + 2] != _SNI_HOST_NAME:
+                return None
+            name_len = _U16.unpack_from(payload, offset + 3)[0]
+            name = payload[offset + 5:offset + 5 + name_len]
+            if len(name) < name_len:
+                return None
+            return _valid_hostname(bytes(name).decode("ascii", "replace"))
+        offset += ext_len
+    return None
+
+
+def parse_http_host(payload) -> Optional[str]:
+    """Cabecera Host (sin puerto) de una petición HTTP/1.x, o None"""
+    header = bytes(payload[:HTTP_HEADER_SCAN]).lower()
+    start = header.find(_HTTP_HOST)
+    if start < 0:
+        return None
+    start += len(_HTTP_HOST)
+    end = header.find(b"\r\n", start)
+    if end < 0:
+        return None
+    host = header[start:end].decode("ascii", "replace").strip()
+    if host.startswith("["):
+        return None  # IPv6 literal: no es un nombre
+    return _valid_hostname(host.rsplit(":", 1)[0] if ":" in host else host)
+
+
+def client_hostname(payload) -> Optional[str]:
+    """SNI o Host si el segmento empieza con un ClientHello o una petición HTTP"""
+    if len(payload) < 16:
+        return None
+    first = payload[0]
+    if first == _TLS_HANDSHAKE:
+        return parse_tls_sni(payload)
+    if first in _HTTP_FIRST_BYTES and bytes(payload[:4]) in _HTTP_PREFIXES:
+        return parse_http_host(payload)
+    return None
+
+
+class FirstPayloadFilter:
+    """
+    Flujos TCP (con sentido) cuyo primer segmento con datos ya se ha
+    inspeccionado. Acotado a ``capacity`` flujos: al llenarse se olvidan los
+    más antiguos, que como mucho se vuelven a inspeccionar una vez.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._seen: "OrderedDict[Hashable, None]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+    def first(self, flow: Hashable) -> bool:
+        """True solo para el primer segmento con datos de ``flow``"""
+        seen = self._seen
+        if flow in seen:
+            return False
+        seen[flow] = None
+        if len(seen) > self.capacity:
+            seen.popitem(last=False)
+        return True
+
+    def clear(self):
+        self._seen.clear()
@@ -0,0 +1,85 @@
+"""
+Compilación y caché de filtros BPF.
+
+Las expresiones (sintaxis tcpdump) se compilan una sola vez a bytecode
+``sock_filter`` con el compilador de scapy (libpcap o ``tcpdump -ddd``) y se
+cachean por ``(expresión, interfaz)``. ``start_capture`` valida el filtro
+antes de arrancar el thread, y los backends AF_PACKET adjuntan el programa al
+socket con ``SO_ATTACH_FILTER`` para que el kernel descarte el tráfico no
+deseado antes de llegar a Python.
+
+El valor de retorno de un programa BPF de socket es el número de bytes de la
+trama que se entregan, así que el snaplen se aplica en el kernel limitando
+las instrucciones ``ret #k`` (``clamp_snaplen``).
+"""
+import ctypes
+import logging
+import socket
+import struct
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+from scapy.arch.common import compile_filter
+
+from .packet_dissector import SNAPLEN_MAX
+
+logger = logging.getLogger(__name__)
+
+SO_ATTACH_FILTER = 26
+BPF_MAXINSNS = 4096
+BPF_RET_K = 0x06  # BPF_RET | BPF_K
+
+# struct sock_filter: code, jt, jf, k
+_SOCK_FILTER = struct.Struct("HBBI")
+# struct sock_fprog: len, puntero a las instrucciones
+_SOCK_FPROG = struct.Struct("HP")
+
+# Programa compilado: tupla inmutable de instrucciones (code, jt, jf, k)
+BPFProgram = Tuple[Tuple[int, int, int, int], ...]
+
+# Programa sin filtro: acepta todas las tramas completas
+ACCEPT_ALL: BPFProgram = ((BPF_RET_K, 0, 0, SNAPLEN_MAX),)
+
+
+class BPFFilterError(ValueError):
+    """Expresión BPF inválida o imposible de compilar"""
+
+
+@lru_cache(maxsize=128)
+def compile_bpf(expression: str, interface: Optional[str] = None) -> BPFProgram:
+    """Compila una expresión BPF (cacheado por expresión e interfaz)"""
+    try:
+        program = compile_filter(expression, iface=interface)
+    except Exception as e:
+        raise BPFFilterError(f"Filtro BPF inválido '{expression}': {e}") from e
+    instructions = tuple(
+        (insn.code, insn.jt, insn.jf, insn.k)
+        for insn in program.bf_insns[:program.bf_len]
+    )
+    if not instructions or len(instructions) > BPF_MAXINSNS:
+        raise BPFFilterError(f"Filtro BPF inválido '{expression}': {len(instructions)} instrucciones")
+    logger.debug(f"Filtro BPF compilado: '{expression}' ({len(instructions)} instrucciones)")
+    return instructions
+
+
+def clamp_snaplen(program: BPFProgram, snaplen: int) -> BPFProgram:
+    """Limita a ``snaplen`` los bytes aceptados por cada ``ret #k`` (0 sigue descartando)"""
+    return tuple(
+        (code, jt, jf, min(k, snaplen) if code == BPF_RET_K and k else k)
+        for code, jt, jf, k in program
+    )
+
+
+def attach_bpf(sock: socket.socket, program: BPFProgram):
+    """Adjunta un programa compilado a un socket AF_PACKET (SO_ATTACH_FILTER)"""
+    code = b"".join(_SOCK_FILTER.pack(*insn) for insn in program)
+    # El kernel copia las instrucciones durante setsockopt
+    buffer = ctypes.create_string_buffer(code, len(code))
+    fprog = _SOCK_FPROG.pack(len(program), ctypes.addressof(buffer))
+    sock.setsockopt(socket.SOL_SOCKET, SO_ATTACH_FILTER, fprog)
+
+
+def cache_info() -> Dict[str, int]:
+    """Estadísticas de la caché de filtros compilados (``get_status``)"""
+    info = compile_bpf.cache_info()
+    return {"hits": info.hits, "misses": info.misses, "size": info.currsize}
@@ -0,0 +1,375 @@
+"""
+Backends de captura de paquetes.
+
+Cada backend entrega las tramas capturadas por lotes a
+``PacketCaptureService._process_batch``. Un lote es una lista de tuplas
+``(trama, timestamp, linktype, longitud original)`` donde la trama son los
+bytes crudos o un paquete scapy (con ``linktype`` y longitud None):
+
+- ``scapy``: usa ``sniff()`` de scapy (compatible con todas las plataformas)
+  y agrupa hasta ``BATCH_MAX_FRAMES`` tramas o ``BATCH_MAX_WAIT`` segundos.
+- ``tpacket_v3``: socket AF_PACKET con ring buffer TPACKET_V3 mapeado en
+  memoria (solo Linux). El kernel escribe bloques completos de tramas en el
+  ring y el proceso los lee sin una llamada al sistema por paquete; cada
+  bloque se entrega como un lote.
+- ``pcap``: lee un fichero pcap/pcapng mapeado en memoria (no requiere root)
+  y reproduce sus tramas tan rápido como sea posible, en tiempo real o a N×.
+
+Los backends AF_PACKET adjuntan al socket el filtro BPF ya compilado (y
+cacheado) por ``bpf_filter``, de modo que el kernel descarta el tráfico no
+deseado y recorta cada trama al snaplen antes de copiarla.
+"""
+import logging
+import mmap
+import select
+import socket
+import struct
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from scapy.all import sniff, conf
+
+from .packet_dissector import LINKTYPE_ETHERNET, LINKTYPE_RAW, SNAPLEN_MAX
+from .pcap_reader import PcapReader
+from .bpf_filter import ACCEPT_ALL, compile_bpf, attach_bpf, clamp_snaplen
+
+logger = logging.getLogger(__name__)
+
+# Constantes de <linux/if_packet.h> (no todas están expuestas en el módulo socket)
+SOL_PACKET = 263
+PACKET_RX_RING = 5
+PACKET_STATISTICS = 6
+PACKET_VERSION = 10
+PACKET_FANOUT = 18
+PACKET_FANOUT_HASH = 0
+PACKET_FANOUT_FLAG_DEFRAG = 0x8000
+TPACKET_V3 = 2
+ETH_P_ALL = 0x0003
+
+TP_STATUS_KERNEL = 0
+TP_STATUS_USER = 1
+
+# Geometría del ring por defecto: 64 bloques de 1 MiB
+RING_BLOCK_SIZE = 1 << 20
+RING_BLOCK_COUNT = 64
+RING_FRAME_SIZE = 2048
+RING_BLOCK_TIMEOUT_MS = 60  # El kernel retira un bloque parcial tras este tiempo
+POLL_TIMEOUT_MS = 100
+
+# Tamaño máximo de lote del backend scapy: N tramas o T segundos
+BATCH_MAX_FRAMES = 256
+BATCH_MAX_WAIT = 0.05
+
+# Espera máxima entre comprobaciones de parada durante la reproducción de un pcap
+REPLAY_MAX_SLEEP = 0.1
+
+# struct tpacket_req3
+_TPACKET_REQ3 = struct.Struct("IIIIIII")
+# struct tpacket_stats_v3: tp_packets, tp_drops, tp_freeze_q_cnt
+_TPACKET_STATS_V3 = struct.Struct("III")
+# struct tpacket_block_desc: version, offset_to_priv, block_status, num_pkts,
+# offset_to_first_pkt (seguido de blk_len, seq_num y timestamps)
+_BLOCK_DESC = struct.Struct("IIIII")
+_BLOCK_STATUS_OFFSET = 8
+# struct tpacket3_hdr: tp_next_offset, tp_sec, tp_nsec, tp_snaplen, tp_len,
+# tp_status, tp_mac, tp_net
+_TPACKET3_HDR = struct.Struct("IIIIIIHH")
+# struct sockaddr_ll va tras tpacket3_hdr (alineado a 16): sll_hatype en +8
+_SOCKADDR_LL_OFFSET = 48
+_SLL_HATYPE = struct.Struct("H")
+_SLL_HATYPE_OFFSET = 8
+# Tipos de hardware (ARPHRD_*) con cabecera Ethernet; el resto se entrega desde la capa de red
+ARPHRD_ETHER_LIKE = (1, 772)  # ARPHRD_ETHER, ARPHRD_LOOPBACK
+
+
+class CaptureBackend:
+    """
+    Interfaz común de los backends de captura.
+
+    ``on_batch`` recibe listas de ``(trama, timestamp, linktype, longitud original)``.
+    """
+
+    name = "base"
+
+    def __init__(
+        self,
+        interface: Optional[str],
+        packet_filter: Optional[str],
+        on_batch: Callable[[List[Tuple]], None],
+        should_stop: Callable[[], bool],
+        snaplen: int = SNAPLEN_MAX
+    ):
+        self.interface = interface
+        self.packet_filter = packet_filter
+        self.on_batch = on_batch
+        self.should_stop = should_stop
+        self.snaplen = snaplen
+
+    def run(self):
+        """Captura en el thread actual hasta que ``should_stop()`` sea True"""
+        raise NotImplementedError
+
+    def _attach_filter(self, sock: socket.socket, kernel_snaplen: bool = True):
+        """
+        Adjunta el filtro BPF compilado (cacheado) a un socket AF_PACKET y, con
+        ``kernel_snaplen``, el recorte de las tramas al snaplen
+        """
+        clamp = kernel_snaplen and self.snaplen < SNAPLEN_MAX
+        if not self.packet_filter and not clamp:
+            return
+        program = compile_bpf(self.packet_filter, self.interface) if self.packet_filter else ACCEPT_ALL
+        attach_bpf(sock, clamp_snaplen(program, self.snaplen) if clamp else program)
+
+    def get_kernel_stats(self) -> Dict[str, int]:
+        """Contadores del kernel (paquetes recibidos y descartados)"""
+        return {}
+
+
+class ScapyBackend(CaptureBackend):
+    """Backend compatible basado en ``scapy.sniff``"""
+
+    name = "scapy"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._pending: List[Tuple] = []
+
+    def _open_listen_socket(self):
+        """Socket de escucha de scapy con el filtro BPF precompilado cuando es AF_PACKET"""
+        if not self.packet_filter or not hasattr(socket, "AF_PACKET"):
+            return conf.L2listen(iface=self.interface, filter=self.packet_filter, promisc=False)
+        sock = conf.L2listen(iface=self.interface, promisc=False)
+        raw_sock = getattr(sock, "ins", None)
+        if not isinstance(raw_sock, socket.socket):
+            # Socket que no es AF_PACKET: scapy compila y aplica el filtro
+            sock.close()
+            return conf.L2listen(iface=self.interface, filter=self.packet_filter, promisc=False)
+        try:
+            # Sin recorte en el kernel: scapy no expone la longitud original de la
+            # trama, así que el snaplen lo aplica el servicio conservando la longitud
+            self._attach_filter(raw_sock, kernel_snaplen=False)
+        except Exception:
+            sock.close()
+            raise
+        return sock
+
+    def _collect(self, packet):
+        self._pending.append((packet, None, None, None))
+
+    def _flush(self):
+        if self._pending:
+            batch, self._pending = self._pending, []
+            self.on_batch(batch)
+
+    def run(self):
+        # El socket se mantiene abierto entre llamadas a sniff(); cada llamada
+        # dura como mucho BATCH_MAX_WAIT o hasta completar un lote
+        sock = self._open_listen_socket()
+        try:
+            while not self.should_stop():
+                sniff(
+                    opened_socket=sock,
+                    prn=self._collect,
+                    store=False,
+                    stop_filter=lambda x: len(self._pending) >= BATCH_MAX_FRAMES or self.should_stop(),
+                    timeout=BATCH_MAX_WAIT
+                )
+                self._flush()
+        finally:
+            self._flush()
+            sock.close()
+
+
+class TPacketV3Backend(CaptureBackend):
+    """Backend de alto rendimiento con ring buffer AF_PACKET TPACKET_V3"""
+
+    name = "tpacket_v3"
+
+    def __init__(self, *args, fanout_group: Optional[int] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fanout_group = fanout_group
+        self._kernel_stats = {"packets": 0, "drops": 0, "freeze_count": 0}
+        self._sock: Optional[socket.socket] = None
+
+    @staticmethod
+    def is_supported() -> bool:
+        """TPACKET_V3 solo existe en Linux"""
+        return hasattr(socket, "AF_PACKET")
+
+    def _open_socket(self) -> socket.socket:
+        sock = socket.socket(socket.AF_PACKET, socket.SOCK_RAW, socket.htons(ETH_P_ALL))
+        try:
+            # Filtrar antes de crear el ring para no recibir tráfico sin filtrar
+            self._attach_filter(sock)
+            sock.setsockopt(SOL_PACKET, PACKET_VERSION, TPACKET_V3)
+            frame_count = (RING_BLOCK_SIZE * RING_BLOCK_COUNT) // RING_FRAME_SIZE
+            sock.setsockopt(SOL_PACKET, PACKET_RX_RING, _TPACKET_REQ3.pack(
+                RING_BLOCK_SIZE,
+                RING_BLOCK_COUNT,
+                RING_FRAME_SIZE,
+                frame_count,
+                RING_BLOCK_TIMEOUT_MS,
+                0,  # tp_sizeof_priv
+                0   # tp_feature_req_word
+            ))
+            if self.interface:
+                sock.bind((self.interface, ETH_P_ALL))
+            if self.fanout_group is not None:
+                # Reparto por hash de flujo (simétrico) con reensamblado de fragmentos
+                fanout_type = PACKET_FANOUT_HASH | PACKET_FANOUT_FLAG_DEFRAG
+                sock.setsockopt(SOL_PACKET, PACKET_FANOUT, self.fanout_group | (fanout_type << 16))
+        except Exception:
+            sock.close()
+            raise
+        return sock
+
+    def run(self):
+        if not self.is_supported():
+            raise RuntimeError("El backend tpacket_v3 requiere Linux (AF_PACKET)")
+
+        sock = self._open_socket()
+        self._sock = sock
+        ring = mmap.mmap(
+            sock.fileno(),
+            RING_BLOCK_SIZE * RING_BLOCK_COUNT,
+            mmap.MAP_SHARED,
+            mmap.PROT_READ | mmap.PROT_WRITE
+        )
+        poller = select.poll()
+        poller.register(sock, select.POLLIN | select.POLLERR)
+        block_index = 0
+
+        try:
+            while not self.should_stop():
+                offset = block_index * RING_BLOCK_SIZE
+                _, _, status, num_pkts, first_pkt = _BLOCK_DESC.unpack_from(ring, offset)
+                if not status & TP_STATUS_USER:
+                    poller.poll(POLL_TIMEOUT_MS)
+                    continue
+
+                self._walk_block(ring, offset, num_pkts, first_pkt)
+
+                # Devolver el bloque al kernel
+                struct.pack_into("I", ring, offset + _BLOCK_STATUS_OFFSET, TP_STATUS_KERNEL)
+                block_index = (block_index + 1) % RING_BLOCK_COUNT
+        finally:
+            self._read_kernel_stats()
+            self._sock = None
+            ring.close()
+            sock.close()
+
+    def _walk_block(self, ring: mmap.mmap, block_offset: int, num_pkts: int, first_pkt: int):
+        """Entrega como un lote las tramas de un bloque retirado por el kernel"""
+        batch = []
+        pkt_offset = block_offset + first_pkt
+        for _ in range(num_pkts):
+            next_offset, sec, nsec, snaplen, wire_len, _, mac, net = _TPACKET3_HDR.unpack_from(ring, pkt_offset)
+            hatype = _SLL_HATYPE.unpack_from(ring, pkt_offset + _SOCKADDR_LL_OFFSET + _SLL_HATYPE_OFFSET)[0]
+            if hatype in ARPHRD_ETHER_LIKE:
+                start, linktype = pkt_offset + mac, LINKTYPE_ETHERNET
+            else:
+                start, linktype = pkt_offset + net, LINKTYPE_RAW
+            end = pkt_offset + mac + snaplen
+            batch.append((ring[start:end], sec + nsec / 1e9, linktype, wire_len))
+            pkt_offset += next_offset
+        self.on_batch(batch)
+
+    def _read_kernel_stats(self):
+        """Acumula PACKET_STATISTICS (el kernel lo resetea en cada lectura)"""
+        if self._sock is None:
+            return
+        try:
+            raw = self._sock.getsockopt(SOL_PACKET, PACKET_STATISTICS, _TPACKET_STATS_V3.size)
+            packets, drops, freeze_count = _TPACKET_STATS_V3.unpack(raw)
+            self._kernel_stats["packets"] += packets
+            self._kernel_stats["drops"] += drops
+            self._kernel_stats["freeze_count"] += freeze_count
+        except OSError as e:
+            logger.debug(f"No se pudieron leer estadísticas del kernel: {e}")
+
+    def get_kernel_stats(self) -> Dict[str, int]:
+        self._read_kernel_stats()
+        return dict(self._kernel_stats)
+
+
+class PcapFileBackend(CaptureBackend):
+    """
+    Backend offline que reproduce un fichero pcap/pcapng.
+
+    ``replay_speed`` 0 entrega las tramas tan rápido como sea posible; 1 respeta
+    los tiempos originales y N los acelera N veces. Las tramas conservan su
+    timestamp original.
+    """
+
+    name = "pcap"
+
+    def __init__(self, *args, path: str, replay_speed: float = 0.0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.path = path
+        self.replay_speed = replay_speed
+        self._frames_read = 0
+
+    def run(self):
+        # start_capture rechaza packet_filter con este backend
+        with PcapReader(self.path) as reader:
+            batch: List[Tuple] = []
+            frame = None
+            first_ts = None
+            replay_start = time.monotonic()
+            for frame, timestamp, linktype, wire_len in reader:
+                if self.should_stop():
+                    break
+                if self.replay_speed > 0 and timestamp is not None:
+                    if first_ts is None:
+                        first_ts = timestamp
+                    due = replay_start + (timestamp - first_ts) / self.replay_speed
+                    if due > time.monotonic():
+                        # Entregar lo acumulado antes de esperar al siguiente paquete
+                        self._deliver(batch)
+                        batch = []
+                        if not self._wait_until(due):
+                            break
+                batch.append((frame, timestamp, linktype, wire_len))
+                self._frames_read += 1
+                if len(batch) >= BATCH_MAX_FRAMES:
+                    self._deliver(batch)
+                    batch = []
+            self._deliver(batch)
+            # Soltar las vistas sobre el mapeo antes de cerrarlo
+            batch = frame = None
+
+        logger.info(f"pcap: reproducción de {self.path} terminada ({self._frames_read} tramas)")
+
+    def _deliver(self, batch: List[Tuple]):
+        if batch:
+            self.on_batch(batch)
+
+    def _wait_until(self, due: float) -> bool:
+        """Duerme hasta ``due`` (reloj monotónico); False si se pide parar"""
+        while True:
+            remaining = due - time.monotonic()
+            if remaining <= 0:
+                return True
+            if self.should_stop():
+                return False
+            time.sleep(min(remaining, REPLAY_MAX_SLEEP))
+
+    def get_kernel_stats(self) -> Dict[str, int]:
+        return {"packets": self._frames_read, "drops": 0}
+
+
+CAPTURE_BACKENDS = {
+    ScapyBackend.name: ScapyBackend,
+    TPacketV3Backend.name: TPacketV3Backend,
+    PcapFileBackend.name: PcapFileBackend,
+}
+
+
+def create_backend(name: str, **kwargs) -> CaptureBackend:
+    """Instancia un backend de captura por nombre"""
+    backend_cls = CAPTURE_BACKENDS.get(name)
+    if backend_cls is None:
+        raise ValueError(f"Backend de captura desconocido: {name}")
+    if backend_cls is TPacketV3Backend and not TPacketV3Backend.is_supported():
+        raise RuntimeError("El backend tpacket_v3 requiere Linux (AF_PACKET)")
+    return backend_cls(**kwargs)
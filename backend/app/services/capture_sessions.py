@@ -0,0 +1,212 @@
+"""
+Sesiones de captura concurrentes.
+
+Cada sesión es un ``PacketCaptureService`` independiente (backend, buffers,
+spool y estadísticas propios) identificado por un ID, de modo que se pueden
+monitorizar varias interfaces/filtros a la vez. La sesión ``default`` es la
+instancia global ``capture_service`` para mantener la API existente.
+
+Una sesión nueva solo se registra si su captura arranca (un filtro BPF
+inválido no deja sesiones huérfanas), hay como mucho ``MAX_CAPTURE_SESSIONS``
+y sus spools comparten el presupuesto ``SPOOL_MAX_BYTES``.
+
+La vista agregada (``AGGREGATE_SESSION``) se calcula fusionando los
+contadores de cada sesión con ``merge_stats``, sin recorrer paquetes. Los
+totales estimados se escalan por sesión antes de fusionarlos, porque cada
+sesión puede tener su propia tasa de muestreo.
+"""
+import logging
+import threading
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Sequence, Set, Tuple
+
+from ..core.config import settings
+from .network_graph import NetworkGraph
+from .packet_capture import PacketCaptureService, capture_service, merge_stats
+from .packet_sampler import PacketSampler, estimate_stats, sampling_summary
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SESSION = "default"
+AGGREGATE_SESSION = "all"
+
+
+class CaptureSessionManager:
+    """Registro de sesiones de captura por ID"""
+
+    def __init__(self, default_service: PacketCaptureService):
+        self._lock = threading.Lock()
+        self._sessions: Dict[str, PacketCaptureService] = {DEFAULT_SESSION: default_service}
+        self._starting: Set[str] = set()  # Sesiones nuevas cuya captura se está iniciando
+
+    def get(self, session_id: Optional[str] = None) -> PacketCaptureService:
+        """Sesión por ID (la por defecto si es None); KeyError si no existe"""
+        with self._lock:
+            return self._sessions[session_id or DEFAULT_SESSION]
+
+    def start(self, session_id: str, **options: Any) -> PacketCaptureService:
+        """
+        Inicia la captura (``start_capture(**options)``) en una sesión,
+        creándola si no existe. Una sesión nueva solo se registra si la
+        captura arranca; ValueError/RuntimeError si no puede crearse o iniciarse.
+        """
+        if session_id == AGGREGATE_SESSION:
+            raise ValueError(f"'{AGGREGATE_SESSION}' está reservado para la vista agregada")
+        with self._lock:
+            service = self._sessions.get(session_id)
+            if service is None:
+                if session_id in self._starting:
+                    raise RuntimeError(f"La sesión {session_id} ya se está iniciando")
+                if len(self._sessions) + len(self._starting) >= settings.MAX_CAPTURE_SESSIONS:
+                    raise RuntimeError(f"Máximo de sesiones de captura alcanzado ({settings.MAX_CAPTURE_SESSIONS})")
+                self._starting.add(session_id)
+        if service is not None:
+            service.start_capture(**options)
+            return service
+        try:
+            service = PacketCaptureService(session_id=session_id)
+            try:
+                service.start_capture(**options)
+            except Exception:
+                service.close()
+                raise
+            with self._lock:
+                self._sessions[session_id] = service
+        finally:
+            with self._lock:
+                self._starting.discard(session_id)
+        logger.info(f"✓ Sesión de captura creada: {session_id}")
+        return service
+
+    def remove(self, session_id: str):
+        """Detiene y elimina una sesión (la por defecto solo se resetea)"""
+        if session_id == DEFAULT_SESSION:
+            self.get(DEFAULT_SESSION).reset()
+            return
+        with self._lock:
+            service = self._sessions.pop(session_id)
+        service.reset()
+        service.close(purge=True)  # Sin la sesión su spool ya no se puede exportar
+        logger.info(f"✓ Sesión de captura eliminada: {session_id}")
+
+    def list_sessions(self) -> List[Dict]:
+        with self._lock:
+            services = list(self._sessions.values())
+        return [service.get_status() for service in services]
+
+    def get_stats_version(self, session_id: Optional[str] = None) -> Hashable:
+        """
+        Versión de las estadísticas de una sesión (KeyError si no existe). La
+        del agregado es la tupla de versiones de todas las sesiones; como son
+        únicas en el proceso, también cambia al crear o eliminar sesiones.
+        """
+        if session_id != AGGREGATE_SESSION:
+            return self.get(session_id).stats_version
+        with self._lock:
+            return tuple(service.stats_version for service in self._sessions.values())
+
+    def get_stats(self, session_id: Optional[str] = None, keys: Optional[Iterable[str]] = None) -> Dict:
+        """Copia de los escalares y resúmenes ``keys`` de una sesión o agregados de todas"""
+        if session_id != AGGREGATE_SESSION:
+            return self.get(session_id).snapshot_stats(keys)
+        with self._lock:
+            services = list(self._sessions.values())
+        aggregate: Dict = {}
+        for service in services:
+            merge_stats(aggregate, service.snapshot_stats(keys))
+        return aggregate
+
+    def get_sampled_stats(
+        self,
+        session_id: Optional[str] = None,
+        keys: Optional[Iterable[str]] = None
+    ) -> Tuple[Dict, Dict, Optional[PacketSampler]]:
+        """
+        Contadores de la muestra, totales estimados y muestreador de una sesión
+        (escalares y resúmenes ``keys``, ver ``snapshot_stats``).
+
+        En la vista agregada el muestreador es None (cada sesión tiene el suyo).
+        """
+        if session_id != AGGREGATE_SESSION:
+            service = self.get(session_id)
+            sampled = service.snapshot_stats(keys)
+            return sampled, estimate_stats(sampled, service.sampler.scale), service.sampler
+        with self._lock:
+            services = list(self._sessions.values())
+        sampled: Dict = {}
+        estimated: Dict = {}
+        for service in services:
+            snapshot = service.snapshot_stats(keys)
+            merge_stats(sampled, snapshot)
+            merge_stats(estimated, estimate_stats(snapshot, service.sampler.scale))
+        return sampled, estimated, None
+
+    def get_point_counts(
+        self,
+        session_id: Optional[str],
+        queries: Sequence[Tuple[str, Hashable]]
+    ) -> Tuple[List[Dict], Dict]:
+        """
+        Paquetes y bytes estimados de claves sueltas (ver
+        ``PacketCaptureService.point_counts``) y bloque ``sampling`` de una
+        sesión o agregados: en la vista agregada se suman valores y cotas.
+        """
+        if session_id != AGGREGATE_SESSION:
+            service = self.get(session_id)
+            counts, sampled = service.point_counts(queries)
+            return counts, sampling_summary(sampled, estimate_stats(sampled, service.sampler.scale), service.sampler)
+        with self._lock:
+            services = list(self._sessions.values())
+        counts: List[Dict] = [{"count": 0, "bytes": 0, "exact": True} for _ in queries]
+        sampled, estimated = {}, {}
+        for service in services:
+            entries, scalars = service.point_counts(queries)
+            for total, entry in zip(counts, entries):
+                _merge_point_count(total, entry)
+            merge_stats(sampled, scalars)
+            merge_stats(estimated, estimate_stats(scalars, service.sampler.scale))
+        return counts, sampling_summary(sampled, estimated)
+
+    def get_network_graph(
+        self,
+        session_id: Optional[str] = None,
+        since: Optional[int] = None,
+        metric: str = "packets"
+    ) -> Tuple[Dict, Dict]:
+        """
+        Grafo estimado del mapa de red y bloque ``sampling`` de una sesión o
+        agregado. La vista agregada se fusiona en cada llamada, así que siempre
+        es completa (``since`` es anterior a su creación).
+        """
+        if session_id != AGGREGATE_SESSION:
+            service = self.get(session_id)
+            view, sampled = service.get_network_graph(since, metric)
+            return view, sampling_summary(sampled, estimate_stats(sampled, service.sampler.scale), service.sampler)
+        with self._lock:
+            services = list(self._sessions.values())
+        graph = NetworkGraph(settings.NETWORK_GRAPH_MAX_NODES, settings.NETWORK_GRAPH_MAX_EDGES)
+        sampled, estimated = {}, {}
+        for service in services:
+            scaled, scalars = service.estimated_network_graph()
+            graph.merge(scaled)
+            merge_stats(sampled, scalars)
+            merge_stats(estimated, estimate_stats(scalars, service.sampler.scale))
+        return graph.view(since, metric=metric), sampling_summary(sampled, estimated)
+
+
+def _merge_point_count(total: Dict, entry: Dict):
+    """Suma la consulta puntual de una sesión a la del agregado"""
+    total["count"] += entry["count"]
+    total["bytes"] += entry["bytes"]
+    if entry["exact"]:
+        return
+    if total["exact"]:
+        total.update({"exact": False, "epsilon": 0.0, "confidence": 1.0, "max_error": 0, "bytes_max_error": 0})
+    # Las cotas de cada sesión se suman; se cumplen todas a la vez con probabilidad ≥ 1 - Σ fallos
+    total["epsilon"] = max(total["epsilon"], entry["epsilon"])
+    total["confidence"] = max(0.0, total["confidence"] - (1 - entry["confidence"]))
+    total["max_error"] += entry["max_error"]
+    total["bytes_max_error"] += entry["bytes_max_error"]
+
+
+# Instancia global
+session_manager = CaptureSessionManager(capture_service)
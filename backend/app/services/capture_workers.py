@@ -0,0 +1,240 @@
+"""
+Captura multi-proceso con PACKET_FANOUT.
+
+Cada worker abre su propio socket TPACKET_V3 unido al mismo grupo
+PACKET_FANOUT en modo hash: el kernel reparte las tramas por flujo, así que
+cada flujo (en ambos sentidos) lo procesa siempre el mismo worker. Cada worker
+parsea y acumula estadísticas parciales y cada ``WORKER_REPORT_INTERVAL``
+segundos envía al proceso de la API los paquetes nuevos y el delta de
+estadísticas (y las tramas crudas retenidas para exportar y los nombres de
+host observados para el DNS pasivo), que se fusionan con ``merge_stats``.
+"""
+import logging
+import multiprocessing
+import itertools
+import os
+import queue
+import threading
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple
+
+from ..core.config import settings
+from .capture_backends import create_backend
+from .frame_buffer import FrameBuffer
+from .packet_dissector import SNAPLEN_MAX
+from .packet_pipeline import PacketPipeline, new_capture_stats
+from .passive_dns import HostnameBuffer
+
+logger = logging.getLogger(__name__)
+
+WORKER_REPORT_INTERVAL = 0.2
+WORKER_JOIN_TIMEOUT = 2.0
+# Paquetes que un worker retiene entre informes (las estadísticas no se ven afectadas)
+WORKER_STORE_CAPACITY = 1 << 16
+# Bytes de tramas crudas que un worker retiene entre informes (para el buffer de exportación o el spool)
+WORKER_FRAME_BYTES = 64 * 1024 * 1024
+RESULT_POLL_TIMEOUT = 0.1
+
+_fanout_groups = itertools.count()
+
+
+class WorkerRecordBuffer:
+    """
+    Paquetes de un worker entre informes.
+
+    Sustituye al ``PacketStore`` del servicio: guarda los ``PacketRecord`` tal
+    cual (con tcp_seq, tcp_len y hostname, que el ring columnar no conserva)
+    y se vacía en cada informe. Si se llena se descartan los más antiguos.
+    """
+
+    def __init__(self, capacity: int):
+        self._records = deque(maxlen=capacity)
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def append(self, records: List):
+        self._records.extend(records)
+
+    def drain(self) -> List:
+        records = list(self._records)
+        self._records.clear()
+        return records
+
+
+class WorkerCapture(PacketPipeline):
+    """
+    Contexto de captura de un worker de fanout.
+
+    Solo tiene lo necesario para parsear y resumir su parte del tráfico:
+    muestreo, disector, estadísticas parciales, paquetes y tramas entre
+    informes y nombres de host observados. El ring de paquetes, el spool, los
+    flujos y las métricas TCP son del proceso de la API.
+    """
+
+    def __init__(self, sampler, snaplen: int):
+        super().__init__(snaplen, HostnameBuffer())
+        self.sampler = sampler  # Cada worker muestrea su parte del tráfico
+        self.records = WorkerRecordBuffer(WORKER_STORE_CAPACITY)
+        # La API necesita las tramas tanto para su buffer de exportación como para el spool
+        retain = settings.FRAME_BUFFER_BYTES > 0 or settings.SPOOL_ENABLED
+        self.frames = FrameBuffer(WORKER_FRAME_BYTES if retain else 0)
+        self._lock = threading.Lock()  # El thread de informes vacía lo que llena el de captura
+
+    def process_batch(self, batch: List[Tuple]):
+        """Parsea un lote y lo acumula hasta el siguiente informe"""
+        try:
+            records, raw_frames = self._parse_batch(batch, self.frames.enabled)
+            if not records:
+                return
+            with self._lock:
+                self.records.append(records)
+                if raw_frames:
+                    self.frames.extend([f for f in raw_frames if f is not None])
+                self._update_stats(records)
+                self.stats['total'] += len(records)
+        except Exception as e:
+            logger.error(f"Error procesando lote de paquetes: {e}")
+
+    def take_report(self) -> Tuple[List, Optional[Dict], List, List]:
+        """
+        Vacía lo acumulado desde el último informe: (paquetes, delta, tramas,
+        nombres). Sin paquetes nuevos el delta es None y las estadísticas no
+        se recrean, así que un worker ocioso no envía ni reserva nada.
+        """
+        with self._lock:
+            if not self.stats['total']:
+                return [], None, [], self.hostnames.drain()
+            packets = self.records.drain()
+            frames = self.frames.drain()
+            delta, self.stats = self.stats, new_capture_stats()
+        return packets, delta, frames, self.hostnames.drain()
+
+
+def _worker_main(worker_id: int, interface: Optional[str], packet_filter: Optional[str],
+                 fanout_group: int, sampler, snaplen: int, results, stop_event):
+    """Punto de entrada de cada proceso worker"""
+    capture = WorkerCapture(sampler, snaplen)
+
+    try:
+        backend = create_backend(
+            "tpacket_v3",
+            interface=interface,
+            packet_filter=packet_filter,
+            on_batch=capture.process_batch,
+            should_stop=stop_event.is_set,
+            fanout_group=fanout_group,
+            snaplen=snaplen
+        )
+    except Exception as e:
+        results.put(("error", worker_id, f"{type(e).__name__}: {e}"))
+        return
+
+    def report():
+        results.put(("report", worker_id, *capture.take_report(), backend.get_kernel_stats()))
+
+    def reporter():
+        while not stop_event.wait(WORKER_REPORT_INTERVAL):
+            report()
+
+    reporter_thread = threading.Thread(target=reporter, daemon=True)
+    reporter_thread.start()
+    try:
+        backend.run()
+    except Exception as e:
+        results.put(("error", worker_id, f"{type(e).__name__}: {e}"))
+    finally:
+        stop_event.set()
+        reporter_thread.join()
+        report()
+        results.put(("done", worker_id))
+
+
+class FanoutWorkerPool:
+    """
+    Conjunto de procesos de captura unidos a un grupo PACKET_FANOUT.
+
+    Expone la misma interfaz que un backend (``run`` y ``get_kernel_stats``)
+    para que ``PacketCaptureService`` lo ejecute desde su thread de captura.
+    """
+
+    name = "fanout"
+
+    def __init__(
+        self,
+        workers: int,
+        interface: Optional[str],
+        packet_filter: Optional[str],
+        on_report: Callable[[List, Optional[Dict], List, List], None],
+        should_stop: Callable[[], bool],
+        sampler=None,
+        snaplen: int = SNAPLEN_MAX
+    ):
+        self.workers = workers
+        self.interface = interface
+        self.packet_filter = packet_filter
+        self.on_report = on_report
+        self.should_stop = should_stop
+        self.sampler = sampler
+        self.snaplen = snaplen
+        # El id de grupo de fanout es de 16 bits y único por pool dentro del proceso de la API
+        self.fanout_group = (os.getpid() + next(_fanout_groups)) & 0xFFFF
+        self._kernel_stats: Dict[int, Dict[str, int]] = {}
+
+    def run(self):
+        ctx = multiprocessing.get_context("spawn")
+        results = ctx.Queue()
+        stop_event = ctx.Event()
+        processes = [
+            ctx.Process(
+                target=_worker_main,
+                args=(worker_id, self.interface, self.packet_filter, self.fanout_group, self.sampler, self.snaplen, results, stop_event),
+                name=f"capture-worker-{worker_id}",
+                daemon=True
+            )
+            for worker_id in range(self.workers)
+        ]
+        for process in processes:
+            process.start()
+        logger.info(f"✓ {self.workers} workers de captura en grupo fanout {self.fanout_group}")
+
+        running = set(range(self.workers))
+        errors = []
+        try:
+            while running:
+                if self.should_stop() or errors:
+                    stop_event.set()
+                try:
+                    message = results.get(timeout=RESULT_POLL_TIMEOUT)
+                except queue.Empty:
+                    if stop_event.is_set() and not any(p.is_alive() for p in processes):
+                        break
+                    continue
+                kind, worker_id = message[0], message[1]
+                if kind == "report":
+                    _, _, packets, delta, frames, hostnames, kernel_stats = message
+                    self._kernel_stats[worker_id] = kernel_stats
+                    self.on_report(packets, delta, frames, hostnames)
+                elif kind == "error":
+                    logger.error(f"❌ Worker {worker_id}: {message[2]}")
+                    errors.append(message[2])
+                elif kind == "done":
+                    running.discard(worker_id)
+        finally:
+            stop_event.set()
+            for process in processes:
+                process.join(timeout=WORKER_JOIN_TIMEOUT)
+                if process.is_alive():
+                    process.terminate()
+
+        if errors and any("PermissionError" in e for e in errors):
+            raise PermissionError(errors[0])
+        if errors:
+            raise RuntimeError(errors[0])
+
+    def get_kernel_stats(self) -> Dict[str, int]:
+        totals: Dict[str, int] = {}
+        for stats in list(self._kernel_stats.values()):
+            for key, value in stats.items():
+                totals[key] = totals.get(key, 0) + value
+        return totals
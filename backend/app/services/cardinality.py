@@ -0,0 +1,264 @@
+"""
+Conteo de valores distintos con HyperLogLog.
+
+``HyperLogLog`` estima cuántas claves distintas se han visto con ``2^p``
+registros de un byte (4 KiB con p=12, error típico 1.04/√m ≈ 1.6%). Se
+fusiona tomando el máximo registro a registro, así que los resultados de
+workers y sesiones se combinan sin perder precisión.
+
+Sobre él:
+
+- ``DistinctWindow``: un HLL por minuto (del reloj de los paquetes) para los
+  últimos ``minutes`` minutos, p. ej. hosts destino distintos por minuto.
+- ``PerSourceDistinct``: puertos y hosts destino distintos por IP origen,
+  solo para las ``capacity`` fuentes más pesadas según el top-K de IPs
+  origen (una fuente nueva entra si supera a la más ligera vigilada).
+
+Cada clave se hashea una sola vez por lote con ``hash64``: los métodos
+``*_hashes`` reciben esos hashes para que la misma clave (una IP destino, un
+puerto) alimente varios HLL y los Count-Min sketches sin volver a hashearse.
+
+Un HLL poco poblado se serializa solo con sus registros no nulos, así que
+los deltas que envían los workers cada pocos cientos de milisegundos ocupan
+lo que han visto y no ``2^p`` bytes.
+
+Con muestreo los valores son los de la muestra: el número de distintos no
+escala linealmente con la tasa, así que no se extrapola.
+"""
+import hashlib
+import math
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .heavy_hitters import SpaceSaving
+
+_INV_POW2 = [2.0 ** -rank for rank in range(66)]
+
+
+def relative_error(precision: int) -> float:
+    """Error típico de un HyperLogLog con 2^precision registros"""
+    return 1.04 / math.sqrt(1 << precision)
+
+
+def hash64(key: Hashable) -> int:
+    """Hash de 64 bits estable entre procesos"""
+    return int.from_bytes(hashlib.blake2b(str(key).encode(), digest_size=8).digest(), "little")
+
+
+class HyperLogLog:
+    """Estimador de cardinalidad de memoria fija (2^precision bytes)"""
+
+    __slots__ = ("precision", "registers")
+
+    def __init__(self, precision: int = 12):
+        if not 4 <= precision <= 18:
+            raise ValueError("La precisión de HyperLogLog debe estar entre 4 y 18")
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def __getstate__(self):
+        # Poco poblado (los deltas de los workers, las fuentes con pocos destinos):
+        # solo los registros no nulos, 4 bytes de índice + 1 de valor por registro
+        registers = np.frombuffer(self.registers, dtype=np.uint8)
+        indices = np.flatnonzero(registers)
+        if len(indices) * 5 < len(registers):
+            return self.precision, indices.astype(np.uint32).tobytes(), registers[indices].tobytes()
+        return self.precision, bytes(self.registers)
+
+    def __setstate__(self, state):
+        if len(state) == 3:
+            self.precision, indices, ranks = state
+            self.registers = bytearray(1 << self.precision)
+            registers = np.frombuffer(self.registers, dtype=np.uint8)
+            registers[np.frombuffer(indices, dtype=np.uint32)] = np.frombuffer(ranks, dtype=np.uint8)
+        else:
+            self.precision, registers = state
+            self.registers = bytearray(registers)
+
+    @property
+    def relative_error(self) -> float:
+        return relative_error(self.precision)
+
+    def update_hashes(self, hashes: Iterable[int]):
+        """Añade claves ya hasheadas con ``hash64``"""
+        registers = self.registers
+        shift = 64 - self.precision
+        mask = (1 << shift) - 1
+        for hashed in hashes:
+            index = hashed >> shift
+            rank = shift - (hashed & mask).bit_length() + 1
+            if rank > registers[index]:
+                registers[index] = rank
+
+    def add_hash(self, hashed: int):
+        shift = 64 - self.precision
+        index = hashed >> shift
+        rank = shift - (hashed & ((1 << shift) - 1)).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def update(self, keys: Iterable[Hashable]):
+        self.update_hashes(map(hash64, keys))
+
+    def add(self, key: Hashable):
+        self.add_hash(hash64(key))
+
+    def count(self) -> int:
+        registers = self.registers
+        m = len(registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(map(_INV_POW2.__getitem__, registers))
+        if estimate <= 2.5 * m:
+            zeros = registers.count(0)
+            if zeros:
+                # Rango pequeño: conteo lineal
+                estimate = m * math.log(m / zeros)
+        return round(estimate)
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        if other.precision != self.precision:
+            raise ValueError("Solo se pueden fusionar HyperLogLog de la misma precisión")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def copy(self) -> "HyperLogLog":
+        clone = HyperLogLog.__new__(HyperLogLog)
+        clone.precision = self.precision
+        clone.registers = bytearray(self.registers)
+        return clone
+
+    def scaled(self, scale: float) -> "HyperLogLog":
+        return self.copy()
+
+    def clear(self):
+        self.registers = bytearray(len(self.registers))
+
+
+class DistinctWindow:
+    """Un HyperLogLog por minuto para los últimos ``minutes`` minutos"""
+
+    def __init__(self, minutes: int, precision: int):
+        self.minutes = minutes
+        self.precision = precision
+        self._windows: "OrderedDict[int, HyperLogLog]" = OrderedDict()
+
+    def update(self, timestamp: float, keys: Iterable[Hashable]):
+        self.update_hashes(timestamp, map(hash64, keys))
+
+    def update_hashes(self, timestamp: float, hashes: Iterable[int]):
+        """Añade al minuto de ``timestamp`` claves ya hasheadas con ``hash64``"""
+        minute = int(timestamp // 60)
+        window = self._windows.get(minute)
+        if window is None:
+            if self._windows and minute < next(iter(self._windows)):
+                return  # Más antiguo que la ventana retenida
+            window = self._windows[minute] = HyperLogLog(self.precision)
+            if minute < next(reversed(self._windows)):
+                self._windows = OrderedDict(sorted(self._windows.items()))
+            while len(self._windows) > self.minutes:
+                self._windows.popitem(last=False)
+        window.update_hashes(hashes)
+
+    def merge(self, other: "DistinctWindow") -> "DistinctWindow":
+        for minute, window in other._windows.items():
+            current = self._windows.get(minute)
+            if current is None:
+                self._windows[minute] = window.copy()
+            else:
+                current.merge(window)
+        self._windows = OrderedDict(sorted(self._windows.items())[-self.minutes:])
+        return self
+
+    def copy(self) -> "DistinctWindow":
+        clone = DistinctWindow(self.minutes, self.precision)
+        clone._windows = OrderedDict((minute, window.copy()) for minute, window in self._windows.items())
+        return clone
+
+    def scaled(self, scale: float) -> "DistinctWindow":
+        return self.copy()
+
+    def to_json(self) -> List[Dict[str, int]]:
+        return [
+            {"minute": minute * 60, "distinct": window.count()}
+            for minute, window in self._windows.items()
+        ]
+
+
+class PerSourceDistinct:
+    """Puertos y hosts destino distintos de las fuentes más pesadas"""
+
+    def __init__(self, capacity: int, precision: int):
+        self.capacity = capacity
+        self.precision = precision
+        # IP origen → [paquetes vigilados, HLL de puertos destino, HLL de hosts destino]
+        self._sources: Dict[str, List[Any]] = {}
+
+    def __len__(self) -> int:
+        return len(self._sources)
+
+    def update(self, flows: Iterable[Tuple[str, int, Optional[int], int]], heavy: SpaceSaving):
+        """
+        Añade ``(ip origen, hash de ip destino, hash de puerto destino o None,
+        paquetes)`` de un lote (hashes de ``hash64``).
+
+        Con la tabla llena, una fuente nueva sustituye a la más ligera según
+        ``heavy`` (top-K de IPs origen) si la supera.
+        """
+        sources = self._sources
+        lightest: Optional[Tuple[int, str]] = None
+        rejected = set()
+        for src, dst_hash, port_hash, packets in flows:
+            entry = sources.get(src)
+            if entry is None:
+                if src in rejected:
+                    continue
+                if len(sources) >= self.capacity:
+                    if lightest is None:
+                        lightest = min((heavy.get(ip), ip) for ip in sources)
+                    if heavy.get(src) <= lightest[0]:
+                        rejected.add(src)
+                        continue
+                    del sources[lightest[1]]
+                    lightest = None
+                entry = sources[src] = [0, HyperLogLog(self.precision), HyperLogLog(self.precision)]
+            entry[0] += packets
+            if port_hash is not None:
+                entry[1].add_hash(port_hash)
+            entry[2].add_hash(dst_hash)
+
+    def merge(self, other: "PerSourceDistinct") -> "PerSourceDistinct":
+        for src, (packets, ports, hosts) in other._sources.items():
+            entry = self._sources.get(src)
+            if entry is None:
+                self._sources[src] = [packets, ports.copy(), hosts.copy()]
+            else:
+                entry[0] += packets
+                entry[1].merge(ports)
+                entry[2].merge(hosts)
+        if len(self._sources) > self.capacity:
+            kept = sorted(self._sources.items(), key=lambda item: item[1][0], reverse=True)[:self.capacity]
+            self._sources = dict(kept)
+        return self
+
+    def copy(self) -> "PerSourceDistinct":
+        clone = PerSourceDistinct(self.capacity, self.precision)
+        clone._sources = {
+            src: [packets, ports.copy(), hosts.copy()]
+            for src, (packets, ports, hosts) in self._sources.items()
+        }
+        return clone
+
+    def scaled(self, scale: float) -> "PerSourceDistinct":
+        return self.copy()
+
+    def top(self, limit: int, sort: str = "ports") -> List[Dict[str, Any]]:
+        """Fuentes vigiladas ordenadas por puertos o hosts distintos (posibles escaneos)"""
+        rows = [
+            {"ip": src, "packets": packets, "distinct_ports": ports.count(), "distinct_hosts": hosts.count()}
+            for src, (packets, ports, hosts) in self._sources.items()
+        ]
+        key = "distinct_hosts" if sort == "hosts" else "distinct_ports"
+        rows.sort(key=lambda row: row[key], reverse=True)
+        return rows[:limit]
@@ -0,0 +1,304 @@
+"""
+Tabla de flujos bidireccionales.
+
+Cada flujo se identifica por la 5-tupla normalizada (extremos ordenados, así
+que ambos sentidos comparten entrada) empaquetada en un único entero: IPs de
+128 bits (IPv4 como ``::ffff:a.b.c.d``), puertos de 16 bits y protocolo. El
+sentido "forward" es el del iniciador (el primer paquete visto, salvo que sea
+un SYN-ACK, en cuyo caso el iniciador es el otro extremo).
+
+Por sentido se cuentan paquetes, bytes y flags TCP vistos (de los que se
+deriva el estado TCP). Los flujos TCP llevan además un ``TcpFlowState`` (RTT
+del handshake, retransmisiones y segmentos fuera de orden) que alimenta las
+métricas agregadas por IP remota (el extremo no local, sea iniciador o
+respondedor) y proceso de ``TcpMetrics``, y el nombre de
+host (SNI o Host HTTP) del primer segmento de datos del cliente, si lo hay.
+
+Los timeouts usan el reloj de los paquetes y una ``TimerWheel``: cada flujo
+tiene un único temporizador vigente y al vencer se comprueba si el flujo
+sigue activo (se reprograma) o expira:
+
+- ``idle``: sin paquetes durante ``idle_timeout``;
+- ``finished``: FIN en ambos sentidos o RST, tras ``FLOW_FIN_TIMEOUT``;
+- ``active``: el flujo lleva ``active_timeout`` abierto; se emite un registro
+  parcial y los contadores vuelven a cero (como NetFlow/IPFIX);
+- ``end``: fin de la captura (``flush``).
+
+Los registros emitidos se guardan en un histórico acotado.
+"""
+import socket
+from collections import deque
+from functools import lru_cache
+from typing import Any, Deque, Dict, List, Optional
+
+from .geoip import is_private_ip
+from .packet_dissector import TCP_FLAG_STRINGS
+from .packet_record import PacketRecord
+from .tcp_metrics import TcpFlowState, TcpMetrics
+from .timer_wheel import TimerWheel
+
+FLOW_TICK = 1.0  # Resolución de los timeouts (segundos)
+FLOW_FIN_TIMEOUT = 2.0  # Margen tras el cierre TCP para recoger retransmisiones y ACK finales
+
+TCP_FIN = 0x01
+TCP_SYN = 0x02
+TCP_RST = 0x04
+TCP_ACK = 0x10
+TCP_FLAG_BITS = {flags: bits for bits, flags in enumerate(TCP_FLAG_STRINGS)}
+
+PROTOCOL_NUMBERS = {"TCP": 6, "UDP": 17, "ICMP": 1}
+_IPV4_MAPPED = 0xFFFF << 32
+
+FORWARD = 0
+REVERSE = 1
+
+
+@lru_cache(maxsize=65536)
+def ip_to_int(ip: str) -> int:
+    """IP textual como entero de 128 bits (IPv4 mapeada en IPv6)"""
+    if ":" in ip:
+        return int.from_bytes(socket.inet_pton(socket.AF_INET6, ip), "big")
+    return _IPV4_MAPPED | int.from_bytes(socket.inet_aton(ip), "big")
+
+
+def flow_key(protocol: int, ip_a: int, port_a: int, ip_b: int, port_b: int) -> int:
+    """Clave entera de la 5-tupla con los extremos ya ordenados"""
+    return ((((ip_a << 16 | port_a) << 128 | ip_b) << 16 | port_b) << 8) | protocol
+
+
+def tcp_state(flags: int) -> str:
+    """Estado TCP de un sentido a partir de los flags vistos"""
+    if flags & TCP_RST:
+        return "RST"
+    if flags & TCP_FIN:
+        return "FIN"
+    if flags & TCP_ACK:
+        return "ESTABLISHED"
+    if flags & TCP_SYN:
+        return "SYN"
+    return "NONE"
+
+
+class Flow:
+    """Flujo bidireccional con contadores por sentido"""
+
+    __slots__ = (
+        "key", "protocol", "src_ip", "src_port", "dst_ip", "dst_port",
+        "first_seen", "last_seen", "packets", "bytes", "tcp_flags",
+        "finished", "timer_tick", "process", "hostname", "tcp", "remote",
+    )
+
+    def __init__(self, key: int, record: PacketRecord, timestamp: float, reverse: bool):
+        self.key = key
+        self.protocol = record.protocol
+        if reverse:
+            self.src_ip, self.src_port = record.dst_ip, record.dst_port
+            self.dst_ip, self.dst_port = record.src_ip, record.src_port
+        else:
+            self.src_ip, self.src_port = record.src_ip, record.src_port
+            self.dst_ip, self.dst_port = record.dst_ip, record.dst_port
+        self.first_seen = timestamp  # Inicio del periodo actual (se reinicia con el timeout activo)
+        self.last_seen = timestamp
+        self.packets = [0, 0]
+        self.bytes = [0, 0]
+        self.tcp_flags = [0, 0]
+        self.finished = False
+        self.timer_tick: Optional[int] = None
+        self.process: Optional[str] = record.process_name
+        self.hostname: Optional[str] = record.hostname  # SNI o Host HTTP del cliente
+        self.tcp: Optional[TcpFlowState] = TcpFlowState() if record.protocol == "TCP" else None
+        # IP remota de las métricas TCP: el respondedor salvo en conexiones entrantes a un equipo local
+        if is_private_ip(self.dst_ip) and not is_private_ip(self.src_ip):
+            self.remote = self.src_ip
+        else:
+            self.remote = self.dst_ip
+
+    def direction(self, record: PacketRecord) -> int:
+        if record.src_ip == self.src_ip and record.src_port == self.src_port:
+            return FORWARD
+        return REVERSE
+
+    def to_json(self, end_reason: Optional[str] = None) -> Dict[str, Any]:
+        record = {
+            "protocol": self.protocol,
+            "src_ip": self.src_ip,
+            "src_port": self.src_port,
+            "dst_ip": self.dst_ip,
+            "dst_port": self.dst_port,
+            "first_seen": self.first_seen,
+            "last_seen": self.last_seen,
+            "duration": self.last_seen - self.first_seen,
+            "packets_fwd": self.packets[FORWARD],
+            "packets_rev": self.packets[REVERSE],
+            "bytes_fwd": self.bytes[FORWARD],
+            "bytes_rev": self.bytes[REVERSE],
+        }
+        if self.process:
+            record["process"] = self.process
+        if self.hostname:
+            record["hostname"] = self.hostname
+        if self.tcp is not None:
+            record["tcp_state_fwd"] = tcp_state(self.tcp_flags[FORWARD])
+            record["tcp_state_rev"] = tcp_state(self.tcp_flags[REVERSE])
+            record.update(self.tcp.to_json())
+        if end_reason is not None:
+            record["end_reason"] = end_reason
+        return record
+
+
+class FlowTable:
+    """Flujos activos indexados por clave entera, con expiración por rueda de temporizadores"""
+
+    def __init__(self, idle_timeout: float, active_timeout: float, max_flows: int, history: int):
+        self.idle_timeout = idle_timeout
+        self.active_timeout = active_timeout
+        self.max_flows = max_flows
+        self._flows: Dict[int, Flow] = {}
+        self._wheel = TimerWheel(FLOW_TICK)
+        self.tcp_metrics = TcpMetrics()
+        self.expired: Deque[Dict[str, Any]] = deque(maxlen=history)
+        self.expired_total = 0
+        self.dropped = 0  # Paquetes de flujos nuevos descartados por tabla llena
+        self.now = 0.0  # Reloj de paquetes
+
+    def __len__(self) -> int:
+        return len(self._flows)
+
+    def update(self, records: List[PacketRecord]):
+        """Contabiliza un lote de paquetes y expira los flujos vencidos"""
+        if not records:
+            return
+        flows = self._flows
+        if not self._wheel.started:
+            self._wheel.advance(records[0].timestamp)
+        now = self.now
+        for record in records:
+            protocol = PROTOCOL_NUMBERS.get(record.protocol, 0)
+            src = (ip_to_int(record.src_ip), record.src_port or 0)
+            dst = (ip_to_int(record.dst_ip), record.dst_port or 0)
+            if dst < src:
+                key = flow_key(protocol, dst[0], dst[1], src[0], src[1])
+            else:
+                key = flow_key(protocol, src[0], src[1], dst[0], dst[1])
+            timestamp = record.timestamp
+            flow = flows.get(key)
+            if flow is None:
+                if len(flows) >= self.max_flows:
+                    self.dropped += 1
+                    continue
+                # Un SYN-ACK como primer paquete: el iniciador es el destino
+                flow = Flow(key, record, timestamp, reverse=record.flags == "SA")
+                flows[key] = flow
+                self._schedule(flow, self._due(flow)[0])
+            direction = flow.direction(record)
+            flow.packets[direction] += 1
+            flow.bytes[direction] += record.length
+            if timestamp > flow.last_seen:
+                flow.last_seen = timestamp
+            if flow.process is None and record.process_name:
+                flow.process = record.process_name
+            if flow.hostname is None and record.hostname:
+                flow.hostname = record.hostname
+            if flow.tcp is not None:
+                flag_bits = TCP_FLAG_BITS.get(record.flags, 0) if record.flags else 0
+                flow.tcp_flags[direction] |= flag_bits
+                flow.tcp.update(direction, flag_bits, record, self.tcp_metrics, flow.remote, flow.process)
+                if not flow.finished and self._tcp_finished(flow):
+                    flow.finished = True
+                    self._schedule(flow, flow.last_seen + FLOW_FIN_TIMEOUT)
+            if timestamp > now:
+                now = timestamp
+        self.advance(now)
+
+    @staticmethod
+    def _tcp_finished(flow: Flow) -> bool:
+        forward, reverse = flow.tcp_flags
+        return bool((forward | reverse) & TCP_RST) or bool(forward & reverse & TCP_FIN)
+
+    def _schedule(self, flow: Flow, deadline: float):
+        """Programa el temporizador del flujo si vence antes que el vigente"""
+        tick = self._wheel.to_tick(deadline)
+        if flow.timer_tick is not None and flow.timer_tick <= tick:
+            return
+        flow.timer_tick = self._wheel.schedule(flow, deadline)
+
+    def _due(self, flow: Flow):
+        """Próximo vencimiento del flujo y su motivo"""
+        if flow.finished:
+            due, reason = flow.last_seen + FLOW_FIN_TIMEOUT, "finished"
+        else:
+            due, reason = flow.last_seen + self.idle_timeout, "idle"
+        active_due = flow.first_seen + self.active_timeout
+        if self.active_timeout and active_due < due:
+            return active_due, "active"
+        return due, reason
+
+    def advance(self, now: float):
+        """Avanza el reloj de paquetes hasta ``now`` procesando los temporizadores vencidos"""
+        if now < self.now:
+            return
+        self.now = now
+        for tick, flow in self._wheel.advance(now):
+            if tick != flow.timer_tick:
+                continue  # Temporizador sustituido por uno anterior
+            flow.timer_tick = None
+            if self._flows.get(flow.key) is not flow:
+                continue
+            due, reason = self._due(flow)
+            if due > now:
+                self._schedule(flow, due)
+            elif reason == "active":
+                self._emit(flow, reason)
+                flow.first_seen = now
+                flow.packets = [0, 0]
+                flow.bytes = [0, 0]
+                self._schedule(flow, min(now + self.active_timeout, flow.last_seen + self.idle_timeout))
+            else:
+                del self._flows[flow.key]
+                self._emit(flow, reason)
+
+    def _emit(self, flow: Flow, reason: str):
+        if flow.packets[FORWARD] or flow.packets[REVERSE]:
+            self.expired.append(flow.to_json(reason))
+            self.expired_total += 1
+
+    def flush(self):
+        """Expira todos los flujos activos (fin de la captura)"""
+        for flow in list(self._flows.values()):
+            self._emit(flow, "end")
+        self._flows.clear()
+        self._wheel.clear()
+
+    def clear(self):
+        self._flows.clear()
+        self._wheel.clear()
+        self.expired.clear()
+        self.tcp_metrics.clear()
+        self.expired_total = 0
+        self.dropped = 0
+        self.now = 0.0
+
+    def active(self, limit: int = 100, sort: str = "bytes") -> List[Dict[str, Any]]:
+        """Flujos activos ordenados por bytes, paquetes o última actividad"""
+        if sort == "bytes":
+            sort_key = lambda flow: flow.bytes[FORWARD] + flow.bytes[REVERSE]
+        elif sort == "packets":
+            sort_key = lambda flow: flow.packets[FORWARD] + flow.packets[REVERSE]
+        else:
+            sort_key = lambda flow: flow.last_seen
+        flows = sorted(self._flows.values(), key=sort_key, reverse=True)[:limit]
+        return [flow.to_json() for flow in flows]
+
+    def recent_expired(self, limit: int = 100) -> List[Dict[str, Any]]:
+        """Últimos registros de flujo emitidos, del más reciente al más antiguo"""
+        records = list(self.expired)[-limit:] if limit > 0 else []
+        records.reverse()
+        return records
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            "active": len(self._flows),
+            "expired": self.expired_total,
+            "dropped": self.dropped,
+            "timers": self._wheel.pending,
+        }
@@ -0,0 +1,83 @@
+"""
+Buffer de tramas crudas retenidas para exportación.
+
+Guarda las últimas tramas capturadas como ``(timestamp, linktype, datos,
+longitud original)`` hasta un presupuesto de bytes (``FRAME_BUFFER_BYTES``); al superarlo descarta
+las más antiguas. Cada trama tiene un número de secuencia creciente para que
+un lector (la exportación pcap) pueda recorrer el buffer por trozos mientras
+la captura sigue escribiendo.
+
+No es thread-safe: ``PacketCaptureService`` lo protege con su lock.
+"""
+from collections import deque
+from itertools import islice
+from typing import List, Tuple
+
+# (timestamp, linktype, datos recortados al snaplen, longitud original en el cable)
+RawFrame = Tuple[float, int, bytes, int]
+
+
+class FrameBuffer:
+    """Ventana deslizante de tramas crudas limitada en bytes"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._frames = deque()
+        self._bytes = 0
+        self._first_seq = 0  # Secuencia de _frames[0]
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    @property
+    def nbytes(self) -> int:
+        return self._bytes
+
+    @property
+    def first_seq(self) -> int:
+        return self._first_seq
+
+    @property
+    def end_seq(self) -> int:
+        """Secuencia que tendrá la próxima trama"""
+        return self._first_seq + len(self._frames)
+
+    def extend(self, frames: List[RawFrame]):
+        """Añade tramas descartando las más antiguas si se supera el presupuesto"""
+        if not self.enabled:
+            return
+        append = self._frames.append
+        for frame in frames:
+            append(frame)
+            self._bytes += len(frame[2])
+        while self._bytes > self.max_bytes and self._frames:
+            self._bytes -= len(self._frames.popleft()[2])
+            self._first_seq += 1
+
+    def read(self, seq: int, limit: int) -> Tuple[int, List[RawFrame]]:
+        """
+        Lee hasta ``limit`` tramas desde ``seq``.
+
+        Si ``seq`` ya fue descartada se empieza por la más antigua disponible.
+        Devuelve la secuencia siguiente a la última leída y las tramas.
+        """
+        seq = max(seq, self._first_seq)
+        start = seq - self._first_seq
+        frames = list(islice(self._frames, start, start + limit))
+        return seq + len(frames), frames
+
+    def drain(self) -> List[RawFrame]:
+        """Devuelve todas las tramas y vacía el buffer"""
+        frames = list(self._frames)
+        self.clear()
+        return frames
+
+    def clear(self):
+        """Vacía el buffer manteniendo la numeración de secuencia"""
+        self._first_seq = self.end_seq
+        self._frames.clear()
+        self._bytes = 0
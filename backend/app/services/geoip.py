@@ -4,6 +4,7 @@ Usa ip-api.com (gratis, 45 req/min)
 """
 import httpx
 import asyncio
+import time
 from typing import Optional, Dict
 from functools import lru_cache
 import ipaddress
@@ -11,12 +12,17 @@ import ipaddress
 # Cache de geolocalización
 geo_cache: Dict[str, dict] = {}
 
+# IPs que ip-api no sabe ubicar (rangos reservados, consultas inválidas) → caducidad (monotonic)
+geo_failures: Dict[str, float] = {}
+GEO_FAILURE_TTL = 3600  # Segundos antes de volver a preguntar por una IP sin ubicación
+
 
 def is_private_ip(ip: str) -> bool:
-    """Verifica si una IP es privada/local"""
+    """Verifica si una IP es privada/local (o multicast/reservada: no tiene ubicación)"""
     try:
         ip_obj = ipaddress.ip_address(ip)
-        return ip_obj.is_private or ip_obj.is_loopback or ip_obj.is_link_local
+        return (ip_obj.is_private or ip_obj.is_loopback or ip_obj.is_link_local
+                or ip_obj.is_multicast or ip_obj.is_reserved or ip_obj.is_unspecified)
     except ValueError:
         return True  # Si no es válida, tratarla como local
 
@@ -75,9 +81,15 @@ async def get_batch_locations(ips: list[str]) -> Dict[str, dict]:
     """
     Obtiene ubicaciones para múltiples IPs (más eficiente)
     ip-api.com soporta batch requests hasta 100 IPs
+    
+    Las IPs que ip-api no sabe ubicar van con ``{}`` (y no se vuelven a
+    preguntar durante ``GEO_FAILURE_TTL``). Las que faltan en el resultado
+    no se han podido consultar (error de red, límite de ip-api o más de 100
+    IPs nuevas): otra llamada puede resolverlas.
     """
     results = {}
     external_ips = []
+    now = time.monotonic()
     
     # Procesar IPs locales primero
     for ip in ips:
@@ -92,6 +104,8 @@ async def get_batch_locations(ips: list[str]) -> Dict[str, dict]:
             }
         elif ip in geo_cache:
             results[ip] = geo_cache[ip]
+        elif geo_failures.get(ip, 0) > now:
+            results[ip] = {}
         else:
             external_ips.append(ip)
     
@@ -121,6 +135,10 @@ async def get_batch_locations(ips: list[str]) -> Dict[str, dict]:
                             }
                             geo_cache[ip] = result
                             results[ip] = result
+                        elif item.get("query"):
+                            # Respuesta definitiva sin ubicación (p. ej. "reserved range")
+                            geo_failures[item["query"]] = now + GEO_FAILURE_TTL
+                            results[item["query"]] = {}
         except Exception as e:
             print(f"[GeoIP] Error en batch request: {e}")
     
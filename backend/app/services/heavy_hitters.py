@@ -0,0 +1,249 @@
+"""
+Top-K de elementos más frecuentes con Space-Saving (Metwally et al.).
+
+``SpaceSaving`` vigila como mucho ``capacity`` claves. Una clave vigilada
+suma en O(1) (un dict). Una clave nueva con el resumen lleno sustituye a la
+de menor contador y hereda ese contador como error: su cuenta real está en
+``[count - error, count]``. Cualquier clave no vigilada tiene como mucho
+``min_count`` (≤ total / capacity) ocurrencias. El mínimo se obtiene de un
+heap perezoso: las entradas se actualizan solo al llegar a la cima, así que
+la sustitución cuesta O(log k) amortizado.
+
+Cada clave vigilada lleva además un volumen (bytes) que se suma en la misma
+operación. Las claves se eligen por contador (paquetes): ``top(by="volume")``
+ordena por volumen las claves vigiladas y una clave que entra hereda también
+el volumen de la sustituida como error, pero no hay cota para el volumen de
+las claves no vigiladas.
+
+Los resúmenes son fusionables (workers, sesiones) y escalables (muestreo),
+y ``top`` lee solo las ``capacity`` claves vigiladas, no todo el tráfico.
+"""
+import heapq
+from typing import Any, Dict, Hashable, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+
+class SpaceSaving:
+    """Contadores y volúmenes aproximados de las claves más frecuentes con memoria fija"""
+
+    __slots__ = ("capacity", "total", "total_volume", "_counts", "_errors", "_volumes", "_volume_errors", "_heap")
+
+    def __init__(self, capacity: int):
+        if capacity < 1:
+            raise ValueError("La capacidad del resumen Space-Saving debe ser positiva")
+        self.capacity = capacity
+        self.total = 0
+        self.total_volume = 0
+        self._counts: Dict[Hashable, int] = {}
+        self._errors: Dict[Hashable, int] = {}
+        self._volumes: Dict[Hashable, int] = {}
+        self._volume_errors: Dict[Hashable, int] = {}
+        self._heap: List[Tuple[int, Hashable]] = []  # (contador, clave); puede estar desfasado
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._counts
+
+    def __getstate__(self):
+        return (
+            self.capacity, self.total, self.total_volume,
+            self._counts, self._errors, self._volumes, self._volume_errors,
+        )
+
+    def __setstate__(self, state):
+        (
+            self.capacity, self.total, self.total_volume,
+            self._counts, self._errors, self._volumes, self._volume_errors,
+        ) = state
+        self._rebuild_heap()
+
+    def _rebuild_heap(self):
+        self._heap = [(count, key) for key, count in self._counts.items()]
+        heapq.heapify(self._heap)
+
+    @property
+    def min_count(self) -> int:
+        """Cota de las claves no vigiladas (0 mientras el resumen no está lleno)"""
+        if len(self._counts) < self.capacity:
+            return 0
+        return self._peek_min()[0]
+
+    def _peek_min(self) -> Tuple[int, Hashable]:
+        heap = self._heap
+        counts = self._counts
+        while True:
+            count, key = heap[0]
+            current = counts[key]
+            if current == count:
+                return count, key
+            heapq.heapreplace(heap, (current, key))
+
+    def _floor_volume(self) -> int:
+        """Volumen que hereda una clave nueva (el de la de menor contador)"""
+        if len(self._counts) < self.capacity:
+            return 0
+        return self._volumes[self._peek_min()[1]]
+
+    def add(self, key: Hashable, weight: int = 1, volume: int = 0):
+        self.total += weight
+        self.total_volume += volume
+        counts = self._counts
+        count = counts.get(key)
+        if count is not None:
+            counts[key] = count + weight
+            self._volumes[key] += volume
+            return
+        if len(counts) < self.capacity:
+            counts[key] = weight
+            self._errors[key] = 0
+            self._volumes[key] = volume
+            self._volume_errors[key] = 0
+            heapq.heappush(self._heap, (weight, key))
+            return
+        floor, victim = self._peek_min()
+        floor_volume = self._volumes.pop(victim)
+        del counts[victim]
+        del self._errors[victim]
+        del self._volume_errors[victim]
+        counts[key] = floor + weight
+        self._errors[key] = floor
+        self._volumes[key] = floor_volume + volume
+        self._volume_errors[key] = floor_volume
+        heapq.heapreplace(self._heap, (floor + weight, key))
+
+    def update(self, items: Mapping[Hashable, int]):
+        """Suma un lote ya agregado (clave → peso)"""
+        add = self.add
+        for key, weight in items.items():
+            add(key, weight)
+
+    def update_pairs(self, items: Mapping[Hashable, Sequence[int]]):
+        """Suma un lote ya agregado (clave → (peso, volumen))"""
+        add = self.add
+        for key, (weight, volume) in items.items():
+            add(key, weight, volume)
+
+    def get(self, key: Hashable, default: int = 0) -> int:
+        return self._counts.get(key, default)
+
+    def get_volume(self, key: Hashable, default: int = 0) -> int:
+        return self._volumes.get(key, default)
+
+    def error(self, key: Hashable) -> int:
+        """Sobreestimación máxima del contador de ``key`` (cota global si no está vigilada)"""
+        error = self._errors.get(key)
+        return self.min_count if error is None else error
+
+    def _metric(self, by: str) -> Tuple[Dict[Hashable, int], Dict[Hashable, int]]:
+        if by == "volume":
+            return self._volumes, self._volume_errors
+        return self._counts, self._errors
+
+    def top(self, limit: int, by: str = "count") -> List[Tuple[Hashable, int, int]]:
+        """
+        Las ``limit`` claves con mayor contador (o volumen con ``by="volume"``)
+        como (clave, valor, error)
+        """
+        if limit <= 0:
+            return []
+        values, errors = self._metric(by)
+        items = heapq.nlargest(limit, values.items(), key=lambda item: item[1])
+        return [(key, value, errors[key]) for key, value in items]
+
+    def top_dict(self, limit: int, by: str = "count") -> Dict[Hashable, int]:
+        return {key: value for key, value, _ in self.top(limit, by)}
+
+    def error_bounds(self, limit: int, by: str = "count") -> Dict[str, Any]:
+        """
+        Cotas de error del top: cada valor sobreestima como mucho su
+        ``errors[clave]``; ``guaranteed`` indica las claves que seguro están
+        en el top real (su mínimo supera el valor de la siguiente). Por
+        volumen no hay cota global (``max_error`` None) y ``guaranteed`` solo
+        compara con las claves vigiladas.
+        """
+        top = self.top(limit + 1, by)
+        floor: Optional[int] = self.min_count if by == "count" else None
+        next_value = top[limit][1] if len(top) > limit else (floor or 0)
+        top = top[:limit]
+        return {
+            "total": self.total_volume if by == "volume" else self.total,
+            "capacity": self.capacity,
+            "max_error": floor,
+            "errors": {key: error for key, _, error in top},
+            "guaranteed": [key for key, value, error in top if value - error >= next_value],
+        }
+
+    def merge(self, other: "SpaceSaving") -> "SpaceSaving":
+        """Fusiona ``other`` en este resumen (las claves ausentes valen el mínimo del otro)"""
+        own_floor, own_floor_volume = self.min_count, self._floor_volume()
+        other_floor, other_floor_volume = other.min_count, other._floor_volume()
+        counts: Dict[Hashable, int] = {}
+        errors: Dict[Hashable, int] = {}
+        volumes: Dict[Hashable, int] = {}
+        volume_errors: Dict[Hashable, int] = {}
+        for key in self._counts.keys() | other._counts.keys():
+            own = self._counts.get(key)
+            theirs = other._counts.get(key)
+            counts[key] = (own if own is not None else own_floor) + (theirs if theirs is not None else other_floor)
+            errors[key] = (
+                (self._errors[key] if own is not None else own_floor)
+                + (other._errors[key] if theirs is not None else other_floor)
+            )
+            volumes[key] = (
+                (self._volumes[key] if own is not None else own_floor_volume)
+                + (other._volumes[key] if theirs is not None else other_floor_volume)
+            )
+            volume_errors[key] = (
+                (self._volume_errors[key] if own is not None else own_floor_volume)
+                + (other._volume_errors[key] if theirs is not None else other_floor_volume)
+            )
+        if len(counts) > self.capacity:
+            kept = heapq.nlargest(self.capacity, counts.items(), key=lambda item: item[1])
+            counts = dict(kept)
+            errors = {key: errors[key] for key in counts}
+            volumes = {key: volumes[key] for key in counts}
+            volume_errors = {key: volume_errors[key] for key in counts}
+        self._counts = counts
+        self._errors = errors
+        self._volumes = volumes
+        self._volume_errors = volume_errors
+        self.total += other.total
+        self.total_volume += other.total_volume
+        self._rebuild_heap()
+        return self
+
+    def copy(self) -> "SpaceSaving":
+        clone = SpaceSaving(self.capacity)
+        clone.total = self.total
+        clone.total_volume = self.total_volume
+        clone._counts = dict(self._counts)
+        clone._errors = dict(self._errors)
+        clone._volumes = dict(self._volumes)
+        clone._volume_errors = dict(self._volume_errors)
+        clone._heap = list(self._heap)
+        return clone
+
+    def scaled(self, scale: float) -> "SpaceSaving":
+        """Copia con contadores, volúmenes y errores multiplicados por ``scale`` (totales estimados)"""
+        clone = SpaceSaving(self.capacity)
+        clone.total = round(self.total * scale)
+        clone.total_volume = round(self.total_volume * scale)
+        clone._counts = {key: round(count * scale) for key, count in self._counts.items()}
+        clone._errors = {key: round(error * scale) for key, error in self._errors.items()}
+        clone._volumes = {key: round(volume * scale) for key, volume in self._volumes.items()}
+        clone._volume_errors = {key: round(error * scale) for key, error in self._volume_errors.items()}
+        clone._rebuild_heap()
+        return clone
+
+    def clear(self):
+        self.total = 0
+        self.total_volume = 0
+        self._counts.clear()
+        self._errors.clear()
+        self._volumes.clear()
+        self._volume_errors.clear()
+        self._heap.clear()
+
+    def items(self) -> Iterable[Tuple[Hashable, int]]:
+        return self._counts.items()
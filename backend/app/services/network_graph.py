@@ -0,0 +1,215 @@
+"""
+Grafo incremental del mapa de red.
+
+``NetworkGraph`` mantiene una tabla de nodos con IDs enteros (IP → ID y
+arrays por ID con tráfico y clasificación) y una tabla de aristas indexada
+por ``(id origen, id destino)`` con paquetes y bytes. ``_update_stats`` la
+actualiza con los pares IP origen/destino ya agregados del lote, así que el
+endpoint ya no parte cadenas ``"src->dst"`` ni reconstruye el grafo.
+
+Cada actualización toma una versión de un contador global y monotónico y
+marca con ella los nodos y aristas que toca. ``view(since)`` devuelve solo
+lo cambiado después de ``since``; si ``since`` es anterior a la creación
+del grafo (la sesión se ha reseteado) devuelve el grafo completo con
+``full=True`` para que el cliente lo sustituya en lugar de fusionarlo.
+
+La clasificación de cada nodo (local o no, tipo de red) se calcula una sola
+vez, al servir el grafo por primera vez con ese nodo (nunca en los workers).
+Nodos y aristas están acotados: lo que no cabe se cuenta en ``dropped`` en
+lugar de crecer sin límite.
+"""
+import itertools
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+from .geoip import get_network_label, is_private_ip
+
+# Versiones compartidas por todos los grafos del proceso: tras un reset las del grafo nuevo son mayores
+_VERSIONS = itertools.count(1)
+
+
+class NetworkGraph:
+    """Nodos (IPs con ID entero) y aristas con paquetes y bytes, versionados"""
+
+    def __init__(self, max_nodes: int, max_edges: int):
+        self.max_nodes = max_nodes
+        self.max_edges = max_edges
+        self.base = self.version = next(_VERSIONS)
+        self.total = 0  # Paquetes de todas las conexiones vistas
+        self.total_bytes = 0
+        self.dropped = 0  # Paquetes de conexiones que no cupieron en el grafo
+        self._ids: Dict[str, int] = {}
+        self._ips: List[str] = []
+        self._traffic: List[int] = []
+        self._bytes: List[int] = []
+        self._node_versions: List[int] = []
+        self._labels: List[Optional[Tuple[bool, str]]] = []  # (is_local, tipo de red), perezoso
+        self._edges: Dict[Tuple[int, int], List[int]] = {}  # (origen, destino) → [paquetes, bytes, versión]
+        self._local_nodes = 0
+
+    def __len__(self) -> int:
+        return len(self._ips)
+
+    def _node(self, ip: str, traffic: int, volume: int, version: int,
+              label: Optional[Tuple[bool, str]] = None) -> Optional[int]:
+        """ID de ``ip`` (creándolo si cabe) tras sumarle ``traffic`` paquetes y ``volume`` bytes"""
+        node = self._ids.get(ip)
+        if node is None:
+            if len(self._ips) >= self.max_nodes:
+                return None
+            node = self._ids[ip] = len(self._ips)
+            self._ips.append(ip)
+            self._traffic.append(0)
+            self._bytes.append(0)
+            self._node_versions.append(version)
+            self._labels.append(None)
+        if label is not None and self._labels[node] is None:
+            self._set_label(node, label)
+        self._traffic[node] += traffic
+        self._bytes[node] += volume
+        self._node_versions[node] = version
+        return node
+
+    def _set_label(self, node: int, label: Tuple[bool, str]):
+        self._labels[node] = label
+        if label[0]:
+            self._local_nodes += 1
+
+    def _label(self, node: int) -> Tuple[bool, str]:
+        label = self._labels[node]
+        if label is None:
+            ip = self._ips[node]
+            label = (is_private_ip(ip), get_network_label(ip))
+            self._set_label(node, label)
+        return label
+
+    def _link(self, source: Optional[int], target: Optional[int], count: int, volume: int, version: int):
+        if source is None or target is None:
+            self.dropped += count
+            return
+        key = (source, target)
+        edge = self._edges.get(key)
+        if edge is None:
+            if len(self._edges) >= self.max_edges:
+                self.dropped += count
+                return
+            self._edges[key] = [count, volume, version]
+        else:
+            edge[0] += count
+            edge[1] += volume
+            edge[2] = version
+
+    def update(self, pairs: Mapping[Tuple[str, str], Sequence[int]]):
+        """Suma un lote agregado ``(ip origen, ip destino) → (paquetes, bytes)``"""
+        if not pairs:
+            return
+        self.version = version = next(_VERSIONS)
+        node = self._node
+        link = self._link
+        for (src, dst), (count, volume) in pairs.items():
+            self.total += count
+            self.total_bytes += volume
+            link(node(src, count, volume, version), node(dst, count, volume, version), count, volume, version)
+
+    def merge(self, other: "NetworkGraph") -> "NetworkGraph":
+        """Fusiona ``other`` traduciendo sus IDs a los de este grafo"""
+        if not other._ips:
+            return self
+        self.version = version = next(_VERSIONS)
+        ids = [
+            self._node(ip, traffic, volume, version, label)
+            for ip, traffic, volume, label in zip(other._ips, other._traffic, other._bytes, other._labels)
+        ]
+        for (source, target), (count, volume, _) in other._edges.items():
+            self._link(ids[source], ids[target], count, volume, version)
+        self.total += other.total
+        self.total_bytes += other.total_bytes
+        self.dropped += other.dropped
+        return self
+
+    def copy(self) -> "NetworkGraph":
+        """Copia con los mismos IDs y versiones"""
+        clone = NetworkGraph.__new__(NetworkGraph)
+        clone.__dict__.update(self.__dict__)
+        clone._ids = dict(self._ids)
+        clone._ips = list(self._ips)
+        clone._traffic = list(self._traffic)
+        clone._bytes = list(self._bytes)
+        clone._node_versions = list(self._node_versions)
+        clone._labels = list(self._labels)
+        clone._edges = {key: list(edge) for key, edge in self._edges.items()}
+        return clone
+
+    def scaled(self, scale: float) -> "NetworkGraph":
+        """Copia con los contadores multiplicados por ``scale`` (totales estimados)"""
+        clone = self.copy()
+        clone._traffic = [round(traffic * scale) for traffic in self._traffic]
+        clone._bytes = [round(volume * scale) for volume in self._bytes]
+        clone._edges = {
+            key: [round(count * scale), round(volume * scale), version]
+            for key, (count, volume, version) in self._edges.items()
+        }
+        clone.total = round(self.total * scale)
+        clone.total_bytes = round(self.total_bytes * scale)
+        clone.dropped = round(self.dropped * scale)
+        return clone
+
+    def view(self, since: Optional[int] = None, scale: float = 1.0, metric: str = "packets") -> Dict:
+        """
+        Nodos y enlaces cambiados después de la versión ``since`` (todos si es
+        None o anterior a la creación del grafo), con contadores por ``scale``.
+        ``traffic`` y ``value`` son paquetes o bytes según ``metric``.
+        """
+        by_bytes = metric == "bytes"
+        for node, label in enumerate(self._labels):
+            if label is None:
+                self._label(node)  # Nodos nuevos: el contador de locales queda exacto
+        full = since is None or since < self.base
+        if full:
+            nodes = range(len(self._ips))
+            edges = self._edges.items()
+        else:
+            nodes = [node for node, version in enumerate(self._node_versions) if version > since]
+            edges = [(key, edge) for key, edge in self._edges.items() if edge[2] > since]
+        node_rows = []
+        for node in nodes:
+            is_local, network_type = self._label(node)
+            packets = round(self._traffic[node] * scale)
+            volume = round(self._bytes[node] * scale)
+            node_rows.append({
+                "id": node,
+                "ip": self._ips[node],
+                "isLocal": is_local,
+                "networkType": network_type,
+                "traffic": volume if by_bytes else packets,
+                "packets": packets,
+                "bytes": volume,
+            })
+        links = []
+        for (source, target), (count, volume, _) in edges:
+            packets = round(count * scale)
+            volume = round(volume * scale)
+            links.append({
+                "source": source,
+                "target": target,
+                "value": volume if by_bytes else packets,
+                "packets": packets,
+                "bytes": volume,
+            })
+        local_nodes = self._local_nodes
+        return {
+            "version": self.version,
+            "since": since,
+            "full": full,
+            "metric": metric,
+            "nodes": node_rows,
+            "links": links,
+            "summary": {
+                "total_nodes": len(self._ips),
+                "local_nodes": local_nodes,
+                "external_nodes": len(self._ips) - local_nodes,
+                "total_links": len(self._edges),
+                "total_connections": round(self.total * scale),
+                "total_bytes": round(self.total_bytes * scale),
+                "dropped_connections": round(self.dropped * scale),
+            },
+        }
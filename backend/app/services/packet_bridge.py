@@ -0,0 +1,109 @@
+"""
+Puente thread de captura → asyncio.
+
+Cada cliente (WebSocket) se suscribe con su event loop y recibe un ring
+acotado propio. El thread de captura escribe los lotes en los rings de todos
+los suscriptores y solo despierta al loop (``call_soon_threadsafe``) cuando
+un ring pasa de vacío a no vacío, así que no hay polling ni una llamada al
+loop por paquete. Si un cliente no consume a tiempo se descartan sus paquetes
+más antiguos y se contabilizan en ``drops``.
+"""
+import asyncio
+import threading
+from collections import deque
+from typing import Dict, List
+
+from .packet_record import PacketRecord
+
+BRIDGE_RING_SIZE = 4096
+
+
+class BridgeSubscription:
+    """Ring de un suscriptor y el evento asyncio que lo despierta"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, capacity: int, lock: threading.Lock):
+        self.loop = loop
+        self.capacity = capacity
+        self._lock = lock  # Lock del puente (compartido con publish)
+        self.ring = deque()
+        self.ready = asyncio.Event()
+        self.drops = 0
+
+    async def get(self) -> List[PacketRecord]:
+        """Espera a que haya paquetes y los devuelve todos"""
+        while True:
+            await self.ready.wait()
+            # Limpiar antes de vaciar: un publish posterior volverá a despertar
+            self.ready.clear()
+            packets = self._drain()
+            if packets:
+                return packets
+
+    def _drain(self) -> List[PacketRecord]:
+        with self._lock:
+            packets = list(self.ring)
+            self.ring.clear()
+        return packets
+
+
+class PacketBridge:
+    """Distribuye lotes de paquetes del thread de captura a los suscriptores asyncio"""
+
+    def __init__(self, capacity: int = BRIDGE_RING_SIZE):
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self._subscriptions: List[BridgeSubscription] = []
+        self.published = 0
+        self.drops = 0
+        self.high_water = 0
+
+    def subscribe(self, loop: asyncio.AbstractEventLoop) -> BridgeSubscription:
+        subscription = BridgeSubscription(loop, self.capacity, self._lock)
+        with self._lock:
+            self._subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: BridgeSubscription):
+        with self._lock:
+            if subscription in self._subscriptions:
+                self._subscriptions.remove(subscription)
+
+    def publish(self, records: List[PacketRecord]):
+        """Llamado desde el thread de captura con cada lote"""
+        if not records:
+            return
+        with self._lock:
+            self.published += len(records)
+            for subscription in self._subscriptions:
+                ring = subscription.ring
+                was_empty = not ring
+                ring.extend(records)
+                overflow = len(ring) - subscription.capacity
+                if overflow > 0:
+                    for _ in range(overflow):
+                        ring.popleft()
+                    subscription.drops += overflow
+                    self.drops += overflow
+                if len(ring) > self.high_water:
+                    self.high_water = len(ring)
+                if was_empty:
+                    try:
+                        subscription.loop.call_soon_threadsafe(subscription.ready.set)
+                    except RuntimeError:
+                        pass  # Loop cerrado: el suscriptor se está desconectando
+
+    def reset_counters(self):
+        with self._lock:
+            self.published = 0
+            self.drops = 0
+            self.high_water = 0
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "subscribers": len(self._subscriptions),
+                "published": self.published,
+                "drops": self.drops,
+                "high_water": self.high_water,
+                "capacity": self.capacity,
+            }
@@ -1,43 +1,99 @@
 """Servicio de captura de paquetes"""
+import itertools
+import math
+import os
 import threading
-import queue
-from typing import Optional, Callable, Dict, List
-from collections import defaultdict
+import time
+from typing import Optional, Callable, Dict, Hashable, Iterable, Iterator, List, Sequence, Tuple
 from datetime import datetime
 import logging
-from scapy.all import sniff, IP, TCP, UDP, ICMP, get_if_list
-from ..models import PacketData, CaptureStats
-from .system_info import connection_cache
+from scapy.all import get_if_list
+from ..models import CaptureStats
+from ..core.config import settings
+from .capture_backends import CaptureBackend, TPacketV3Backend, create_backend
+from .capture_workers import FanoutWorkerPool
+from .packet_store import PacketStore
+from .packet_record import PacketRecord
+from .pcap_reader import PcapReader, PCAPNG_SHB
+from .pcap_writer import EXPORT_CHUNK_BYTES, EXPORT_WRITERS, stream_frames
+from .frame_buffer import FrameBuffer, RawFrame
+from .packet_spool import PacketSpool, SpoolBudget
+from .bpf_filter import cache_info as bpf_cache_info, compile_bpf
+from .packet_bridge import PacketBridge
+from .packet_sampler import PacketSampler, estimate_stats
+from .packet_pipeline import PacketPipeline, merge_stats, new_capture_stats
+from .flow_table import FlowTable
+from .sketches import STATS_SUMMARIES, CountMinSketch
+from .network_graph import NetworkGraph
+from .passive_dns import HostnameObservation, passive_dns
+from .packet_dissector import SNAPLEN_MAX
 
 logger = logging.getLogger(__name__)
 
+# Tramas por lectura del buffer durante una exportación
+EXPORT_READ_FRAMES = 1024
 
-class PacketCaptureService:
+# Contadores escalares del dict de estadísticas
+SCALAR_STATS = ('total', 'tcp', 'udp', 'icmp', 'other')
+
+# Resúmenes de tamaño acotado que copia snapshot_stats por defecto. Los contadores por
+# clave (sin cota en modo exacto) y el grafo se consultan bajo el lock sin copiarse
+SUMMARY_STATS = (
+    'top_ips_src', 'top_ips_dst', 'top_ports',
+    'distinct_ips_src', 'distinct_ips_dst', 'distinct_ports', 'distinct_flows',
+    'distinct_dst_per_minute', 'distinct_per_source', 'timeseries',
+)
+
+# Presupuesto de disco común a los spools de todas las sesiones
+spool_budget = SpoolBudget(settings.SPOOL_MAX_BYTES)
+
+# Versiones de las estadísticas, únicas en el proceso (una sesión recreada no repite versiones)
+_STATS_VERSIONS = itertools.count(1)
+
+
+class PacketCaptureService(PacketPipeline):
     """Servicio para capturar y analizar paquetes de red"""
     
-    def __init__(self):
+    def __init__(self, session_id: str = "default"):
+        super().__init__(settings.CAPTURE_SNAPLEN, passive_dns)
+        self.session_id = session_id
         self.is_running = False
-        self.packets: List[PacketData] = []
-        self.packet_queue: queue.Queue = queue.Queue(maxsize=100)
-        self.stats = {
-            'total': 0,
-            'tcp': 0,
-            'udp': 0,
-            'icmp': 0,
-            'other': 0,
-            'ips_src': defaultdict(int),
-            'ips_dst': defaultdict(int),
-            'ports': defaultdict(int),
-        }
+        self.store = PacketStore(settings.PACKET_STORE_CAPACITY)  # Ring columnar de cabeceras
+        self.frames = FrameBuffer(settings.FRAME_BUFFER_BYTES)  # Tramas crudas para exportar
+        self.spool: Optional[PacketSpool] = None
+        if settings.SPOOL_ENABLED:
+            # Cada sesión adicional tiene su propio subdirectorio de spool
+            spool_dir = settings.SPOOL_DIR if session_id == "default" else os.path.join(settings.SPOOL_DIR, session_id)
+            self.spool = PacketSpool(
+                spool_dir,
+                segment_bytes=settings.SPOOL_SEGMENT_BYTES,
+                segment_seconds=settings.SPOOL_SEGMENT_SECONDS,
+                max_bytes=settings.SPOOL_MAX_BYTES,
+                budget=spool_budget
+            )
+        self.bridge = PacketBridge()  # Entrega de paquetes a los clientes WebSocket
+        self.flows = FlowTable(
+            idle_timeout=settings.FLOW_IDLE_TIMEOUT,
+            active_timeout=settings.FLOW_ACTIVE_TIMEOUT,
+            max_flows=settings.FLOW_TABLE_MAX,
+            history=settings.FLOW_HISTORY
+        )
+        self.sketch: Optional[Tuple[int, int]] = None  # (width, depth) en el modo de estadísticas sketch
+        self.stats_version = next(_STATS_VERSIONS)  # Cambia con cada modificación de self.stats
         self.start_time = None
         self.interface = None
         self.packet_filter = None
+        self.backend_name = "scapy"
+        self.backend: Optional[CaptureBackend] = None
+        self.workers = 1
+        self.pcap_file: Optional[str] = None
         self.on_packet_callback: Optional[Callable] = None
         self.max_packets = 1000
         self.sniff_thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()  # Protege store, frames, flows y stats (se toma una vez por lote)
     
     def set_packet_callback(self, callback: Callable):
-        """Establece el callback para nuevos paquetes"""
+        """Establece el callback para nuevos paquetes (recibe la lista de cada lote)"""
         self.on_packet_callback = callback
     
     def get_available_interfaces(self) -> List[str]:
@@ -51,145 +107,129 @@ class PacketCaptureService:
             logger.error(f"Error obteniendo interfaces: {e}")
             return []
     
-    def get_pending_packets(self) -> List[PacketData]:
-        """Obtiene paquetes pendientes de enviar"""
-        packets = []
-        while True:
-            try:
-                packet = self.packet_queue.get_nowait()
-                packets.append(packet)
-            except queue.Empty:
-                break
-        return packets
+    def _process_packet(self, packet, timestamp: Optional[float] = None, linktype: Optional[int] = None):
+        """Procesa un único paquete capturado (lote de un elemento)"""
+        self._process_batch([(packet, timestamp, linktype, None)])
     
-    def _process_packet(self, packet):
-        """Procesa un paquete capturado"""
+    def _process_batch(self, batch: List[Tuple]):
+        """
+        Procesa un lote de tramas ``(trama, timestamp, linktype, longitud original)``.
+        
+        El parseo se hace fuera del lock; estadísticas, buffer y entrega a los
+        clientes WebSocket se hacen una sola vez por lote.
+        """
         try:
-            if not self.is_running or len(self.packets) >= self.max_packets:
+            if not self.is_running:
                 return
             
-            packet_info = self._parse_packet(packet)
-            if packet_info:
-                self.packets.append(packet_info)
-                self._update_stats(packet_info)
-                
-                # Agregar a queue para enviar via WebSocket
-                try:
-                    self.packet_queue.put_nowait(packet_info)
-                    logger.debug(f"Paquete agregado a queue: {packet_info.src_ip} -> {packet_info.dst_ip}")
-                except queue.Full:
-                    # Si la queue está llena, sacar el más antiguo
-                    try:
-                        self.packet_queue.get_nowait()
-                        self.packet_queue.put_nowait(packet_info)
-                    except queue.Empty:
-                        pass
-                
-                # Llamar callback si existe
-                if self.on_packet_callback:
-                    try:
-                        # Ejecutar en thread si es coroutine
-                        import asyncio
-                        if asyncio.iscoroutine(self.on_packet_callback(packet_info)):
-                            logger.debug("Callback es asíncrono, ejecutándose en background")
-                    except Exception as e:
-                        logger.debug(f"Error en callback de paquete: {e}")
-                
-                self.stats['total'] += 1
-                
-                if self.stats['total'] % 10 == 0:
-                    logger.info(f"Paquetes capturados: {self.stats['total']}")
-        except Exception as e:
-            logger.error(f"Error procesando paquete: {e}")
-    
-    def _parse_packet(self, packet) -> Optional[PacketData]:
-        """Extrae información del paquete"""
-        try:
-            if IP not in packet:
-                return None
+            records, raw_frames = self._parse_batch(batch, self.frames.enabled or self.spool is not None)
             
-            src_ip = packet[IP].src
-            dst_ip = packet[IP].dst
-            src_port = None
-            dst_port = None
-            protocol = "UNKNOWN"
-            payload_preview = None
-            flags = None
-            process_name = None
-            pid = None
+            with self._lock:
+                if self.max_packets:
+                    room = self.max_packets - self.stats['total']
+                    if room <= 0:
+                        return
+                    if len(records) > room:
+                        records = records[:room]
+                        raw_frames = raw_frames[:room]
+                if not records:
+                    return
+                self.store.append(records)
+                if raw_frames:
+                    raw_frames = [f for f in raw_frames if f is not None]
+                    self.frames.extend(raw_frames)
+                self._update_stats(records)
+                self.stats['total'] += len(records)
+                self.stats_version = next(_STATS_VERSIONS)
+                self.flows.update(records)
             
-            if TCP in packet:
-                protocol = "TCP"
-                src_port = packet[TCP].sport
-                dst_port = packet[TCP].dport
-                flags = str(packet[TCP].flags)
-                if packet[TCP].payload:
-                    payload = bytes(packet[TCP].payload)
-                    payload_preview = payload[:50].hex()
-            elif UDP in packet:
-                protocol = "UDP"
-                src_port = packet[UDP].sport
-                dst_port = packet[UDP].dport
-                if packet[UDP].payload:
-                    payload = bytes(packet[UDP].payload)
-                    payload_preview = payload[:50].hex()
-            elif packet[IP].proto == 1:
-                protocol = "ICMP"
+            # El spool tiene su propio lock: la escritura a disco no bloquea a los lectores
+            if self.spool and raw_frames:
+                self.spool.write(raw_frames)
             
-            # Buscar el proceso asociado a este puerto local
-            if src_port:
-                proc_info = connection_cache.get_process(src_port)
-                if proc_info:
-                    process_name = proc_info.get('name')
-                    pid = proc_info.get('pid')
+            # Entregar el lote completo a los clientes WebSocket
+            self.bridge.publish(records)
             
-            return PacketData(
-                timestamp=datetime.now(),
-                src_ip=src_ip,
-                dst_ip=dst_ip,
-                src_port=src_port,
-                dst_port=dst_port,
-                protocol=protocol,
-                length=len(packet),
-                payload_preview=payload_preview,
-                flags=flags,
-                process_name=process_name,
-                pid=pid
-            )
+            # Llamar callback si existe (una vez por lote)
+            if self.on_packet_callback:
+                try:
+                    self.on_packet_callback(records)
+                except Exception as e:
+                    logger.debug(f"Error en callback de paquetes: {e}")
+            
+            logger.debug("Lote procesado: %d paquetes (total %d)", len(records), self.stats['total'])
         except Exception as e:
-            logger.error(f"Error parseando paquete: {e}")
-            return None
+            logger.error(f"Error procesando lote de paquetes: {e}")
     
-    def _update_stats(self, packet_info: PacketData):
-        """Actualiza estadísticas"""
-        self.stats['ips_src'][packet_info.src_ip] += 1
-        self.stats['ips_dst'][packet_info.dst_ip] += 1
-        
-        # Registrar conexión para mapa de red
-        connection_key = f"{packet_info.src_ip}->{packet_info.dst_ip}"
-        self.stats['connections'][connection_key] += 1
-        
-        if packet_info.protocol == "TCP":
-            self.stats['tcp'] += 1
-        elif packet_info.protocol == "UDP":
-            self.stats['udp'] += 1
-        elif packet_info.protocol == "ICMP":
-            self.stats['icmp'] += 1
-        else:
-            self.stats['other'] += 1
+    def _ingest_worker_report(
+        self,
+        records: List[PacketRecord],
+        delta: Optional[Dict],
+        frames: List[RawFrame],
+        hostnames: List[HostnameObservation]
+    ):
+        """
+        Fusiona el informe de un worker de captura (paquetes, tramas, delta de
+        estadísticas y nombres). ``delta`` es None si el worker no vio
+        paquetes desde el informe anterior.
         
-        if packet_info.src_port:
-            self.stats['ports'][packet_info.src_port] += 1
-        if packet_info.dst_port:
-            self.stats['ports'][packet_info.dst_port] += 1
+        Igual que en un solo proceso, solo cuentan los primeros
+        ``max_packets``: si el delta los sobrepasa se fusiona escalado a la
+        parte que cabe (contadores y series en proporción, con ``total``
+        exacto). Los distintos (HyperLogLog) no se pueden recortar y se
+        fusionan enteros.
+        """
+        try:
+            if hostnames:
+                self.hostnames.add(hostnames)
+            if delta is None:
+                return
+            with self._lock:
+                if self.max_packets:
+                    room = self.max_packets - self.stats['total']
+                    if room <= 0:
+                        return
+                    records = records[:room]
+                    frames = frames[:room]
+                    if delta['total'] > room:
+                        delta = estimate_stats(delta, room / delta['total'])
+                        delta['total'] = room
+                merge_stats(self.stats, delta)
+                self.stats_version = next(_STATS_VERSIONS)
+                self.store.append(records)
+                self.frames.extend(frames)
+                self.flows.update(records)
+            
+            if self.spool:
+                self.spool.write(frames)
+            
+            self.bridge.publish(records)
+        except Exception as e:
+            logger.error(f"Error fusionando informe de worker: {e}")
     
     def start_capture(
         self,
         interface: Optional[str] = None,
         packet_filter: Optional[str] = None,
-        max_packets: int = 1000
+        max_packets: int = 1000,
+        backend: str = "scapy",
+        workers: int = 1,
+        pcap_file: Optional[str] = None,
+        replay_speed: float = 0.0,
+        sampling: str = "none",
+        sample_every: int = 1,
+        sample_probability: float = 1.0,
+        snaplen: Optional[int] = None,
+        stats_mode: str = "exact",
+        sketch_width: Optional[int] = None,
+        sketch_depth: Optional[int] = None
     ):
-        """Inicia la captura de paquetes"""
+        """
+        Inicia la captura de paquetes (o la reproducción de un pcap con backend="pcap").
+        
+        ``stats_mode="sketch"`` cuenta IPs, puertos y conexiones en Count-Min
+        sketches de ``sketch_width`` × ``sketch_depth`` (memoria fija por sesión).
+        """
         if self.is_running:
             raise RuntimeError("Captura ya en progreso")
         
@@ -200,42 +240,103 @@ class PacketCaptureService:
         if packet_filter and isinstance(packet_filter, str) and packet_filter.strip() == '':
             packet_filter = None
         
+        # Crear el backend antes de marcar la captura como activa
+        if workers > 1 and backend != "tpacket_v3":
+            raise RuntimeError("La captura multi-proceso requiere el backend tpacket_v3")
+        try:
+            sampler = PacketSampler(sampling, sample_every, sample_probability)
+            snaplen = snaplen or settings.CAPTURE_SNAPLEN
+            if not 0 < snaplen <= SNAPLEN_MAX:
+                raise ValueError(f"snaplen debe estar entre 1 y {SNAPLEN_MAX}")
+            sketch = None
+            if stats_mode == "sketch":
+                sketch = (sketch_width or settings.SKETCH_WIDTH, sketch_depth or settings.SKETCH_DEPTH)
+                CountMinSketch(*sketch)  # Valida la geometría antes de arrancar
+            elif stats_mode != "exact":
+                raise ValueError(f"Modo de estadísticas desconocido: {stats_mode}")
+            if packet_filter and backend == "pcap":
+                raise ValueError("El backend pcap no aplica filtros BPF: filtra el fichero antes de reproducirlo")
+            if packet_filter:
+                # Compilar (y cachear) el filtro ahora: un filtro inválido es un 400, no un error en el thread
+                compile_bpf(packet_filter, interface)
+            if workers > 1:
+                if not TPacketV3Backend.is_supported():
+                    raise RuntimeError("El backend tpacket_v3 requiere Linux (AF_PACKET)")
+                self.backend = FanoutWorkerPool(
+                    workers,
+                    interface=interface,
+                    packet_filter=packet_filter,
+                    on_report=self._ingest_worker_report,
+                    should_stop=self._should_stop,
+                    sampler=sampler,
+                    snaplen=snaplen
+                )
+            else:
+                source_options = {}
+                if backend == "pcap":
+                    source_options = {"path": self._resolve_pcap_file(pcap_file), "replay_speed": replay_speed}
+                self.backend = create_backend(
+                    backend,
+                    interface=interface,
+                    packet_filter=packet_filter,
+                    on_batch=self._process_batch,
+                    should_stop=self._should_stop,
+                    snaplen=snaplen,
+                    **source_options
+                )
+        except ValueError as e:
+            raise RuntimeError(str(e))
+        
         self.is_running = True
         self.interface = interface
         self.packet_filter = packet_filter
+        self.backend_name = backend
+        self.workers = workers
+        self.pcap_file = pcap_file if backend == "pcap" else None
         self.max_packets = max_packets
+        self.sampler = sampler
+        self.snaplen = snaplen
+        self.sketch = sketch
         self.start_time = datetime.now()
-        self.packets.clear()
-        self.packet_queue = queue.Queue(maxsize=100)  # Reiniciar queue
-        self.stats = {
-            'total': 0,
-            'tcp': 0,
-            'udp': 0,
-            'icmp': 0,
-            'other': 0,
-            'ips_src': defaultdict(int),
-            'ips_dst': defaultdict(int),
-            'ports': defaultdict(int),
-            'connections': defaultdict(int),  # (src_ip->dst_ip) -> count
-        }
+        with self._lock:
+            self.store.clear()
+            self.frames.clear()
+            self.flows.clear()
+            self.stats = new_capture_stats(sketch)
+            self.stats_version = next(_STATS_VERSIONS)
+        self.payload_filter.clear()
+        self.bridge.reset_counters()
         
-        logger.info(f"✓ Iniciando captura en {interface or 'todas las interfaces'}")
+        logger.info(f"✓ Iniciando captura en {interface or 'todas las interfaces'} (backend: {backend}, workers: {workers}, muestreo: {sampling})")
         self.sniff_thread = threading.Thread(target=self._run_sniff, daemon=True)
         self.sniff_thread.start()
     
+    def _resolve_pcap_file(self, pcap_file: Optional[str]) -> str:
+        """Valida que el fichero pcap exista dentro de PCAP_DIR y sea legible"""
+        if not pcap_file:
+            raise RuntimeError("El backend pcap requiere pcap_file")
+        base = os.path.realpath(settings.PCAP_DIR)
+        path = os.path.realpath(os.path.join(base, pcap_file))
+        if os.path.commonpath([base, path]) != base:
+            raise RuntimeError("El fichero pcap debe estar dentro de PCAP_DIR")
+        if not os.path.isfile(path):
+            raise RuntimeError(f"Fichero pcap no encontrado: {pcap_file}")
+        # Comprobar la cabecera antes de arrancar el thread de captura
+        with PcapReader(path) as reader:
+            reader.iter_records()
+        return path
+    
+    def _should_stop(self) -> bool:
+        """Condición de parada consultada por el backend de captura"""
+        return not self.is_running or bool(self.max_packets and self.stats['total'] >= self.max_packets)
+    
     def _run_sniff(self):
-        """Ejecuta sniff en un thread"""
+        """Ejecuta el backend de captura en un thread"""
         try:
-            logger.info(f"🔍 Iniciando sniff - interface: {self.interface}, filter: {self.packet_filter}")
-            sniff(
-                iface=self.interface,
-                prn=self._process_packet,
-                filter=self.packet_filter,
-                store=False,
-                promisc=False,
-                stop_filter=lambda x: not self.is_running or self.stats['total'] >= self.max_packets,
-                timeout=None
-            )
+            logger.info(f"🔍 Iniciando sniff - interface: {self.interface}, filter: {self.packet_filter}, backend: {self.backend_name}")
+            self.backend.run()
+            # Un backend offline termina al agotar el fichero
+            self.is_running = False
             logger.info(f"✓ Captura finalizada. Total paquetes: {self.stats['total']}")
         except PermissionError:
             logger.error("❌ Se requieren permisos de root para capturar paquetes. Ejecuta con: sudo python run.py")
@@ -256,50 +357,239 @@ class PacketCaptureService:
             if self.sniff_thread.is_alive():
                 logger.warning("⚠️ Thread de sniff no respondió en 2 segundos")
         
+        if self.spool:
+            self.spool.flush()
+        
+        # Los flujos aún activos se emiten como registros de fin de captura
+        with self._lock:
+            self.flows.flush()
+        
         logger.info(f"✓ Captura detenida. Total paquetes: {self.stats['total']}")
         
         duration = (datetime.now() - self.start_time).total_seconds() if self.start_time else 0
+        # Con muestreo se devuelven los totales estimados
+        stats = self.estimated_stats(('top_ips_src', 'top_ips_dst', 'top_ports'))
         
         return CaptureStats(
-            total_packets=self.stats['total'],
-            tcp_packets=self.stats['tcp'],
-            udp_packets=self.stats['udp'],
-            icmp_packets=self.stats['icmp'],
-            other_packets=self.stats['other'],
-            top_src_ips=dict(sorted(
-                self.stats['ips_src'].items(),
-                key=lambda x: x[1],
-                reverse=True
-            )[:10]),
-            top_dst_ips=dict(sorted(
-                self.stats['ips_dst'].items(),
-                key=lambda x: x[1],
-                reverse=True
-            )[:10]),
-            top_ports=dict(sorted(
-                self.stats['ports'].items(),
-                key=lambda x: x[1],
-                reverse=True
-            )[:10]),
-            capture_duration=duration
+            total_packets=stats['total'],
+            tcp_packets=stats['tcp'],
+            udp_packets=stats['udp'],
+            icmp_packets=stats['icmp'],
+            other_packets=stats['other'],
+            total_bytes=stats['bytes'],
+            tcp_bytes=stats['tcp_bytes'],
+            udp_bytes=stats['udp_bytes'],
+            icmp_bytes=stats['icmp_bytes'],
+            other_bytes=stats['other_bytes'],
+            top_src_ips=stats['top_ips_src'].top_dict(10),
+            top_dst_ips=stats['top_ips_dst'].top_dict(10),
+            top_ports=stats['top_ports'].top_dict(10),
+            top_src_ips_bytes=stats['top_ips_src'].top_dict(10, by="volume"),
+            top_dst_ips_bytes=stats['top_ips_dst'].top_dict(10, by="volume"),
+            top_ports_bytes=stats['top_ports'].top_dict(10, by="volume"),
+            error_bounds={
+                "top_src_ips": stats['top_ips_src'].error_bounds(10),
+                "top_dst_ips": stats['top_ips_dst'].error_bounds(10),
+                "top_ports": stats['top_ports'].error_bounds(10),
+            },
+            capture_duration=duration,
+            sampled_packets=self.stats['total'],
+            sampling=self.sampler.describe()
         )
     
     def get_status(self) -> Dict:
         """Retorna el status actual de captura"""
         return {
+            "session_id": self.session_id,
             "is_running": self.is_running,
             "packets_captured": self.stats['total'],
+            "estimated_packets": round(self.stats['total'] * self.sampler.scale),
+            "sampling": self.sampler.describe(),
+            "stats_mode": "sketch" if self.sketch else "exact",
             "interface": self.interface,
-            "filter": self.packet_filter
+            "filter": self.packet_filter,
+            "backend": self.backend_name,
+            "workers": self.workers,
+            "pcap_file": self.pcap_file,
+            "buffered_packets": len(self.store),
+            "flows": self.flows.get_stats(),
+            "stream": self.bridge.get_stats(),
+            "kernel_stats": self.backend.get_kernel_stats() if self.backend else {},
+            "bpf_cache": bpf_cache_info()
         }
     
-    def get_packets(self, limit: int = 100) -> List[PacketData]:
-        """Retorna últimos N paquetes"""
-        return self.packets[-limit:]
+    def snapshot_stats(self, keys: Optional[Iterable[str]] = None) -> Dict:
+        """
+        Copia consistente (tomada bajo el lock) de los contadores escalares y
+        de los resúmenes ``keys`` (por defecto ``SUMMARY_STATS``). Los
+        contadores por clave y el grafo no se copian: ver ``point_counts`` y
+        ``get_network_graph``.
+        """
+        with self._lock:
+            stats = self.stats
+            snapshot = {key: value for key, value in stats.items() if not isinstance(value, STATS_SUMMARIES)}
+            for key in SUMMARY_STATS if keys is None else keys:
+                snapshot[key] = stats[key].copy()
+        return snapshot
+    
+    def estimated_stats(self, keys: Optional[Iterable[str]] = None) -> Dict:
+        """Copia de ``snapshot_stats`` escalada por la tasa de muestreo (igual a la cruda sin muestreo)"""
+        return estimate_stats(self.snapshot_stats(keys), self.sampler.scale)
+    
+    def point_counts(self, queries: Sequence[Tuple[str, Hashable]]) -> Tuple[List[Dict], Dict]:
+        """
+        Paquetes y bytes estimados de claves sueltas ``(contador, clave)`` de
+        los contadores por clave, leídos bajo el lock sin copiarlos, y
+        contadores escalares de la muestra. En modo sketch cada resultado
+        lleva la cota de error (escalada como los valores).
+        """
+        scale = self.sampler.scale
+        results = []
+        with self._lock:
+            for key, item in queries:
+                counters = self.stats[key]
+                count, volume = counters.get(item)
+                entry = {"count": round(count * scale), "bytes": round(volume * scale), "exact": True}
+                if isinstance(counters, CountMinSketch):
+                    bound = counters.error_bound()
+                    entry.update({
+                        "exact": False,
+                        "epsilon": bound["epsilon"],
+                        "confidence": bound["confidence"],
+                        "max_error": math.ceil(bound["max_error"][0] * scale),
+                        "bytes_max_error": math.ceil(bound["max_error"][1] * scale),
+                    })
+                results.append(entry)
+            scalars = {key: self.stats[key] for key in SCALAR_STATS}
+        return results, scalars
+    
+    def get_network_graph(self, since: Optional[int] = None, metric: str = "packets") -> Tuple[Dict, Dict]:
+        """
+        Vista estimada del grafo del mapa de red (delta desde la versión
+        ``since``) y contadores escalares de la muestra, sin copiar las estadísticas
+        """
+        with self._lock:
+            view = self.stats['network'].view(since, self.sampler.scale, metric)
+            scalars = {key: self.stats[key] for key in SCALAR_STATS}
+        return view, scalars
+    
+    def estimated_network_graph(self) -> Tuple[NetworkGraph, Dict]:
+        """Copia escalada del grafo del mapa de red y contadores escalares de la muestra"""
+        with self._lock:
+            graph = self.stats['network'].scaled(self.sampler.scale)
+            scalars = {key: self.stats[key] for key in SCALAR_STATS}
+        return graph, scalars
+    
+    def get_packets(self, limit: int = 100) -> List[PacketRecord]:
+        """Retorna últimos N paquetes (solo se materializan esas filas)"""
+        with self._lock:
+            rows = self.store.tail(limit)
+            payloads = self.store.tail_payloads(limit)
+        return self.store.materialise(rows, payloads)
+    
+    def get_flows(self, limit: int = 100, sort: str = "bytes") -> List[Dict]:
+        """Flujos activos"""
+        with self._lock:
+            return self.flows.active(limit, sort)
+    
+    def get_expired_flows(self, limit: int = 100) -> List[Dict]:
+        """Registros de flujos expirados más recientes"""
+        with self._lock:
+            return self.flows.recent_expired(limit)
+    
+    def get_tcp_metrics(self, group: str = "remote", limit: int = 20, sort: str = "p90") -> List[Dict]:
+        """Percentiles de RTT y retransmisiones TCP por IP remota o por proceso"""
+        with self._lock:
+            return self.flows.tcp_metrics.top(group, limit, sort)
     
     def clear_packets(self):
         """Limpia el buffer de paquetes"""
-        self.packets.clear()
+        with self._lock:
+            self.store.clear()
+            self.frames.clear()
+    
+    def export_capture(
+        self,
+        export_format: str,
+        pcap_file: Optional[str] = None,
+        start: Optional[float] = None,
+        end: Optional[float] = None
+    ) -> Tuple[str, str, Iterator[bytes]]:
+        """
+        Prepara la exportación de la captura actual (tramas retenidas), de un
+        fichero de PCAP_DIR o de un rango de tiempo del spool en formato pcap
+        o pcapng.
+        
+        Valida la petición de inmediato y retorna (media_type, nombre de
+        fichero, iterador de trozos de bytes); el iterador genera el fichero
+        sobre la marcha en memoria constante.
+        """
+        writer_cls = EXPORT_WRITERS.get(export_format)
+        if writer_cls is None:
+            raise RuntimeError(f"Formato de exportación desconocido: {export_format}")
+        writer = writer_cls()
+        
+        if pcap_file:
+            path = self._resolve_pcap_file(pcap_file)
+            name = f"{os.path.splitext(os.path.basename(path))[0]}.{writer.extension}"
+            if self._pcap_format(path) == export_format:
+                return writer.media_type, name, self._iter_file(path)
+            return writer.media_type, name, stream_frames(writer, self._iter_stored_frames(path))
+        
+        if start is not None or end is not None:
+            if self.spool is None:
+                raise RuntimeError("El spool en disco está desactivado (SPOOL_ENABLED)")
+            name = f"leireye_spool_{int(start or 0)}_{int(end or time.time())}.{writer.extension}"
+            return writer.media_type, name, stream_frames(writer, self.spool.read_range(start, end))
+        
+        if not self.frames.enabled:
+            raise RuntimeError("La retención de tramas está desactivada (FRAME_BUFFER_BYTES = 0)")
+        name = f"leireye_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{writer.extension}"
+        return writer.media_type, name, stream_frames(writer, self._iter_retained_frames())
+    
+    def _iter_retained_frames(self) -> Iterator[List[RawFrame]]:
+        """Recorre por trozos las tramas retenidas en el momento de la llamada"""
+        with self._lock:
+            seq, end = self.frames.first_seq, self.frames.end_seq
+        while True:
+            with self._lock:
+                seq = max(seq, self.frames.first_seq)
+                if seq >= end:
+                    return
+                seq, frames = self.frames.read(seq, min(EXPORT_READ_FRAMES, end - seq))
+            if not frames:
+                return
+            yield frames
+    
+    @staticmethod
+    def _pcap_format(path: str) -> str:
+        with open(path, "rb") as f:
+            magic = f.read(4)
+        return "pcapng" if len(magic) == 4 and int.from_bytes(magic, "little") == PCAPNG_SHB else "pcap"
+    
+    @staticmethod
+    def _iter_file(path: str) -> Iterator[bytes]:
+        with open(path, "rb") as f:
+            while True:
+                chunk = f.read(EXPORT_CHUNK_BYTES)
+                if not chunk:
+                    return
+                yield chunk
+    
+    @staticmethod
+    def _iter_stored_frames(path: str) -> Iterator[List[RawFrame]]:
+        """Convierte los registros de un fichero pcap/pcapng en lotes de tramas"""
+        with PcapReader(path) as reader:
+            frames = []
+            for frame, timestamp, linktype, orig_len in reader:
+                frames.append((timestamp or 0.0, linktype, bytes(frame), orig_len))
+                if len(frames) >= EXPORT_READ_FRAMES:
+                    yield frames
+                    frames = []
+            # Soltar la última vista sobre el mapeo: con ella viva, close() no puede cerrarlo (BufferError) y queda abierto
+            frame = None
+            if frames:
+                yield frames
     
     def reset(self):
         """Resetea el estado de captura (para recovery de errores)"""
@@ -311,18 +601,26 @@ class PacketCaptureService:
             logger.info("⏳ Esperando a que termine thread de sniff antes de resetear...")
             self.sniff_thread.join(timeout=2.0)
         
-        self.packets.clear()
-        self.packet_queue = queue.Queue(maxsize=100)
-        self.stats = {
-            'total': 0,
-            'tcp': 0,
-            'udp': 0,
-            'icmp': 0,
-            'other': 0,
-            'ips_src': defaultdict(int),
-            'ips_dst': defaultdict(int),
-            'ports': defaultdict(int),
-        }
+        # El thread puede seguir vivo tras el timeout: el cambio de estadísticas y
+        # versión va bajo el lock, como las escrituras de _process_batch
+        with self._lock:
+            self.store.clear()
+            self.frames.clear()
+            self.flows.clear()
+            self.stats = new_capture_stats(self.sketch)
+            self.stats_version = next(_STATS_VERSIONS)
+        self.payload_filter.clear()
+        self.bridge.reset_counters()
         logger.info("✓ Estado de captura reseteado")
-# Instancia global
+    
+    def close(self, purge: bool = False):
+        """Libera los recursos persistentes: cierra el spool (con ``purge`` además borra sus segmentos)"""
+        if self.spool:
+            if purge:
+                self.spool.purge()
+            else:
+                self.spool.close()
+
+
+# Instancia global (sesión por defecto)
 capture_service = PacketCaptureService()
@@ -0,0 +1,226 @@
+"""
+Disector de cabeceras sin scapy.
+
+Decodifica Ethernet/VLAN/IPv4/IPv6/TCP/UDP/ICMP directamente desde los bytes
+de la trama usando ``struct.Struct`` precompilados, evitando recorrer el árbol
+de capas de scapy para cada paquete. Produce los mismos campos que
+``PacketData`` (salvo timestamp y proceso, que añade el servicio de captura),
+excepto que el payload se devuelve como bytes crudos (``payload``): la
+representación hex/ASCII se genera bajo demanda en ``PacketRecord``.
+"""
+import socket
+import struct
+from typing import Optional, Dict, Any
+
+# Tipos de enlace (LINKTYPE_* de pcap)
+LINKTYPE_NULL = 0
+LINKTYPE_ETHERNET = 1
+LINKTYPE_RAW_BSD = 12
+LINKTYPE_RAW_BSD_ALT = 14
+LINKTYPE_RAW = 101
+LINKTYPE_LOOP = 108
+LINKTYPE_LINUX_SLL = 113
+LINKTYPE_IPV4 = 228
+LINKTYPE_IPV6 = 229
+LINKTYPE_LINUX_SLL2 = 276
+
+ETHERTYPE_IPV4 = 0x0800
+ETHERTYPE_IPV6 = 0x86DD
+ETHERTYPES_VLAN = (0x8100, 0x88A8, 0x9100)
+
+IPPROTO_ICMP = 1
+IPPROTO_TCP = 6
+IPPROTO_UDP = 17
+IPPROTO_ICMPV6 = 58
+# Cabeceras de extensión IPv6 que se saltan hasta llegar a la capa 4
+IPV6_EXTENSION_HEADERS = (0, 43, 60)
+IPV6_FRAGMENT_HEADER = 44
+
+PAYLOAD_PREVIEW_BYTES = 50
+# Longitud máxima de captura por trama (la misma que tcpdump por defecto)
+SNAPLEN_MAX = 262144
+
+_U16 = struct.Struct("!H")
+_U32_LE = struct.Struct("<I")
+# version/ihl, tos, total_len, id, flags/frag, ttl, proto, checksum, src, dst
+_IPV4 = struct.Struct("!BBHHHBBH4s4s")
+# ver/tc/flow, payload_len, next_header, hop_limit, src, dst
+_IPV6 = struct.Struct("!IHBB16s16s")
+# sport, dport, seq, ack, data_offset/ns, flags
+_TCP = struct.Struct("!HHIIBB")
+# sport, dport, len, checksum
+_UDP = struct.Struct("!HHHH")
+
+# Familias de direcciones usadas por DLT_NULL/DLT_LOOP según el sistema
+_NULL_AF_INET = (2,)
+_NULL_AF_INET6 = (10, 24, 28, 30)
+
+# Flags TCP en el mismo formato que str(scapy TCP.flags): letras por orden de bit
+_TCP_FLAG_LETTERS = "FSRPAUECN"
+TCP_FLAG_STRINGS = tuple(
+    "".join(letter for bit, letter in enumerate(_TCP_FLAG_LETTERS) if value & (1 << bit))
+    for value in range(1 << len(_TCP_FLAG_LETTERS))
+)
+
+# Nombre de la primera capa de scapy -> tipo de enlace
+SCAPY_LINKTYPES = {
+    "Ether": LINKTYPE_ETHERNET,
+    "Dot3": LINKTYPE_ETHERNET,
+    "CookedLinux": LINKTYPE_LINUX_SLL,
+    "CookedLinuxV2": LINKTYPE_LINUX_SLL2,
+    "Loopback": LINKTYPE_NULL,
+    "IP": LINKTYPE_IPV4,
+    "IPv6": LINKTYPE_IPV6,
+}
+
+
+def _network_offset(frame, linktype: int):
+    """Devuelve (offset, ethertype) del inicio de la capa de red, o None"""
+    if linktype == LINKTYPE_ETHERNET:
+        if len(frame) < 14:
+            return None
+        offset = 12
+        ethertype = _U16.unpack_from(frame, offset)[0]
+        while ethertype in ETHERTYPES_VLAN:
+            offset += 4
+            if len(frame) < offset + 2:
+                return None
+            ethertype = _U16.unpack_from(frame, offset)[0]
+        return offset + 2, ethertype
+
+    if linktype in (LINKTYPE_RAW, LINKTYPE_RAW_BSD, LINKTYPE_RAW_BSD_ALT, LINKTYPE_IPV4, LINKTYPE_IPV6):
+        if not len(frame):
+            return None
+        version = frame[0] >> 4
+        return 0, ETHERTYPE_IPV4 if version == 4 else ETHERTYPE_IPV6 if version == 6 else None
+
+    if linktype in (LINKTYPE_NULL, LINKTYPE_LOOP):
+        if len(frame) < 4:
+            return None
+        family = _U32_LE.unpack_from(frame, 0)[0]
+        if family > 0xFFFF:
+            family = socket.ntohl(family)
+        if family in _NULL_AF_INET:
+            return 4, ETHERTYPE_IPV4
+        if family in _NULL_AF_INET6:
+            return 4, ETHERTYPE_IPV6
+        return None
+
+    if linktype == LINKTYPE_LINUX_SLL:
+        if len(frame) < 16:
+            return None
+        return 16, _U16.unpack_from(frame, 14)[0]
+
+    if linktype == LINKTYPE_LINUX_SLL2:
+        if len(frame) < 20:
+            return None
+        return 20, _U16.unpack_from(frame, 0)[0]
+
+    return None
+
+
+def dissect(frame, linktype: int = LINKTYPE_ETHERNET, wire_len: Optional[int] = None) -> Optional[Dict[str, Any]]:
+    """
+    Decodifica las cabeceras de una trama.
+
+    Retorna un dict con src_ip, dst_ip, src_port, dst_port, protocol, length,
+    payload (primeros ``PAYLOAD_PREVIEW_BYTES`` bytes), flags y, en TCP,
+    tcp_seq y tcp_len (bytes de datos del segmento según las cabeceras), o None
+    si la trama no es IPv4/IPv6. ``wire_len`` es la longitud original cuando la trama
+    llega truncada por el snaplen.
+
+    ``payload_span`` es ``(inicio, fin)`` del payload TCP/UDP completo dentro de
+    la trama (None si no hay), para los inspectores de capa de aplicación; no
+    es un campo de ``PacketRecord`` y el servicio de captura lo retira.
+    """
+    link = _network_offset(frame, linktype)
+    if link is None:
+        return None
+    offset, ethertype = link
+    frame_len = len(frame)
+
+    if ethertype == ETHERTYPE_IPV4:
+        if frame_len < offset + 20:
+            return None
+        ver_ihl, _, total_len, _, frag, _, proto, _, src, dst = _IPV4.unpack_from(frame, offset)
+        src_ip = socket.inet_ntoa(src)
+        dst_ip = socket.inet_ntoa(dst)
+        l4_offset = offset + (ver_ihl & 0x0F) * 4
+        # Fin declarado por la cabecera IP (puede superar la trama si llega recortada)
+        declared_end = offset + total_len if total_len else frame_len
+        ip_end = min(frame_len, declared_end)
+        # Los fragmentos no iniciales no llevan cabecera de capa 4
+        has_l4 = not (frag & 0x1FFF)
+    elif ethertype == ETHERTYPE_IPV6:
+        if frame_len < offset + 40:
+            return None
+        _, payload_len, proto, _, src, dst = _IPV6.unpack_from(frame, offset)
+        src_ip = socket.inet_ntop(socket.AF_INET6, src)
+        dst_ip = socket.inet_ntop(socket.AF_INET6, dst)
+        l4_offset = offset + 40
+        declared_end = l4_offset + payload_len if payload_len else frame_len
+        ip_end = min(frame_len, declared_end)
+        has_l4 = True
+        while proto in IPV6_EXTENSION_HEADERS or proto == IPV6_FRAGMENT_HEADER:
+            if ip_end < l4_offset + 8:
+                has_l4 = False
+                break
+            next_proto = frame[l4_offset]
+            if proto == IPV6_FRAGMENT_HEADER:
+                has_l4 = not (_U16.unpack_from(frame, l4_offset + 2)[0] & 0xFFF8)
+                l4_offset += 8
+            else:
+                l4_offset += (frame[l4_offset + 1] + 1) * 8
+            proto = next_proto
+        if proto == IPPROTO_ICMPV6:
+            proto = IPPROTO_ICMP
+    else:
+        return None
+
+    src_port = None
+    dst_port = None
+    flags = None
+    payload = None
+    payload_span = None
+    tcp_seq = None
+    tcp_len = None
+    protocol = "UNKNOWN"
+
+    if proto == IPPROTO_TCP and has_l4 and ip_end >= l4_offset + 14:
+        protocol = "TCP"
+        src_port, dst_port, tcp_seq, _, data_offset, flag_bits = _TCP.unpack_from(frame, l4_offset)
+        flags = TCP_FLAG_STRINGS[flag_bits | ((data_offset & 0x01) << 8)]
+        payload_start = l4_offset + (data_offset >> 4) * 4
+        tcp_len = max(0, declared_end - payload_start)
+        if payload_start < ip_end:
+            payload = bytes(frame[payload_start:min(ip_end, payload_start + PAYLOAD_PREVIEW_BYTES)])
+            payload_span = (payload_start, ip_end)
+    elif proto == IPPROTO_UDP and has_l4 and ip_end >= l4_offset + 8:
+        protocol = "UDP"
+        src_port, dst_port, udp_len, _ = _UDP.unpack_from(frame, l4_offset)
+        payload_start = l4_offset + 8
+        payload_end = min(ip_end, l4_offset + udp_len) if udp_len >= 8 else ip_end
+        if payload_start < payload_end:
+            payload = bytes(frame[payload_start:min(payload_end, payload_start + PAYLOAD_PREVIEW_BYTES)])
+            payload_span = (payload_start, payload_end)
+    elif proto == IPPROTO_ICMP:
+        protocol = "ICMP"
+
+    return {
+        "src_ip": src_ip,
+        "dst_ip": dst_ip,
+        "src_port": src_port,
+        "dst_port": dst_port,
+        "protocol": protocol,
+        "length": wire_len if wire_len is not None else frame_len,
+        "payload": payload,
+        "flags": flags,
+        "tcp_seq": tcp_seq,
+        "tcp_len": tcp_len,
+        "payload_span": payload_span,
+    }
+
+
+def scapy_linktype(packet) -> Optional[int]:
+    """Tipo de enlace correspondiente a la primera capa de un paquete scapy"""
+    return SCAPY_LINKTYPES.get(type(packet).__name__)
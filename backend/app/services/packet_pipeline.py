@@ -0,0 +1,391 @@
+"""
+Parseo de tramas y estadísticas de un lote.
+
+``PacketPipeline`` reúne lo que hace falta para convertir un lote de tramas
+en ``PacketRecord`` y acumular sus estadísticas: muestreo, disector (con la
+ruta scapy de respaldo), inspección de capa de aplicación (DNS, SNI/Host) y
+``_update_stats``. Lo usan ``PacketCaptureService`` y el contexto de los
+workers de fanout (``WorkerCapture``), que así no construyen el ring de
+paquetes, los buffers ni el resto del estado de una sesión.
+
+``new_capture_stats`` crea el dict de estadísticas y ``merge_stats`` fusiona
+el de otro proceso o sesión.
+"""
+import logging
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from scapy.all import IP, TCP, UDP
+
+from ..core.config import settings
+from .system_info import connection_cache
+from .packet_record import PacketRecord
+from .frame_buffer import RawFrame
+from .packet_sampler import PacketSampler
+from .heavy_hitters import SpaceSaving
+from .sketches import STATS_SUMMARIES, CountMinSketch, ExactCounts
+from .cardinality import DistinctWindow, HyperLogLog, PerSourceDistinct, hash64
+from .timeseries import FIELD_INDEX, SERIES_FIELDS, TrafficTimeSeries
+from .network_graph import NetworkGraph
+from .passive_dns import DNS_PORTS, parse_dns_response
+from .app_layer import HOSTNAME_TTL, FirstPayloadFilter, client_hostname
+from .packet_dissector import dissect, scapy_linktype, LINKTYPE_ETHERNET, PAYLOAD_PREVIEW_BYTES, SNAPLEN_MAX
+
+logger = logging.getLogger(__name__)
+
+
+def new_capture_stats(sketch: Optional[Tuple[int, int]] = None) -> Dict:
+    """
+    Crea el diccionario de estadísticas vacío de una captura.
+
+    Los contadores por clave guardan paquetes y bytes juntos. Con
+    ``sketch=(width, depth)`` son Count-Min sketches de memoria fija en
+    lugar de contadores exactos.
+    """
+    if sketch:
+        keyed = lambda: CountMinSketch(*sketch)
+    else:
+        keyed = ExactCounts
+    return {
+        'total': 0,
+        'tcp': 0,
+        'udp': 0,
+        'icmp': 0,
+        'other': 0,
+        # Volumen en bytes (longitud de trama) total y por protocolo
+        'bytes': 0,
+        'tcp_bytes': 0,
+        'udp_bytes': 0,
+        'icmp_bytes': 0,
+        'other_bytes': 0,
+        # Clave → (paquetes, bytes)
+        'ips_src': keyed(),
+        'ips_dst': keyed(),
+        'ports': keyed(),
+        'connections': keyed(),  # (src_ip, dst_ip)
+        # Top-K con memoria fija (por paquetes, con el volumen de cada clave vigilada)
+        'top_ips_src': SpaceSaving(settings.HEAVY_HITTERS_CAPACITY),
+        'top_ips_dst': SpaceSaving(settings.HEAVY_HITTERS_CAPACITY),
+        'top_ports': SpaceSaving(settings.HEAVY_HITTERS_CAPACITY),
+        # Valores distintos (HyperLogLog): memoria fija y fusionables entre workers y sesiones
+        'distinct_ips_src': HyperLogLog(settings.HLL_PRECISION),
+        'distinct_ips_dst': HyperLogLog(settings.HLL_PRECISION),
+        'distinct_ports': HyperLogLog(settings.HLL_PRECISION),
+        'distinct_flows': HyperLogLog(settings.HLL_PRECISION),
+        'distinct_dst_per_minute': DistinctWindow(settings.DISTINCT_WINDOW_MINUTES, settings.HLL_SMALL_PRECISION),
+        'distinct_per_source': PerSourceDistinct(settings.DISTINCT_TRACKED_SOURCES, settings.HLL_SMALL_PRECISION),
+        # Paquetes, bytes y protocolos por segundo, minuto y hora
+        'timeseries': TrafficTimeSeries({
+            "second": settings.TIMESERIES_SECONDS,
+            "minute": settings.TIMESERIES_MINUTES,
+            "hour": settings.TIMESERIES_HOURS,
+        }),
+        # Grafo del mapa de red con IDs enteros, actualizado por lote y versionado
+        'network': NetworkGraph(settings.NETWORK_GRAPH_MAX_NODES, settings.NETWORK_GRAPH_MAX_EDGES),
+    }
+
+
+def merge_stats(target: Dict, source: Dict) -> Dict:
+    """Suma en ``target`` las estadísticas parciales de ``source``"""
+    for key, value in source.items():
+        if isinstance(value, dict):
+            counters = target.setdefault(key, defaultdict(int))
+            if isinstance(counters, CountMinSketch):
+                # Delta exacto (p. ej. de un worker) sobre una sesión en modo sketch
+                counters.update(value)
+                continue
+            for item, count in value.items():
+                counters[item] += count
+        elif isinstance(value, STATS_SUMMARIES):
+            current = target.get(key)
+            if current is None:
+                target[key] = value.copy()
+            elif isinstance(current, type(value)):
+                current.merge(value)
+            elif isinstance(current, CountMinSketch):
+                # Delta exacto (p. ej. de un worker) sobre una sesión en modo sketch
+                current.update(dict(value.items()))
+            else:
+                # Vista agregada de sesiones exactas y en modo sketch
+                merged = value.copy()
+                merged.update(dict(current.items()))
+                target[key] = merged
+        else:
+            target[key] = target.get(key, 0) + value
+    return target
+
+
+class PacketPipeline:
+    """Muestreo, parseo y estadísticas de lotes de tramas"""
+
+    def __init__(self, snaplen: int, hostnames):
+        self.sampler = PacketSampler()  # Sin muestreo por defecto
+        self.snaplen = snaplen
+        self.hostnames = hostnames  # Destino de los nombres observados (DNS pasivo o buffer del worker)
+        # Flujos TCP con el primer segmento de datos ya inspeccionado (solo lo usa el parseo)
+        self.payload_filter = FirstPayloadFilter(settings.APP_LAYER_TRACKED_FLOWS)
+        self.stats = new_capture_stats()  # Contadores de la muestra
+
+    def _parse_batch(self, batch: List[Tuple], retain: bool) -> Tuple[List[PacketRecord], List[Optional[RawFrame]]]:
+        """
+        Muestrea y parsea un lote de tramas ``(trama, timestamp, linktype,
+        longitud original)`` (fuera de cualquier lock). Retorna los registros
+        conservados y, con ``retain``, la trama cruda de cada uno (None si no
+        se puede exportar).
+        """
+        sampler = self.sampler
+        if sampler.samples_frames:
+            # count/random: se descarta antes de parsear
+            keep_frame = sampler.keep_frame
+            batch = [item for item in batch if keep_frame()]
+        keep_flow = sampler.keep_flow if sampler.samples_flows else None
+
+        parse = self._parse_packet
+        records = []
+        raw_frames = []
+        for frame, timestamp, linktype, wire_len in batch:
+            packet_info = parse(frame, timestamp, linktype, wire_len)
+            if packet_info is not None and (keep_flow is None or keep_flow(packet_info)):
+                records.append(packet_info)
+                if retain:
+                    raw_frames.append(
+                        self._raw_frame(frame, linktype, packet_info.timestamp, self.snaplen, wire_len)
+                    )
+        return records, raw_frames
+
+    def _parse_packet(
+        self,
+        packet,
+        timestamp: Optional[float] = None,
+        linktype: Optional[int] = None,
+        wire_len: Optional[int] = None
+    ) -> Optional[PacketRecord]:
+        """Extrae información del paquete (bytes crudos o paquete scapy) recortado al snaplen"""
+        try:
+            if isinstance(packet, (bytes, bytearray, memoryview)):
+                raw = packet
+            else:
+                timestamp = float(packet.time) if getattr(packet, 'time', None) else timestamp
+                linktype = scapy_linktype(packet)
+                if linktype is None:
+                    # Tipo de enlace no soportado por el disector rápido
+                    fields = self._parse_scapy_packet(packet)
+                    return self._build_record(fields, timestamp) if fields else None
+                raw = getattr(packet, 'original', None) or bytes(packet)
+
+            if len(raw) > self.snaplen:
+                # Recorte sin copia; la longitud del paquete sigue siendo la original
+                wire_len = wire_len or len(raw)
+                raw = memoryview(raw)[:self.snaplen]
+            fields = dissect(raw, LINKTYPE_ETHERNET if linktype is None else linktype, wire_len)
+            if fields is None:
+                return None
+            span = fields.pop("payload_span")
+            if span is not None:
+                self._inspect_payload(fields, raw[span[0]:span[1]])
+            return self._build_record(fields, timestamp)
+        except Exception as e:
+            logger.error(f"Error parseando paquete: {e}")
+            return None
+
+    def _inspect_payload(self, fields: Dict, payload):
+        """Inspección de capa de aplicación: respuestas DNS y SNI/Host del primer segmento TCP"""
+        if fields['protocol'] == "TCP":
+            flow = (fields['src_ip'], fields['src_port'], fields['dst_ip'], fields['dst_port'])
+            if not self.payload_filter.first(flow):
+                return
+            hostname = client_hostname(payload)
+            if hostname:
+                fields['hostname'] = hostname
+                self.hostnames.add([(fields['dst_ip'], hostname, HOSTNAME_TTL)])
+        elif fields['protocol'] == "UDP" and fields['src_port'] in DNS_PORTS:
+            observations = parse_dns_response(payload)
+            if observations:
+                self.hostnames.add(observations)
+
+    @staticmethod
+    def _raw_frame(
+        frame,
+        linktype: Optional[int],
+        timestamp: float,
+        snaplen: int = SNAPLEN_MAX,
+        wire_len: Optional[int] = None
+    ) -> Optional[RawFrame]:
+        """
+        Copia retenible de la trama (hasta ``snaplen``) con su longitud
+        original en el cable (``wire_len`` del backend o la de la trama
+        capturada) para exportarla; None si no se puede exportar
+        """
+        if isinstance(frame, (bytes, bytearray, memoryview)):
+            linktype = LINKTYPE_ETHERNET if linktype is None else linktype
+            return timestamp, linktype, bytes(frame[:snaplen]), wire_len or len(frame)
+        linktype = scapy_linktype(frame)
+        if linktype is None:
+            return None
+        data = getattr(frame, 'original', None) or bytes(frame)
+        return timestamp, linktype, data[:snaplen], wire_len or len(data)
+
+    def _parse_scapy_packet(self, packet) -> Optional[Dict]:
+        """Extrae los campos recorriendo las capas de scapy (ruta lenta de respaldo)"""
+        if IP not in packet:
+            return None
+
+        src_port = None
+        dst_port = None
+        protocol = "UNKNOWN"
+        payload = None
+        flags = None
+        tcp_seq = None
+        tcp_len = None
+
+        if TCP in packet:
+            protocol = "TCP"
+            src_port = packet[TCP].sport
+            dst_port = packet[TCP].dport
+            flags = str(packet[TCP].flags)
+            tcp_seq = packet[TCP].seq
+            tcp_len = 0
+            if packet[TCP].payload:
+                payload = bytes(packet[TCP].payload)
+                tcp_len = len(payload)
+                payload = payload[:PAYLOAD_PREVIEW_BYTES]
+        elif UDP in packet:
+            protocol = "UDP"
+            src_port = packet[UDP].sport
+            dst_port = packet[UDP].dport
+            if packet[UDP].payload:
+                payload = bytes(packet[UDP].payload)[:PAYLOAD_PREVIEW_BYTES]
+        elif packet[IP].proto == 1:
+            protocol = "ICMP"
+
+        return {
+            "src_ip": packet[IP].src,
+            "dst_ip": packet[IP].dst,
+            "src_port": src_port,
+            "dst_port": dst_port,
+            "protocol": protocol,
+            "length": len(packet),
+            "payload": payload,
+            "flags": flags,
+            "tcp_seq": tcp_seq,
+            "tcp_len": tcp_len,
+        }
+
+    def _build_record(self, fields: Dict, timestamp: Optional[float]) -> PacketRecord:
+        """Construye el registro añadiendo timestamp y proceso asociado"""
+        process_name = None
+        pid = None
+
+        # Buscar el proceso asociado a este puerto local
+        if fields['src_port']:
+            proc_info = connection_cache.get_process(fields['src_port'])
+            if proc_info:
+                process_name = proc_info.get('name')
+                pid = proc_info.get('pid')
+
+        return PacketRecord(
+            timestamp=timestamp or time.time(),
+            process_name=process_name,
+            pid=pid,
+            **fields
+        )
+
+    def _update_stats(self, records: List[PacketRecord]):
+        """Actualiza estadísticas (paquetes y bytes) con un lote de paquetes (una sola pasada)"""
+        stats = self.stats
+        protocol_keys = {"TCP": ('tcp', 'tcp_bytes'), "UDP": ('udp', 'udp_bytes'), "ICMP": ('icmp', 'icmp_bytes')}
+        other_keys = ('other', 'other_bytes')
+        # Flujos del lote → [paquetes, bytes]: de ellos salen IPs, puertos, conexiones y distintos
+        batch_flows: Dict[Tuple, List[int]] = {}
+        # Serie temporal del lote por segundo (los lotes rara vez cruzan más de uno)
+        batch_seconds: Dict[int, List[int]] = {}
+        second = None
+        bucket = None
+
+        for packet_info in records:
+            length = packet_info.length
+            flow_key = (packet_info.src_ip, packet_info.src_port, packet_info.dst_ip, packet_info.dst_port)
+            flow = batch_flows.get(flow_key)
+            if flow is None:
+                batch_flows[flow_key] = [1, length]
+            else:
+                flow[0] += 1
+                flow[1] += length
+
+            protocol, protocol_bytes = protocol_keys.get(packet_info.protocol, other_keys)
+            stats[protocol] += 1
+            stats[protocol_bytes] += length
+
+            timestamp = int(packet_info.timestamp)
+            if timestamp != second:
+                second = timestamp
+                bucket = batch_seconds.setdefault(second, [0] * len(SERIES_FIELDS))
+            bucket[0] += 1
+            bucket[1] += length
+            bucket[FIELD_INDEX[protocol]] += 1
+
+        # Contadores del lote por clave distinta → [paquetes, bytes]: una suma por clave en
+        # los contadores/sketches y en los top-K
+        batch_src: Dict[str, List[int]] = {}
+        batch_dst: Dict[str, List[int]] = {}
+        batch_ports: Dict[int, List[int]] = {}
+        batch_pairs: Dict[Tuple[str, str], List[int]] = {}
+
+        def add(batch: Dict, key, count: int, volume: int):
+            entry = batch.get(key)
+            if entry is None:
+                batch[key] = [count, volume]
+            else:
+                entry[0] += count
+                entry[1] += volume
+
+        for (src_ip, src_port, dst_ip, dst_port), (count, volume) in batch_flows.items():
+            add(batch_src, src_ip, count, volume)
+            add(batch_dst, dst_ip, count, volume)
+            add(batch_pairs, (src_ip, dst_ip), count, volume)
+            if src_port:
+                add(batch_ports, src_port, count, volume)
+            if dst_port:
+                add(batch_ports, dst_port, count, volume)
+
+        # Un hash64 por clave distinta del lote, compartido por sketches y HyperLogLog
+        src_hashes = [hash64(key) for key in batch_src]
+        dst_hashes = [hash64(key) for key in batch_dst]
+        port_hashes = [hash64(key) for key in batch_ports]
+
+        stats['ips_src'].update(batch_src, src_hashes)
+        stats['ips_dst'].update(batch_dst, dst_hashes)
+        stats['ports'].update(batch_ports, port_hashes)
+        stats['connections'].update(batch_pairs)
+        stats['top_ips_src'].update_pairs(batch_src)
+        stats['top_ips_dst'].update_pairs(batch_dst)
+        stats['top_ports'].update_pairs(batch_ports)
+        stats['bytes'] += sum(values[1] for values in batch_seconds.values())
+        stats['network'].update(batch_pairs)
+
+        # Distintos: una actualización de HyperLogLog por clave distinta del lote
+        stats['distinct_ips_src'].update_hashes(src_hashes)
+        stats['distinct_ips_dst'].update_hashes(dst_hashes)
+        stats['distinct_ports'].update_hashes(port_hashes)
+        stats['distinct_flows'].update(batch_flows)
+        dst_hash = dict(zip(batch_dst, dst_hashes))
+        minutes = {second // 60 for second in batch_seconds}
+        if len(minutes) == 1:
+            stats['distinct_dst_per_minute'].update_hashes(minutes.pop() * 60, dst_hashes)
+        else:
+            # El lote cruza un cambio de minuto (o es de un pcap reproducido): cada destino a su minuto
+            minute_dsts: Dict[int, set] = {}
+            for packet_info in records:
+                minute_dsts.setdefault(int(packet_info.timestamp) // 60, set()).add(packet_info.dst_ip)
+            for minute, ips in minute_dsts.items():
+                stats['distinct_dst_per_minute'].update_hashes(minute * 60, [dst_hash[ip] for ip in ips])
+        port_hash = dict(zip(batch_ports, port_hashes))
+        stats['distinct_per_source'].update(
+            (
+                (src_ip, dst_hash[dst_ip], port_hash[dst_port] if dst_port else None, count)
+                for (src_ip, _, dst_ip, dst_port), (count, _) in batch_flows.items()
+            ),
+            stats['top_ips_src']
+        )
+        stats['timeseries'].add_seconds(batch_seconds)
@@ -0,0 +1,138 @@
+"""
+Registro interno de paquete.
+
+``PacketRecord`` es el objeto que circula por la ruta caliente (parseo,
+estadísticas, ring de cabeceras, queues y workers). Usa ``__slots__`` y no
+valida nada, a diferencia de ``PacketData`` (pydantic), que queda solo para
+el borde HTTP/WebSocket: ``to_model()`` y ``to_json()`` hacen la conversión
+cuando una ruta la necesita, y ``to_json()`` se cachea para que varios
+clientes WebSocket no serialicen el mismo paquete más de una vez.
+
+El payload se guarda como los bytes crudos recortados; ``payload_preview``
+(hex) y la vista ASCII se generan solo cuando el paquete sale por la API.
+"""
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from ..models import PacketData
+
+PAYLOAD_FORMATS = ("hex", "ascii")
+# Bytes imprimibles tal cual; el resto como "."
+_ASCII_TABLE = bytes(b if 32 <= b < 127 else ord(".") for b in range(256))
+
+
+def render_payload(payload: Optional[bytes], payload_format: str = "hex") -> Optional[str]:
+    """Representación textual de un payload crudo (hex o ASCII)"""
+    if not payload:
+        return None
+    if payload_format == "ascii":
+        return payload.translate(_ASCII_TABLE).decode("ascii")
+    return payload.hex()
+
+
+class PacketRecord:
+    """Paquete capturado, con el timestamp como epoch en segundos"""
+
+    __slots__ = (
+        "timestamp",
+        "src_ip",
+        "dst_ip",
+        "src_port",
+        "dst_port",
+        "protocol",
+        "length",
+        "payload",
+        "flags",
+        "process_name",
+        "pid",
+        "tcp_seq",
+        "tcp_len",
+        "hostname",
+        "_json",
+    )
+
+    def __init__(
+        self,
+        timestamp: float,
+        src_ip: str,
+        dst_ip: str,
+        src_port: Optional[int],
+        dst_port: Optional[int],
+        protocol: str,
+        length: int,
+        payload: Optional[bytes] = None,
+        flags: Optional[str] = None,
+        process_name: Optional[str] = None,
+        pid: Optional[int] = None,
+        tcp_seq: Optional[int] = None,
+        tcp_len: Optional[int] = None,
+        hostname: Optional[str] = None
+    ):
+        self.timestamp = timestamp
+        self.src_ip = src_ip
+        self.dst_ip = dst_ip
+        self.src_port = src_port
+        self.dst_port = dst_port
+        self.protocol = protocol
+        self.length = length
+        self.payload = payload
+        self.flags = flags
+        self.process_name = process_name
+        self.pid = pid
+        self.tcp_seq = tcp_seq  # Solo para las métricas de flujo; no sale por la API
+        self.tcp_len = tcp_len
+        self.hostname = hostname  # SNI/Host del primer segmento; se asigna al flujo
+        self._json = None
+
+    def __getstate__(self):
+        # Los workers envían registros por multiprocessing; la caché JSON no viaja
+        return tuple(getattr(self, name) for name in self.__slots__[:-1])
+
+    def __setstate__(self, state):
+        for name, value in zip(self.__slots__[:-1], state):
+            setattr(self, name, value)
+        self._json = None
+
+    def __repr__(self) -> str:
+        return f"PacketRecord({self.protocol} {self.src_ip}:{self.src_port} -> {self.dst_ip}:{self.dst_port}, {self.length}B)"
+
+    @property
+    def payload_preview(self) -> Optional[str]:
+        """Payload en hex (se genera en cada acceso)"""
+        return render_payload(self.payload)
+
+    def to_json(self, payload_format: str = "hex") -> Dict[str, Any]:
+        """Equivalente a ``PacketData.model_dump(mode='json')`` (cacheado en hex)"""
+        if payload_format != "hex":
+            return {**self.to_json(), "payload_preview": render_payload(self.payload, payload_format)}
+        if self._json is None:
+            self._json = {
+                "timestamp": datetime.fromtimestamp(self.timestamp).isoformat(),
+                "src_ip": self.src_ip,
+                "dst_ip": self.dst_ip,
+                "src_port": self.src_port,
+                "dst_port": self.dst_port,
+                "protocol": self.protocol,
+                "length": self.length,
+                "payload_preview": self.payload_preview,
+                "flags": self.flags,
+                "process_name": self.process_name,
+                "pid": self.pid,
+            }
+        return self._json
+
+    def to_model(self, payload_format: str = "hex") -> PacketData:
+        """Convierte el registro al modelo pydantic de la API"""
+        return PacketData(
+            timestamp=datetime.fromtimestamp(self.timestamp),
+            src_ip=self.src_ip,
+            dst_ip=self.dst_ip,
+            src_port=self.src_port,
+            dst_port=self.dst_port,
+            protocol=self.protocol,
+            length=self.length,
+            payload_preview=render_payload(self.payload, payload_format),
+            flags=self.flags,
+            process_name=self.process_name,
+            pid=self.pid
+        )
@@ -0,0 +1,129 @@
+"""
+Muestreo de paquetes.
+
+Modos:
+
+- ``none``: se procesan todas las tramas.
+- ``count``: determinista, 1 de cada ``sample_every`` tramas.
+- ``random``: cada trama se procesa con probabilidad ``sample_probability``.
+- ``flow``: se conservan flujos completos; la decisión es un hash de la
+  5-tupla canónica (igual en ambos sentidos) comparado con
+  ``sample_probability``, así que el mismo flujo se decide igual en todos los
+  lotes y procesos.
+
+``count`` y ``random`` se deciden antes de parsear la trama (el ahorro
+principal); ``flow`` necesita la 5-tupla y se decide tras el disector, pero
+antes del buffer, el spool y las estadísticas.
+
+Las estadísticas guardan los contadores de la muestra; ``estimate_stats``
+los escala por ``scale`` (1/tasa) para obtener totales estimados.
+"""
+import random
+import zlib
+from typing import Dict, Optional
+
+from .packet_record import PacketRecord
+from .sketches import STATS_SUMMARIES
+
+SAMPLING_MODES = ("none", "count", "random", "flow")
+_HASH_SPACE = 1 << 32
+
+
+class PacketSampler:
+    """Decide qué tramas se procesan y con qué factor se escalan los contadores"""
+
+    def __init__(self, mode: str = "none", sample_every: int = 1, sample_probability: float = 1.0):
+        if mode not in SAMPLING_MODES:
+            raise ValueError(f"Modo de muestreo desconocido: {mode}")
+        if sample_every < 1:
+            raise ValueError("sample_every debe ser >= 1")
+        if not 0.0 < sample_probability <= 1.0:
+            raise ValueError("sample_probability debe estar en (0, 1]")
+        self.mode = mode
+        self.sample_every = sample_every
+        self.sample_probability = sample_probability
+        self._seen = 0
+        self._threshold = int(sample_probability * _HASH_SPACE)
+
+    @property
+    def enabled(self) -> bool:
+        if self.mode == "count":
+            return self.sample_every > 1
+        return self.mode != "none" and self.sample_probability < 1.0
+
+    @property
+    def rate(self) -> float:
+        """Fracción esperada de tramas procesadas"""
+        if not self.enabled:
+            return 1.0
+        if self.mode == "count":
+            return 1.0 / self.sample_every
+        return self.sample_probability
+
+    @property
+    def scale(self) -> float:
+        return 1.0 / self.rate
+
+    @property
+    def samples_frames(self) -> bool:
+        """True si la decisión se toma antes de parsear (count/random)"""
+        return self.enabled and self.mode in ("count", "random")
+
+    @property
+    def samples_flows(self) -> bool:
+        return self.enabled and self.mode == "flow"
+
+    def keep_frame(self) -> bool:
+        """Decisión previa al parseo (count/random)"""
+        if self.mode == "count":
+            self._seen += 1
+            if self._seen >= self.sample_every:
+                self._seen = 0
+                return True
+            return False
+        return random.random() < self.sample_probability
+
+    def keep_flow(self, record: PacketRecord) -> bool:
+        """Decisión por flujo: mismo resultado para ambos sentidos de la 5-tupla"""
+        a = (record.src_ip, record.src_port or 0)
+        b = (record.dst_ip, record.dst_port or 0)
+        if b < a:
+            a, b = b, a
+        key = f"{record.protocol}|{a[0]}|{a[1]}|{b[0]}|{b[1]}"
+        return zlib.crc32(key.encode()) < self._threshold
+
+    def describe(self) -> Dict:
+        return {
+            "mode": self.mode if self.enabled else "none",
+            "rate": self.rate,
+            "scale": self.scale,
+        }
+
+
+def estimate_stats(stats: Dict, scale: float) -> Dict:
+    """
+    Copia de ``stats`` con los contadores escalados (totales estimados). Sin
+    muestreo devuelve el propio ``stats``: quien lo reciba no debe modificarlo.
+    """
+    if scale == 1.0:
+        return stats
+    estimated: Dict = {}
+    for key, value in stats.items():
+        if isinstance(value, dict):
+            estimated[key] = {item: round(count * scale) for item, count in value.items()}
+        elif isinstance(value, STATS_SUMMARIES):
+            estimated[key] = value.scaled(scale)
+        else:
+            estimated[key] = round(value * scale)
+    return estimated
+
+
+def sampling_summary(sampled: Dict, estimated: Dict, sampler: Optional[PacketSampler] = None) -> Dict:
+    """Bloque ``sampling`` de las respuestas: muestra cruda frente a estimación"""
+    summary = sampler.describe() if sampler else {}
+    summary.update({
+        "sampled_packets": sampled['total'],
+        "estimated_packets": estimated['total'],
+        "sampled": {key: sampled[key] for key in ('tcp', 'udp', 'icmp', 'other')},
+    })
+    return summary
@@ -0,0 +1,364 @@
+"""
+Spool en disco de tramas capturadas.
+
+Las tramas crudas se añaden a segmentos pcapng (``segment_NNNNNNNN.pcapng``)
+con escrituras bufferizadas; cada Enhanced Packet Block guarda la longitud
+original de la trama, así que una trama recortada al snaplen se lee y se
+exporta con su tamaño real. Un segmento se cierra al superar
+``segment_bytes`` o ``segment_seconds`` (según el timestamp de las tramas) y
+al rotar se borran los segmentos más antiguos hasta cumplir ``max_bytes``.
+
+Cada segmento tiene un índice ``.idx`` con entradas de tamaño fijo:
+
+- tiempo: ``(timestamp, offset, interfaces declaradas hasta ahí)`` cada
+  ``SPOOL_INDEX_EVERY`` tramas;
+- interfaz: ``(linktype, offset del IDB)`` cada vez que aparece un tipo de
+  enlace nuevo;
+- rango: al cerrar el segmento, sus timestamps mínimo y máximo y si llegaron
+  en orden.
+
+La retención se mide en un ``SpoolBudget`` que pueden compartir varios
+spools (uno por sesión de captura): mientras el total de todos supere
+``max_bytes`` cada spool borra al rotar sus propios segmentos más antiguos,
+así que el presupuesto es global sin que un spool toque los ficheros de otro.
+
+Una lectura por rango de tiempo elige los segmentos cuyo rango de timestamps
+solapa el pedido. Si las tramas del segmento llegaron en orden busca en el
+índice la última entrada anterior al inicio, salta directamente a ese offset
+con ``PcapReader.iter_pcapng_from`` y para al pasar el fin. Los informes de
+varios workers de fanout intercalan timestamps: esos segmentos (y los que no
+tienen índice completo, p. ej. tras una caída) se recorren enteros filtrando
+por tiempo.
+"""
+import bisect
+import logging
+import os
+import re
+import struct
+import threading
+from typing import Dict, Iterator, List, Optional
+
+from .frame_buffer import RawFrame
+from .pcap_reader import PcapReader
+from .pcap_writer import PcapngStreamWriter, EXPORT_SNAPLEN
+
+logger = logging.getLogger(__name__)
+
+SPOOL_INDEX_EVERY = 256
+SPOOL_WRITE_BUFFER = 1 << 20
+SPOOL_READ_FRAMES = 1024
+SPOOL_TS_SCALE = 1e-9  # PcapngStreamWriter declara if_tsresol en nanosegundos
+
+_SEGMENT_NAME = re.compile(r"^segment_(\d{8})\.pcapng$")
+# kind, timestamp, offset, valor (nº de interfaces, linktype o 1 si el segmento está en orden)
+_INDEX_ENTRY = struct.Struct("<BdQI")
+_INDEX_TIME = 0
+_INDEX_INTERFACE = 1
+_INDEX_MIN = 2  # Al cerrar: timestamp mínimo y si los timestamps no decrecen
+_INDEX_MAX = 3  # Al cerrar: timestamp máximo
+
+
+class SpoolBudget:
+    """Bytes en disco de uno o varios spools frente a un máximo común (0 = sin límite)"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._used = 0
+        self._lock = threading.Lock()
+
+    @property
+    def used(self) -> int:
+        return self._used
+
+    def add(self, size: int):
+        with self._lock:
+            self._used += size
+
+    def exceeded(self) -> bool:
+        return bool(self.max_bytes) and self._used > self.max_bytes
+
+
+class SpoolSegment:
+    """Un fichero de segmento y su índice"""
+
+    def __init__(self, directory: str, number: int):
+        self.number = number
+        self.path = os.path.join(directory, f"segment_{number:08d}.pcapng")
+        self.index_path = self.path + ".idx"
+        self.first_ts: Optional[float] = None  # Primera trama (rotación por tiempo)
+        self.min_ts: Optional[float] = None  # Rango de timestamps; None si se desconoce
+        self.max_ts: Optional[float] = None
+        self.ordered = True  # Timestamps no decrecientes: el índice sirve para buscar
+        self.size = 0
+
+    def overlaps(self, start: float, end: float) -> bool:
+        if self.min_ts is None or self.max_ts is None:
+            return True
+        return self.min_ts <= end and self.max_ts >= start
+
+    def load_index(self):
+        """
+        Lee el índice: (tiempos, offsets, nº de interfaces) y linktypes; el
+        rango de timestamps, si el segmento se cerró, queda en el segmento
+        """
+        times, offsets, counts, linktypes = [], [], [], []
+        try:
+            with open(self.index_path, "rb") as f:
+                raw = f.read()
+        except FileNotFoundError:
+            raw = b""
+        usable = len(raw) - len(raw) % _INDEX_ENTRY.size
+        for kind, timestamp, offset, value in _INDEX_ENTRY.iter_unpack(raw[:usable]):
+            if kind == _INDEX_TIME:
+                times.append(timestamp)
+                offsets.append(offset)
+                counts.append(value)
+            elif kind == _INDEX_INTERFACE:
+                linktypes.append(value)
+            elif kind == _INDEX_MIN:
+                self.min_ts = timestamp
+                self.ordered = bool(value)
+            elif kind == _INDEX_MAX:
+                self.max_ts = timestamp
+        return times, offsets, counts, linktypes
+
+
+class PacketSpool:
+    """Segmentos pcapng rotatorios con índice tiempo→offset y retención por bytes"""
+
+    def __init__(
+        self,
+        directory: str,
+        segment_bytes: int,
+        segment_seconds: float,
+        max_bytes: int,
+        budget: Optional[SpoolBudget] = None
+    ):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.segment_seconds = segment_seconds
+        self.budget = budget or SpoolBudget(max_bytes)  # Compartido entre sesiones si se indica
+        self._lock = threading.Lock()
+        self._segments: List[SpoolSegment] = []
+        self._active: Optional[SpoolSegment] = None
+        self._data = None
+        self._index = None
+        self._writer: Optional[PcapngStreamWriter] = None
+        self._linktypes: Dict[int, int] = {}
+        self._frames_since_index = 0
+        os.makedirs(directory, exist_ok=True)
+        self._recover()
+
+    def _recover(self):
+        """
+        Recupera los segmentos existentes (sobreviven a reinicios). Los que no
+        se cerraron limpiamente cuentan igual para la retención y se leen
+        enteros; los vacíos y los índices sin segmento se borran.
+        """
+        names = os.listdir(self.directory)
+        numbers = sorted(
+            int(match.group(1))
+            for match in (_SEGMENT_NAME.match(name) for name in names)
+            if match
+        )
+        for name in names:
+            if name.endswith(".idx") and _SEGMENT_NAME.match(name[:-4]) and name[:-4] not in names:
+                os.remove(os.path.join(self.directory, name))
+        for number in numbers:
+            segment = SpoolSegment(self.directory, number)
+            segment.size = os.path.getsize(segment.path)
+            if not segment.size:
+                self._remove_segment(segment)
+                continue
+            times = segment.load_index()[0]
+            if segment.max_ts is None:
+                # Sin entradas de cierre: rango y orden desconocidos
+                segment.min_ts = None
+                segment.ordered = False
+            segment.first_ts = times[0] if times else segment.min_ts
+            self._segments.append(segment)
+            self.budget.add(segment.size)
+        if self._segments:
+            logger.info(f"Spool: {len(self._segments)} segmentos recuperados en {self.directory}")
+
+    @property
+    def max_bytes(self) -> int:
+        return self.budget.max_bytes
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(segment.size for segment in self._segments)
+
+    def write(self, frames: List[RawFrame]):
+        """Añade tramas al segmento activo, rotando si hace falta"""
+        if not frames:
+            return
+        with self._lock:
+            for timestamp, linktype, data, orig_len in frames:
+                if self._should_rotate(timestamp):
+                    self._close_active()
+                    self._apply_retention()
+                if self._active is None:
+                    self._open_segment(timestamp)
+                segment = self._active
+                if timestamp < segment.max_ts:
+                    segment.ordered = False
+                    segment.min_ts = min(segment.min_ts, timestamp)
+                else:
+                    segment.max_ts = timestamp
+                if self._frames_since_index == 0:
+                    # Interfaces declaradas antes de este offset (el IDB de un linktype
+                    # nuevo va dentro del propio bloque y lo lee el reader)
+                    self._index.write(_INDEX_ENTRY.pack(_INDEX_TIME, timestamp, segment.size, len(self._linktypes)))
+                if linktype not in self._linktypes:
+                    self._linktypes[linktype] = len(self._linktypes)
+                    self._index.write(_INDEX_ENTRY.pack(_INDEX_INTERFACE, 0.0, segment.size, linktype))
+                block = self._writer.encode(timestamp, linktype, data, orig_len)
+                self._data.write(block)
+                segment.size += len(block)
+                self.budget.add(len(block))
+                self._frames_since_index = (self._frames_since_index + 1) % SPOOL_INDEX_EVERY
+
+    def _should_rotate(self, timestamp: float) -> bool:
+        segment = self._active
+        if segment is None:
+            return False
+        if segment.size >= self.segment_bytes:
+            return True
+        return self.segment_seconds > 0 and timestamp - segment.first_ts >= self.segment_seconds
+
+    def _open_segment(self, timestamp: float):
+        number = self._segments[-1].number + 1 if self._segments else 0
+        segment = SpoolSegment(self.directory, number)
+        segment.first_ts = segment.min_ts = segment.max_ts = timestamp
+        self._data = open(segment.path, "wb", buffering=SPOOL_WRITE_BUFFER)
+        self._index = open(segment.index_path, "wb", buffering=SPOOL_WRITE_BUFFER)
+        self._writer = PcapngStreamWriter()
+        self._linktypes = {}
+        self._frames_since_index = 0
+        self._active = segment
+        self._segments.append(segment)
+
+    def _close_active(self):
+        segment = self._active
+        if segment is None:
+            return
+        self._index.write(_INDEX_ENTRY.pack(_INDEX_MIN, segment.min_ts, 0, int(segment.ordered)))
+        self._index.write(_INDEX_ENTRY.pack(_INDEX_MAX, segment.max_ts, 0, 0))
+        self._data.close()
+        self._index.close()
+        self._data = self._index = self._writer = None
+        self._active = None
+
+    def _apply_retention(self):
+        """Borra segmentos cerrados antiguos mientras se supere el presupuesto"""
+        while len(self._segments) > 1 and self.budget.exceeded():
+            oldest = self._segments[0]
+            if oldest is self._active:
+                break
+            self._segments.pop(0)
+            self._remove_segment(oldest)
+            logger.debug(f"Spool: segmento {oldest.path} eliminado por retención")
+
+    def _remove_segment(self, segment: SpoolSegment):
+        for path in (segment.path, segment.index_path):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        self.budget.add(-segment.size)
+
+    def flush(self):
+        with self._lock:
+            if self._active is not None:
+                self._data.flush()
+                self._index.flush()
+
+    def close(self):
+        """
+        Cierra el spool: sus segmentos se conservan en disco (se recuperan
+        al volver a abrirlo) pero dejan de contar en el presupuesto
+        """
+        with self._lock:
+            self._close_active()
+            self.budget.add(-self.total_bytes)
+            self._segments = []
+        self._remove_directory()
+
+    def purge(self):
+        """Cierra el spool y borra todos sus segmentos (la sesión se elimina)"""
+        with self._lock:
+            self._close_active()
+            for segment in self._segments:
+                self._remove_segment(segment)
+            self._segments = []
+        self._remove_directory()
+
+    def _remove_directory(self):
+        try:
+            os.rmdir(self.directory)
+        except OSError:
+            pass  # No vacío (segmentos conservados o subdirectorios de otras sesiones)
+
+    def list_segments(self) -> List[Dict]:
+        with self._lock:
+            return [
+                {
+                    "file": os.path.basename(segment.path),
+                    "first_ts": segment.first_ts,
+                    "bytes": segment.size,
+                    "active": segment is self._active,
+                }
+                for segment in self._segments
+            ]
+
+    def read_range(self, start: Optional[float] = None, end: Optional[float] = None) -> Iterator[List[RawFrame]]:
+        """
+        Tramas con ``start <= timestamp <= end`` en lotes de ``SPOOL_READ_FRAMES``.
+
+        Solo se abren los segmentos que solapan el rango y en cada uno se
+        salta al offset indexado más cercano anterior a ``start``.
+        """
+        start = float("-inf") if start is None else start
+        end = float("inf") if end is None else end
+        with self._lock:
+            if self._active is not None:
+                self._data.flush()
+                self._index.flush()
+            segments = list(self._segments)
+
+        for segment in segments:
+            if segment.overlaps(start, end):
+                yield from self._read_segment(segment, start, end)
+
+    def _read_segment(self, segment: SpoolSegment, start: float, end: float) -> Iterator[List[RawFrame]]:
+        times, offsets, counts, linktypes = segment.load_index()
+        ordered = segment.ordered and bool(times)
+        if ordered:
+            position = max(bisect.bisect_right(times, start) - 1, 0)
+            offset = offsets[position]
+            interfaces = [(linktype, EXPORT_SNAPLEN, SPOOL_TS_SCALE) for linktype in linktypes[:counts[position]]]
+        else:
+            # Timestamps intercalados o sin índice: desde el principio (el reader lee los IDB)
+            offset, interfaces = 0, []
+        try:
+            reader = PcapReader(segment.path)
+        except (FileNotFoundError, ValueError):
+            return  # Eliminado por retención o aún vacío
+        with reader:
+            batch = []
+            frame = None  # Definida aunque el segmento no tenga tramas
+            for frame, timestamp, linktype, orig_len in reader.iter_pcapng_from(offset, interfaces):
+                if timestamp > end:
+                    if ordered:
+                        break
+                    continue
+                if timestamp >= start:
+                    batch.append((timestamp, linktype, bytes(frame), orig_len))
+                    if len(batch) >= SPOOL_READ_FRAMES:
+                        yield batch
+                        batch = []
+            # Soltar la última vista sobre el mapeo: con ella viva, close() no puede cerrarlo (BufferError) y queda abierto
+            frame = None
+            if batch:
+                yield batch
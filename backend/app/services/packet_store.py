@@ -0,0 +1,201 @@
+"""
+Almacén columnar de paquetes capturados.
+
+Guarda las cabeceras de los paquetes en un array estructurado de NumPy de
+capacidad fija usado como ring buffer: cuando se llena, las filas nuevas
+sobrescriben a las más antiguas. Cada fila ocupa ``PACKET_DTYPE.itemsize``
+bytes (IPs como enteros de 128 bits, puertos, código de protocolo, flags TCP
+como máscara de bits, longitud, timestamp, PID y nombre de proceso internado),
+frente a los cientos de bytes de un objeto por paquete. Los ``PacketRecord``
+solo se construyen para las filas que se devuelven.
+
+El payload recortado no se copia al array: una columna paralela de objetos
+guarda solo la referencia a los bytes del registro (None si no hay payload).
+
+El almacén no es thread-safe: ``PacketCaptureService`` lo protege con su lock.
+"""
+import socket
+import struct
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .packet_dissector import TCP_FLAG_STRINGS
+from .packet_record import PacketRecord
+
+# Códigos de protocolo (el índice es el código guardado)
+PROTOCOL_NAMES = ("UNKNOWN", "TCP", "UDP", "ICMP")
+PROTOCOL_CODES = {name: code for code, name in enumerate(PROTOCOL_NAMES)}
+PROTOCOL_TCP = PROTOCOL_CODES["TCP"]
+
+TCP_FLAG_BITS = {flags: bits for bits, flags in enumerate(TCP_FLAG_STRINGS)}
+
+NO_PORT = 0
+NO_PID = -1
+NO_PROCESS = 0
+MAX_PROCESS_NAMES = 0xFFFF
+
+PACKET_DTYPE = np.dtype([
+    ("timestamp", "f8"),
+    ("src_ip_hi", "u8"),  # IPv6: 64 bits altos; IPv4: 0
+    ("src_ip_lo", "u8"),  # IPv6: 64 bits bajos; IPv4: la dirección
+    ("dst_ip_hi", "u8"),
+    ("dst_ip_lo", "u8"),
+    ("src_port", "u2"),
+    ("dst_port", "u2"),
+    ("ip_version", "u1"),
+    ("protocol", "u1"),
+    ("flags", "u2"),
+    ("length", "u4"),
+    ("pid", "i4"),
+    ("process", "u2"),  # Índice en la tabla de nombres de proceso (0 = ninguno)
+])
+
+_IPV6_HALVES = struct.Struct("!QQ")
+_IPV4 = struct.Struct("!I")
+
+
+def _encode_ip(ip: str):
+    """Convierte una IP textual en (versión, hi, lo)"""
+    if ":" in ip:
+        hi, lo = _IPV6_HALVES.unpack(socket.inet_pton(socket.AF_INET6, ip))
+        return 6, hi, lo
+    return 4, 0, _IPV4.unpack(socket.inet_aton(ip))[0]
+
+
+def _decode_ip(version: int, hi: int, lo: int) -> str:
+    if version == 6:
+        return socket.inet_ntop(socket.AF_INET6, _IPV6_HALVES.pack(hi, lo))
+    return socket.inet_ntoa(_IPV4.pack(lo))
+
+
+class PacketStore:
+    """Ring buffer columnar de cabeceras de paquetes"""
+
+    def __init__(self, capacity: int):
+        if capacity <= 0:
+            raise ValueError("La capacidad del almacén de paquetes debe ser positiva")
+        self.capacity = capacity
+        # np.zeros reserva memoria perezosamente: solo se tocan las páginas usadas
+        self._rows = np.zeros(capacity, dtype=PACKET_DTYPE)
+        self._payloads = np.empty(capacity, dtype=object)  # Referencias a los bytes del payload
+        self._next = 0  # Próxima fila a escribir
+        self._count = 0  # Filas válidas (<= capacity)
+        self._process_names: List[str] = [""]
+        self._process_codes: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def nbytes(self) -> int:
+        """Memoria reservada por el ring (sin contar los bytes de los payloads)"""
+        return self._rows.nbytes + self._payloads.nbytes
+
+    def _process_code(self, name) -> int:
+        if not name:
+            return NO_PROCESS
+        code = self._process_codes.get(name)
+        if code is None:
+            if len(self._process_names) > MAX_PROCESS_NAMES:
+                return NO_PROCESS
+            code = len(self._process_names)
+            self._process_names.append(name)
+            self._process_codes[name] = code
+        return code
+
+    def append(self, records: List[PacketRecord]):
+        """Añade un lote de paquetes sobrescribiendo los más antiguos si no cabe"""
+        if not records:
+            return
+        # Si el lote no cabe entero solo sobreviven sus últimas `capacity` filas
+        records = records[-self.capacity:]
+        process_code = self._process_code
+        rows = []
+        payloads = np.empty(len(records), dtype=object)
+        for index, packet in enumerate(records):
+            payloads[index] = packet.payload
+            src_version, src_hi, src_lo = _encode_ip(packet.src_ip)
+            _, dst_hi, dst_lo = _encode_ip(packet.dst_ip)
+            rows.append((
+                packet.timestamp,
+                src_hi, src_lo,
+                dst_hi, dst_lo,
+                packet.src_port or NO_PORT,
+                packet.dst_port or NO_PORT,
+                src_version,
+                PROTOCOL_CODES.get(packet.protocol, 0),
+                TCP_FLAG_BITS.get(packet.flags, 0) if packet.flags else 0,
+                packet.length,
+                packet.pid if packet.pid is not None else NO_PID,
+                process_code(packet.process_name),
+            ))
+        self._write(np.array(rows, dtype=PACKET_DTYPE), payloads)
+
+    def _write(self, rows: np.ndarray, payloads: np.ndarray):
+        n = len(rows)
+        first = min(n, self.capacity - self._next)
+        self._rows[self._next:self._next + first] = rows[:first]
+        self._payloads[self._next:self._next + first] = payloads[:first]
+        if first < n:
+            self._rows[:n - first] = rows[first:]
+            self._payloads[:n - first] = payloads[first:]
+        self._next = (self._next + n) % self.capacity
+        self._count = min(self.capacity, self._count + n)
+
+    def _tail(self, column: np.ndarray, limit: int) -> np.ndarray:
+        limit = max(0, min(limit, self._count))
+        if not limit:
+            return column[:0].copy()
+        start = self._next - limit
+        if start >= 0:
+            return column[start:self._next].copy()
+        return np.concatenate((column[start:], column[:self._next]))
+
+    def tail(self, limit: int) -> np.ndarray:
+        """Copia de las últimas ``limit`` filas, de la más antigua a la más reciente"""
+        return self._tail(self._rows, limit)
+
+    def tail_payloads(self, limit: int) -> List[Optional[bytes]]:
+        """Payloads de las últimas ``limit`` filas (mismo orden que ``tail``)"""
+        return self._tail(self._payloads, limit).tolist()
+
+    def materialise(self, rows: np.ndarray, payloads: Optional[List[Optional[bytes]]] = None) -> List[PacketRecord]:
+        """Construye ``PacketRecord`` para las filas dadas (y sus payloads, si se pasan)"""
+        names = self._process_names
+        if payloads is None:
+            payloads = [None] * len(rows)
+        packets = []
+        for row, payload in zip(rows.tolist(), payloads):
+            (timestamp, src_hi, src_lo, dst_hi, dst_lo, src_port, dst_port,
+             version, protocol, flags, length, pid, process) = row
+            packets.append(PacketRecord(
+                timestamp=timestamp,
+                src_ip=_decode_ip(version, src_hi, src_lo),
+                dst_ip=_decode_ip(version, dst_hi, dst_lo),
+                src_port=src_port or None,
+                dst_port=dst_port or None,
+                protocol=PROTOCOL_NAMES[protocol],
+                length=length,
+                payload=payload,
+                flags=TCP_FLAG_STRINGS[flags] if protocol == PROTOCOL_TCP else None,
+                pid=None if pid == NO_PID else pid,
+                process_name=names[process] or None,
+            ))
+        return packets
+
+    def latest(self, limit: int) -> List[PacketRecord]:
+        """Últimos ``limit`` paquetes como ``PacketRecord``"""
+        return self.materialise(self.tail(limit), self.tail_payloads(limit))
+
+    def drain(self) -> List[PacketRecord]:
+        """Devuelve todos los paquetes almacenados y vacía el ring"""
+        packets = self.latest(self._count)
+        self.clear()
+        return packets
+
+    def clear(self):
+        """Vacía el ring sin liberar la memoria reservada"""
+        self._next = 0
+        self._count = 0
+        self._payloads.fill(None)  # Soltar las referencias a los payloads
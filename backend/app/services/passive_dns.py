@@ -0,0 +1,193 @@
+"""
+DNS pasivo: mapa IP → nombre de host construido a partir del tráfico.
+
+El servicio de captura entrega aquí las respuestas DNS que ve pasar
+(``parse_dns_response`` extrae los registros A/AAAA y los asocia al nombre
+preguntado, no al CNAME final del CDN). ``PassiveDNSCache`` es un LRU acotado
+(``OrderedDict``: consulta, inserción y expulsión O(1)) donde cada entrada
+caduca según el TTL de la respuesta, limitado a ``[min_ttl, max_ttl]``.
+
+Los workers de captura multi-proceso acumulan las observaciones en un
+``HostnameBuffer`` y las envían al proceso de la API con cada informe.
+"""
+import socket
+import struct
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from ..core.config import settings
+
+DNS_PORTS = (53, 5353)
+
+# (ip, nombre de host, ttl en segundos)
+HostnameObservation = Tuple[str, str, int]
+
+_DNS_HEADER = struct.Struct("!HHHHHH")
+_DNS_RR = struct.Struct("!HHIH")  # type, class, ttl, rdlength
+DNS_TYPE_A = 1
+DNS_TYPE_AAAA = 28
+DNS_CLASS_IN = 1
+_DNS_MAX_LABELS = 128
+HOSTNAME_BUFFER_SIZE = 10_000  # Observaciones que un worker retiene entre informes
+
+
+def _read_name(message, offset: int) -> Tuple[Optional[str], int]:
+    """Lee un nombre (con compresión); retorna (nombre, offset tras el nombre)"""
+    labels = []
+    end = None  # Offset tras el nombre en la posición original
+    length = len(message)
+    for _ in range(_DNS_MAX_LABELS):
+        if offset >= length:
+            return None, offset
+        size = message[offset]
+        if size & 0xC0 == 0xC0:
+            if offset + 1 >= length:
+                return None, offset
+            if end is None:
+                end = offset + 2
+            offset = ((size & 0x3F) << 8) | message[offset + 1]
+            continue
+        if size == 0:
+            name = ".".join(labels).lower()
+            return name, end if end is not None else offset + 1
+        label = message[offset + 1:offset + 1 + size]
+        if len(label) < size:
+            return None, offset
+        labels.append(bytes(label).decode("ascii", "replace"))
+        offset += 1 + size
+    return None, offset
+
+
+def parse_dns_response(message) -> List[HostnameObservation]:
+    """Registros A/AAAA de una respuesta DNS como (ip, nombre preguntado, ttl)"""
+    if len(message) < _DNS_HEADER.size:
+        return []
+    _, flags, qdcount, ancount, _, _ = _DNS_HEADER.unpack_from(message, 0)
+    # Solo respuestas (QR) sin error
+    if not flags & 0x8000 or flags & 0x000F or not ancount:
+        return []
+    offset = _DNS_HEADER.size
+    question = None
+    for _ in range(qdcount):
+        name, offset = _read_name(message, offset)
+        if name is None:
+            return []
+        question = question or name
+        offset += 4  # qtype, qclass
+    observations = []
+    for _ in range(ancount):
+        name, offset = _read_name(message, offset)
+        if name is None or offset + _DNS_RR.size > len(message):
+            break
+        rtype, rclass, ttl, rdlength = _DNS_RR.unpack_from(message, offset)
+        offset += _DNS_RR.size
+        rdata = message[offset:offset + rdlength]
+        offset += rdlength
+        if len(rdata) < rdlength or rclass & 0x7FFF != DNS_CLASS_IN:
+            continue
+        if rtype == DNS_TYPE_A and rdlength == 4:
+            ip = socket.inet_ntoa(bytes(rdata))
+        elif rtype == DNS_TYPE_AAAA and rdlength == 16:
+            ip = socket.inet_ntop(socket.AF_INET6, bytes(rdata))
+        else:
+            continue
+        observations.append((ip, question or name, ttl))
+    return observations
+
+
+class PassiveDNSCache:
+    """LRU acotado IP → nombre de host con caducidad por TTL"""
+
+    def __init__(self, capacity: int, min_ttl: int, max_ttl: int):
+        self.capacity = capacity
+        self.min_ttl = min_ttl
+        self.max_ttl = max_ttl
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.version = 0  # Cambia cuando una IP gana o cambia de nombre
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, observations: Iterable[HostnameObservation]):
+        now = time.monotonic()
+        entries = self._entries
+        with self._lock:
+            for ip, hostname, ttl in observations:
+                ttl = min(max(ttl, self.min_ttl), self.max_ttl)
+                current = entries.get(ip)
+                if current is None or current[0] != hostname:
+                    self.version += 1
+                entries[ip] = (hostname, now + ttl)
+                entries.move_to_end(ip)
+            while len(entries) > self.capacity:
+                entries.popitem(last=False)
+                self.evictions += 1
+
+    def lookup(self, ip: str) -> Optional[str]:
+        """Nombre de host vigente para una IP (None si no hay o ha caducado)"""
+        with self._lock:
+            entry = self._entries.get(ip)
+            if entry is None:
+                self.misses += 1
+                return None
+            hostname, expires = entry
+            if expires < time.monotonic():
+                del self._entries[ip]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(ip)
+            self.hits += 1
+            return hostname
+
+    def lookup_many(self, ips: Iterable[str]) -> Dict[str, str]:
+        """Nombres vigentes de varias IPs (solo las que tienen entrada)"""
+        names = {}
+        for ip in ips:
+            hostname = self.lookup(ip)
+            if hostname:
+                names[ip] = hostname
+        return names
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.version += 1
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class HostnameBuffer:
+    """Acumula observaciones en un worker hasta el siguiente informe (acotado)"""
+
+    def __init__(self, capacity: int = HOSTNAME_BUFFER_SIZE):
+        self.capacity = capacity
+        self._observations: List[HostnameObservation] = []
+
+    def add(self, observations: Iterable[HostnameObservation]):
+        if len(self._observations) < self.capacity:
+            self._observations.extend(observations)
+
+    def drain(self) -> List[HostnameObservation]:
+        observations, self._observations = self._observations, []
+        return observations
+
+
+# Instancia global (compartida por todas las sesiones de captura)
+passive_dns = PassiveDNSCache(
+    settings.PASSIVE_DNS_SIZE,
+    min_ttl=settings.PASSIVE_DNS_MIN_TTL,
+    max_ttl=settings.PASSIVE_DNS_MAX_TTL
+)
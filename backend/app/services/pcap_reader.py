@@ -0,0 +1,190 @@
+"""
+Lector de ficheros pcap/pcapng sin copias.
+
+El fichero se mapea en memoria y ``iter_records`` recorre las cabeceras con
+``struct.unpack_from`` devolviendo cada trama como un ``memoryview`` sobre el
+mapeo (sin copiar los datos). Soporta pcap clásico (micro y nanosegundos, en
+ambos órdenes de bytes) y pcapng (SHB, IDB con ``if_tsresol``, EPB y SPB;
+los demás bloques se saltan).
+"""
+import mmap
+import struct
+from typing import Iterator, List, Optional, Tuple
+
+# pcap clásico
+PCAP_MAGIC_US = 0xA1B2C3D4
+PCAP_MAGIC_NS = 0xA1B23C4D
+_PCAP_GLOBAL_HEADER_LEN = 24
+_PCAP_RECORD_HEADER_LEN = 16
+
+# pcapng
+PCAPNG_SHB = 0x0A0D0D0A
+PCAPNG_IDB = 0x00000001
+PCAPNG_SPB = 0x00000003
+PCAPNG_EPB = 0x00000006
+PCAPNG_BYTE_ORDER_MAGIC = 0x1A2B3C4D
+PCAPNG_OPT_ENDOFOPT = 0
+PCAPNG_OPT_IF_TSRESOL = 9
+
+# (trama, timestamp, linktype, longitud original)
+PcapRecord = Tuple[memoryview, Optional[float], int, int]
+
+
+class PcapFormatError(ValueError):
+    """El fichero no es un pcap/pcapng válido"""
+
+
+class PcapReader:
+    """Iterador de registros de un fichero pcap/pcapng mapeado en memoria"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # mmap no admite ficheros vacíos
+            self._file.close()
+            raise PcapFormatError(f"Fichero pcap vacío: {path}")
+        self._view = memoryview(self._map)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Libera el mapeo (las tramas entregadas dejan de ser válidas)"""
+        if self._view is None:
+            return
+        self._view.release()
+        self._view = None
+        try:
+            self._map.close()
+        except BufferError:
+            # Aún hay memoryviews vivos; el mapeo se libera con el último
+            pass
+        self._file.close()
+
+    def iter_records(self) -> Iterator[PcapRecord]:
+        """Recorre los paquetes del fichero en orden"""
+        if len(self._map) < 4:
+            raise PcapFormatError(f"Fichero pcap demasiado corto: {self.path}")
+        first_word = struct.unpack_from("<I", self._map, 0)[0]
+        if first_word == PCAPNG_SHB:
+            self._check_pcapng_header()
+            return self._iter_pcapng()
+        return self._iter_pcap()
+
+    def _check_pcapng_header(self):
+        """Valida el primer Section Header Block (el recorrido pcapng es perezoso)"""
+        data = self._map
+        if len(data) < 28:
+            raise PcapFormatError(f"Cabecera pcapng incompleta: {self.path}")
+        for endian in ("<", ">"):
+            if struct.unpack_from(endian + "I", data, 8)[0] == PCAPNG_BYTE_ORDER_MAGIC:
+                break
+        else:
+            raise PcapFormatError(f"Sección pcapng inválida: {self.path}")
+        block_len = struct.unpack_from(endian + "I", data, 4)[0]
+        if block_len < 28 or block_len % 4 or block_len > len(data):
+            raise PcapFormatError(f"Cabecera pcapng incompleta: {self.path}")
+
+    def _iter_pcap(self) -> Iterator[PcapRecord]:
+        data = self._map
+        view = self._view
+        if len(data) < _PCAP_GLOBAL_HEADER_LEN:
+            raise PcapFormatError(f"Cabecera pcap incompleta: {self.path}")
+        for endian in ("<", ">"):
+            magic = struct.unpack_from(endian + "I", data, 0)[0]
+            if magic in (PCAP_MAGIC_US, PCAP_MAGIC_NS):
+                break
+        else:
+            raise PcapFormatError(f"Formato de captura desconocido: {self.path}")
+        ts_scale = 1e-9 if magic == PCAP_MAGIC_NS else 1e-6
+        linktype = struct.unpack_from(endian + "I", data, 20)[0] & 0xFFFF
+        record_header = struct.Struct(endian + "IIII")
+
+        def records():
+            offset = _PCAP_GLOBAL_HEADER_LEN
+            end = len(data)
+            while offset + _PCAP_RECORD_HEADER_LEN <= end:
+                ts_sec, ts_frac, incl_len, orig_len = record_header.unpack_from(data, offset)
+                offset += _PCAP_RECORD_HEADER_LEN
+                if offset + incl_len > end:
+                    break  # Registro truncado al final del fichero
+                yield view[offset:offset + incl_len], ts_sec + ts_frac * ts_scale, linktype, orig_len
+                offset += incl_len
+
+        return records()
+
+    def iter_pcapng_from(self, offset: int, interfaces: List[Tuple[int, int, float]]) -> Iterator[PcapRecord]:
+        """
+        Recorre un pcapng (little-endian) a partir de un bloque dado.
+
+        ``interfaces`` son los IDB ya declarados antes de ``offset`` como
+        ``(linktype, snaplen, escala de timestamp)``; permite saltar
+        directamente a una posición conocida (p. ej. desde el índice del spool).
+        """
+        return self._iter_pcapng(offset, list(interfaces))
+
+    def _iter_pcapng(self, offset: int = 0, interfaces: Optional[List] = None) -> Iterator[PcapRecord]:
+        data = self._map
+        view = self._view
+        end = len(data)
+        endian = "<"
+        if interfaces is None:
+            interfaces = []  # (linktype, snaplen, escala de timestamp)
+        while offset + 12 <= end:
+            block_type = struct.unpack_from(endian + "I", data, offset)[0]
+            if block_type == PCAPNG_SHB:
+                # El orden de bytes se redefine en cada sección
+                bom = struct.unpack_from("<I", data, offset + 8)[0]
+                if bom == PCAPNG_BYTE_ORDER_MAGIC:
+                    endian = "<"
+                elif struct.unpack_from(">I", data, offset + 8)[0] == PCAPNG_BYTE_ORDER_MAGIC:
+                    endian = ">"
+                else:
+                    raise PcapFormatError(f"Sección pcapng inválida: {self.path}")
+                interfaces = []
+            block_len = struct.unpack_from(endian + "I", data, offset + 4)[0]
+            if block_len < 12 or offset + block_len > end:
+                break  # Bloque truncado o corrupto
+            body = offset + 8
+
+            if block_type == PCAPNG_IDB:
+                linktype, _, snaplen = struct.unpack_from(endian + "HHI", data, body)
+                interfaces.append((linktype, snaplen, self._ts_scale(endian, body + 8, offset + block_len - 4)))
+            elif block_type == PCAPNG_EPB:
+                if_id, ts_high, ts_low, cap_len, orig_len = struct.unpack_from(endian + "IIIII", data, body)
+                if if_id < len(interfaces):
+                    linktype, _, ts_scale = interfaces[if_id]
+                    start = body + 20
+                    yield view[start:start + cap_len], ((ts_high << 32) | ts_low) * ts_scale, linktype, orig_len
+            elif block_type == PCAPNG_SPB:
+                if interfaces:
+                    linktype, snaplen, _ = interfaces[0]
+                    orig_len = struct.unpack_from(endian + "I", data, body)[0]
+                    cap_len = min(orig_len, snaplen or orig_len, block_len - 16)
+                    yield view[body + 4:body + 4 + cap_len], None, linktype, orig_len
+
+            offset += block_len
+
+    def _ts_scale(self, endian: str, offset: int, end: int) -> float:
+        """Resolución de timestamps de un IDB (opción if_tsresol, por defecto µs)"""
+        data = self._map
+        while offset + 4 <= end:
+            code, length = struct.unpack_from(endian + "HH", data, offset)
+            if code == PCAPNG_OPT_ENDOFOPT:
+                break
+            if code == PCAPNG_OPT_IF_TSRESOL and length >= 1:
+                resolution = data[offset + 4]
+                if resolution & 0x80:
+                    return 2.0 ** -(resolution & 0x7F)
+                return 10.0 ** -resolution
+            offset += 4 + ((length + 3) & ~3)
+        return 1e-6
+
+    def __iter__(self) -> Iterator[PcapRecord]:
+        return self.iter_records()
@@ -0,0 +1,127 @@
+"""
+Escritura de ficheros pcap/pcapng en streaming.
+
+``PcapStreamWriter`` y ``PcapngStreamWriter`` serializan tramas
+``(timestamp, linktype, datos, longitud original)`` a bytes y los agrupan en trozos de
+``EXPORT_CHUNK_BYTES`` para entregarlos como cuerpo de una respuesta HTTP
+por chunks: nunca se construye el fichero completo en memoria.
+"""
+import logging
+import struct
+from typing import Iterable, Iterator, Optional, Tuple
+
+from .packet_dissector import LINKTYPE_ETHERNET
+from .pcap_reader import PCAP_MAGIC_NS, PCAPNG_SHB, PCAPNG_IDB, PCAPNG_EPB, PCAPNG_BYTE_ORDER_MAGIC
+
+logger = logging.getLogger(__name__)
+
+EXPORT_CHUNK_BYTES = 256 * 1024
+EXPORT_SNAPLEN = 262144
+
+PCAP_MEDIA_TYPE = "application/vnd.tcpdump.pcap"
+PCAPNG_MEDIA_TYPE = "application/x-pcapng"
+
+# Trama exportable: (timestamp, linktype, datos, longitud original)
+ExportFrame = Tuple[float, int, bytes, int]
+
+_PCAP_GLOBAL_HEADER = struct.Struct("<IHHiIII")
+_PCAP_RECORD_HEADER = struct.Struct("<IIII")
+_PCAPNG_BLOCK_HEADER = struct.Struct("<II")
+_PCAPNG_BLOCK_TRAILER = struct.Struct("<I")
+_PCAPNG_SHB_BODY = struct.Struct("<IHHq")
+_PCAPNG_IDB_BODY = struct.Struct("<HHI")
+_PCAPNG_EPB_BODY = struct.Struct("<IIIII")
+# Opción if_tsresol = 9 (nanosegundos) seguida de opt_endofopt
+_PCAPNG_IDB_TSRESOL_NS = struct.pack("<HHB3xHH", 9, 1, 9, 0, 0)
+
+
+def _split_ns(timestamp: float) -> int:
+    return int(round(timestamp * 1e9))
+
+
+def _pcapng_block(block_type: int, body: bytes) -> bytes:
+    padding = b"\0" * (-len(body) % 4)
+    total = len(body) + len(padding) + 12
+    return _PCAPNG_BLOCK_HEADER.pack(block_type, total) + body + padding + _PCAPNG_BLOCK_TRAILER.pack(total)
+
+
+class PcapStreamWriter:
+    """pcap clásico con timestamps en nanosegundos (un único tipo de enlace)"""
+
+    media_type = PCAP_MEDIA_TYPE
+    extension = "pcap"
+
+    def __init__(self):
+        self.linktype: Optional[int] = None
+        self.skipped = 0
+
+    def header(self, linktype: int) -> bytes:
+        self.linktype = linktype
+        return _PCAP_GLOBAL_HEADER.pack(PCAP_MAGIC_NS, 2, 4, 0, 0, EXPORT_SNAPLEN, linktype)
+
+    def encode(self, timestamp: float, linktype: int, data: bytes, orig_len: Optional[int] = None) -> bytes:
+        """Registro de la trama; ``orig_len`` es su longitud en el cable (``data`` puede ir recortada)"""
+        out = b""
+        if self.linktype is None:
+            out = self.header(linktype)
+        elif linktype != self.linktype:
+            # pcap solo admite un tipo de enlace por fichero
+            self.skipped += 1
+            return out
+        ts_ns = _split_ns(timestamp)
+        orig_len = max(orig_len or 0, len(data))
+        return out + _PCAP_RECORD_HEADER.pack(ts_ns // 1_000_000_000, ts_ns % 1_000_000_000, len(data), orig_len) + data
+
+
+class PcapngStreamWriter:
+    """pcapng con un Interface Description Block por tipo de enlace"""
+
+    media_type = PCAPNG_MEDIA_TYPE
+    extension = "pcapng"
+
+    def __init__(self):
+        self._interfaces = {}
+        self.skipped = 0
+
+    def header(self) -> bytes:
+        return _pcapng_block(PCAPNG_SHB, _PCAPNG_SHB_BODY.pack(PCAPNG_BYTE_ORDER_MAGIC, 1, 0, -1))
+
+    def encode(self, timestamp: float, linktype: int, data: bytes, orig_len: Optional[int] = None) -> bytes:
+        """Bloques de la trama; ``orig_len`` es su longitud en el cable (``data`` puede ir recortada)"""
+        out = b""
+        if not self._interfaces:
+            out = self.header()
+        if_id = self._interfaces.get(linktype)
+        if if_id is None:
+            if_id = self._interfaces[linktype] = len(self._interfaces)
+            out += _pcapng_block(PCAPNG_IDB, _PCAPNG_IDB_BODY.pack(linktype, 0, EXPORT_SNAPLEN) + _PCAPNG_IDB_TSRESOL_NS)
+        ts_ns = _split_ns(timestamp)
+        orig_len = max(orig_len or 0, len(data))
+        body = _PCAPNG_EPB_BODY.pack(if_id, ts_ns >> 32, ts_ns & 0xFFFFFFFF, len(data), orig_len) + data
+        return out + _pcapng_block(PCAPNG_EPB, body)
+
+
+EXPORT_WRITERS = {
+    PcapStreamWriter.extension: PcapStreamWriter,
+    PcapngStreamWriter.extension: PcapngStreamWriter,
+}
+
+
+def stream_frames(writer, chunks: Iterable[Iterable[ExportFrame]]) -> Iterator[bytes]:
+    """Serializa lotes de tramas en trozos de como mucho ~``EXPORT_CHUNK_BYTES``"""
+    buffer = bytearray()
+    wrote_frames = False
+    for frames in chunks:
+        for timestamp, linktype, data, orig_len in frames:
+            buffer += writer.encode(timestamp, linktype, data, orig_len)
+            wrote_frames = True
+            if len(buffer) >= EXPORT_CHUNK_BYTES:
+                yield bytes(buffer)
+                buffer.clear()
+    if not wrote_frames:
+        # Fichero válido aunque no haya tramas
+        buffer += writer.header(LINKTYPE_ETHERNET) if isinstance(writer, PcapStreamWriter) else writer.header()
+    if buffer:
+        yield bytes(buffer)
+    if writer.skipped:
+        logger.info(f"Exportación: {writer.skipped} tramas omitidas (tipo de enlace distinto)")
@@ -0,0 +1,80 @@
+"""
+Respuestas de estadísticas cacheadas por versión.
+
+Cada sesión de captura lleva una versión (``stats_version``) que cambia con
+cada modificación de sus estadísticas. Las rutas de estadísticas guardan el
+JSON ya serializado por ``(endpoint, sesión, parámetros, versión)`` y lo
+sirven con un ETag derivado de esa clave: mientras la captura está parada
+(o el panel repite la misma consulta entre dos lotes) no se recalcula ni se
+reserializa nada, y con ``If-None-Match`` ni siquiera se envía el cuerpo.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional
+
+from ..core.config import settings
+
+
+def etag_for(key: Hashable) -> str:
+    """ETag fuerte de una clave de caché"""
+    return '"' + hashlib.blake2b(repr(key).encode(), digest_size=12).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Si la cabecera If-None-Match incluye ``etag`` (comparación débil)"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+class VersionedResponseCache:
+    """LRU acotado clave versionada → cuerpo JSON serializado"""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._entries: "OrderedDict[Hashable, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        with self._lock:
+            body = self._entries.get(key)
+            if body is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return body
+
+    def put(self, key: Hashable, body: bytes):
+        # Las entradas de versiones antiguas no se vuelven a pedir: salen por LRU
+        with self._lock:
+            self._entries[key] = body
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+# Instancia global
+stats_cache = VersionedResponseCache(settings.STATS_CACHE_SIZE)
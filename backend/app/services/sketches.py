@@ -0,0 +1,183 @@
+"""
+Sketches probabilísticos de memoria fija para las estadísticas de captura.
+
+``CountMinSketch`` sustituye a los contadores exactos por clave (IPs,
+puertos, conexiones; ``ExactCounts``) en el modo de estadísticas ``sketch``:
+una matriz ``depth`` × ``width`` de celdas en la que cada clave suma en una
+columna por fila. Cada celda guarda paquetes y bytes a la vez, así que una
+sola tabla (y un solo hash por clave) sirve para los dos. La consulta
+puntual toma el mínimo de sus celdas, que nunca subestima y sobreestima como
+mucho ``e / width × total`` con probabilidad ``1 - e^-depth``. No permite enumerar las claves (para eso están los top-K).
+
+Las columnas salen del hash de 64 bits estable entre procesos de
+``cardinality.hash64`` (blake2b, no ``hash()``, que cambia con
+PYTHONHASHSEED) con doble hashing por fila sobre sus dos mitades; ``update``
+acepta los hashes ya calculados del lote para no repetirlos. Con anchos
+potencia de 2 dos sketches de distinto tamaño se fusionan plegando el más
+ancho, y con distinta profundidad se usan las filas comunes.
+"""
+import math
+from typing import Any, Dict, Hashable, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .cardinality import DistinctWindow, HyperLogLog, PerSourceDistinct, hash64
+from .heavy_hitters import SpaceSaving
+from .network_graph import NetworkGraph
+from .timeseries import TrafficTimeSeries
+
+
+class CountMinSketch:
+    """
+    Frecuencias aproximadas por clave con memoria fija (width × depth ×
+    channels × 8 bytes). Cada clave suma un vector de ``channels`` contadores
+    (paquetes y bytes en las estadísticas) en la misma celda.
+    """
+
+    def __init__(self, width: int, depth: int, channels: int = 2):
+        if width < 2 or width & (width - 1):
+            raise ValueError("El ancho del Count-Min sketch debe ser potencia de 2")
+        if depth < 1:
+            raise ValueError("La profundidad del Count-Min sketch debe ser positiva")
+        self.width = width
+        self.depth = depth
+        self.channels = channels
+        self.totals = np.zeros(channels, dtype=np.int64)
+        self._table = np.zeros((depth, width, channels), dtype=np.int64)
+        self._rows = np.arange(depth, dtype=np.uint64)[:, None]
+
+    @property
+    def nbytes(self) -> int:
+        return self._table.nbytes
+
+    def _columns(self, hashes: Sequence[int]) -> np.ndarray:
+        """Columna de cada clave (por su ``hash64``) en cada fila: matriz depth × len(hashes)"""
+        hashed = np.array(hashes, dtype=np.uint64)
+        low = hashed & np.uint64(0xFFFFFFFF)
+        high = (hashed >> np.uint64(32)) | np.uint64(1)
+        mixed = (low + self._rows * high) & np.uint64(0xFFFFFFFF)
+        return (mixed & np.uint64(self.width - 1)).astype(np.intp)
+
+    def update(self, items: Mapping[Hashable, Sequence[int]], hashes: Optional[Sequence[int]] = None):
+        """
+        Suma un lote agregado (clave → contadores) con una sola operación por
+        fila. ``hashes`` son los ``hash64`` de las claves en el orden de
+        ``items`` si ya se han calculado.
+        """
+        if not items:
+            return
+        if hashes is None:
+            hashes = [hash64(key) for key in items]
+        counts = np.array(list(items.values()), dtype=np.int64).reshape(len(items), self.channels)
+        columns = self._columns(hashes)
+        for row in range(self.depth):
+            np.add.at(self._table[row], columns[row], counts)
+        self.totals += counts.sum(axis=0)
+
+    def get(self, key: Hashable) -> Tuple[int, ...]:
+        """Estimación puntual de cada contador (nunca menor que el valor real)"""
+        columns = self._columns([hash64(key)])[:, 0]
+        return tuple(int(value) for value in self._table[np.arange(self.depth), columns].min(axis=0))
+
+    def error_bound(self) -> Dict[str, Any]:
+        """Sobreestimación máxima de ``get`` por contador y probabilidad de que se cumpla"""
+        epsilon = math.e / self.width
+        return {
+            "epsilon": epsilon,
+            "confidence": 1 - math.exp(-self.depth),
+            "max_error": [math.ceil(epsilon * int(total)) for total in self.totals],
+        }
+
+    def _folded(self, width: int, depth: int) -> np.ndarray:
+        """Tabla reducida a ``width`` columnas (anchos potencia de 2) y ``depth`` filas"""
+        table = self._table[:depth]
+        if width == self.width:
+            return table
+        return table.reshape(depth, self.width // width, width, self.channels).sum(axis=1)
+
+    def merge(self, other: "CountMinSketch") -> "CountMinSketch":
+        width = min(self.width, other.width)
+        depth = min(self.depth, other.depth)
+        table = self._folded(width, depth) + other._folded(width, depth)
+        self.width, self.depth = width, depth
+        self._table = table
+        self._rows = self._rows[:depth]
+        self.totals = self.totals + other.totals
+        return self
+
+    def copy(self) -> "CountMinSketch":
+        clone = CountMinSketch.__new__(CountMinSketch)
+        clone.width, clone.depth, clone.channels = self.width, self.depth, self.channels
+        clone.totals = self.totals.copy()
+        clone._table = self._table.copy()
+        clone._rows = self._rows
+        return clone
+
+    def scaled(self, scale: float) -> "CountMinSketch":
+        """Copia con los contadores multiplicados por ``scale`` (totales estimados)"""
+        clone = self.copy()
+        clone._table = np.rint(self._table * scale).astype(np.int64)
+        clone.totals = np.rint(self.totals * scale).astype(np.int64)
+        return clone
+
+    def clear(self):
+        self._table.fill(0)
+        self.totals.fill(0)
+
+
+class ExactCounts:
+    """
+    Contadores exactos por clave (clave → [paquetes, bytes]) con la misma
+    interfaz que ``CountMinSketch``: es el modo de estadísticas ``exact`` y
+    el formato de los deltas de los workers.
+    """
+
+    def __init__(self):
+        self._counts: Dict[Hashable, List[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    def update(self, items: Mapping[Hashable, Sequence[int]], hashes: Optional[Sequence[int]] = None):
+        counts = self._counts
+        for key, (packets, volume) in items.items():
+            entry = counts.get(key)
+            if entry is None:
+                counts[key] = [packets, volume]
+            else:
+                entry[0] += packets
+                entry[1] += volume
+
+    def get(self, key: Hashable) -> Tuple[int, ...]:
+        entry = self._counts.get(key)
+        return (0, 0) if entry is None else tuple(entry)
+
+    def items(self) -> Iterable[Tuple[Hashable, List[int]]]:
+        return self._counts.items()
+
+    def merge(self, other: "ExactCounts") -> "ExactCounts":
+        self.update(other._counts)
+        return self
+
+    def copy(self) -> "ExactCounts":
+        clone = ExactCounts()
+        clone._counts = {key: list(entry) for key, entry in self._counts.items()}
+        return clone
+
+    def scaled(self, scale: float) -> "ExactCounts":
+        clone = ExactCounts()
+        clone._counts = {
+            key: [round(packets * scale), round(volume * scale)]
+            for key, (packets, volume) in self._counts.items()
+        }
+        return clone
+
+    def clear(self):
+        self._counts.clear()
+
+
+# Resúmenes y contadores por clave que pueden aparecer en el dict de estadísticas
+STATS_SUMMARIES = (
+    SpaceSaving, CountMinSketch, ExactCounts, HyperLogLog, DistinctWindow, PerSourceDistinct,
+    TrafficTimeSeries, NetworkGraph,
+)
@@ -0,0 +1,239 @@
+"""
+Métricas TCP por flujo calculadas en línea.
+
+``TcpFlowState`` guarda un estado de tamaño fijo por flujo:
+
+- handshake: instantes del SYN y del SYN/ACK; al ver el ACK del iniciador se
+  obtienen el RTT hacia el remoto (SYN→SYN/ACK) y el del handshake completo
+  (SYN→SYN/ACK→ACK);
+- por sentido, el siguiente número de secuencia esperado y el instante del
+  último segmento con datos. Un segmento que empieza antes de lo esperado es
+  una retransmisión, o un segmento fuera de orden si llega antes de un RTT
+  (``REORDER_THRESHOLD`` si aún no se conoce) desde el anterior. Los
+  keepalives (0 o 1 byte con la secuencia esperada menos uno) no cuentan
+  como segmentos ni como retransmisiones.
+
+``TcpMetrics`` agrega los resultados por IP remota y por proceso con
+histogramas logarítmicos de tamaño acotado, de los que se sacan percentiles
+sin guardar las muestras.
+"""
+import math
+from typing import Any, Dict, List, Optional
+
+from .packet_record import PacketRecord
+
+TCP_FIN = 0x01
+TCP_SYN = 0x02
+TCP_ACK = 0x10
+
+SEQ_MASK = 0xFFFFFFFF
+SEQ_HALF = 0x80000000
+REORDER_THRESHOLD = 0.003  # Segundos; se usa hasta conocer el RTT del flujo
+
+# Histogramas: 4 buckets por potencia de 2 (error relativo < 19%) sobre microsegundos
+HISTOGRAM_BUCKETS_PER_OCTAVE = 4
+TCP_METRICS_MAX_KEYS = 10_000  # Claves (IPs o procesos) por agrupación
+PERCENTILES = (50, 90, 99)
+
+FORWARD = 0
+REVERSE = 1
+
+
+def _seq_before(a: int, b: int) -> bool:
+    """a < b en aritmética de secuencia de 32 bits"""
+    return a != b and ((a - b) & SEQ_MASK) >= SEQ_HALF
+
+
+class LatencyHistogram:
+    """Histograma logarítmico de latencias (segundos) con percentiles aproximados"""
+
+    __slots__ = ("buckets", "count", "total", "max")
+
+    def __init__(self):
+        self.buckets: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float):
+        micros = max(seconds * 1e6, 1.0)
+        index = int(math.log2(micros) * HISTOGRAM_BUCKETS_PER_OCTAVE)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, percent: float) -> Optional[float]:
+        """Valor central del bucket que contiene el percentil (segundos)"""
+        if not self.count:
+            return None
+        rank = percent / 100 * self.count
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                return min(2 ** ((index + 0.5) / HISTOGRAM_BUCKETS_PER_OCTAVE) / 1e6, self.max)
+        return self.max
+
+    def to_json(self) -> Dict[str, Any]:
+        """Resumen en milisegundos"""
+        summary: Dict[str, Any] = {"count": self.count}
+        if not self.count:
+            return summary
+        for percent in PERCENTILES:
+            summary[f"p{percent}"] = round(self.percentile(percent) * 1000, 3)
+        summary["mean"] = round(self.total / self.count * 1000, 3)
+        summary["max"] = round(self.max * 1000, 3)
+        return summary
+
+
+class TcpKeyMetrics:
+    """Métricas agregadas de una IP remota o un proceso"""
+
+    __slots__ = ("rtt", "handshake", "segments", "retransmits", "out_of_order")
+
+    def __init__(self):
+        self.rtt = LatencyHistogram()
+        self.handshake = LatencyHistogram()
+        self.segments = 0
+        self.retransmits = 0
+        self.out_of_order = 0
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "rtt_ms": self.rtt.to_json(),
+            "handshake_ms": self.handshake.to_json(),
+            "segments": self.segments,
+            "retransmits": self.retransmits,
+            "out_of_order": self.out_of_order,
+            "retransmit_rate": self.retransmits / self.segments if self.segments else 0.0,
+        }
+
+
+class TcpMetrics:
+    """Agregación de las métricas TCP por IP remota y por proceso"""
+
+    GROUPS = ("remote", "process")
+
+    def __init__(self, max_keys: int = TCP_METRICS_MAX_KEYS):
+        self.max_keys = max_keys
+        self._groups: Dict[str, Dict[str, TcpKeyMetrics]] = {group: {} for group in self.GROUPS}
+        self.dropped_keys = 0
+
+    def _entries(self, remote: str, process: Optional[str]) -> List[TcpKeyMetrics]:
+        entries = []
+        for group, key in (("remote", remote), ("process", process)):
+            if key is None:
+                continue
+            metrics = self._groups[group].get(key)
+            if metrics is None:
+                if len(self._groups[group]) >= self.max_keys:
+                    self.dropped_keys += 1
+                    continue
+                metrics = self._groups[group][key] = TcpKeyMetrics()
+            entries.append(metrics)
+        return entries
+
+    def add_handshake(self, remote: str, process: Optional[str], rtt: float, handshake: float):
+        for metrics in self._entries(remote, process):
+            metrics.rtt.add(rtt)
+            metrics.handshake.add(handshake)
+
+    def add_segment(self, remote: str, process: Optional[str], retransmit: bool, out_of_order: bool):
+        for metrics in self._entries(remote, process):
+            metrics.segments += 1
+            metrics.retransmits += retransmit
+            metrics.out_of_order += out_of_order
+
+    def clear(self):
+        for group in self._groups.values():
+            group.clear()
+        self.dropped_keys = 0
+
+    def top(self, group: str, limit: int = 20, sort: str = "p90") -> List[Dict[str, Any]]:
+        """Claves de una agrupación ordenadas por percentil de RTT, handshakes o retransmisiones"""
+        if sort in ("p50", "p90", "p99"):
+            percent = int(sort[1:])
+            sort_key = lambda item: item[1].rtt.percentile(percent) or 0.0
+        elif sort == "retransmits":
+            sort_key = lambda item: item[1].retransmits
+        else:
+            sort_key = lambda item: item[1].rtt.count
+        items = sorted(self._groups[group].items(), key=sort_key, reverse=True)[:limit]
+        return [{"key": key, **metrics.to_json()} for key, metrics in items]
+
+
+class TcpFlowState:
+    """Estado TCP de tamaño fijo de un flujo (handshake y secuencia por sentido)"""
+
+    __slots__ = (
+        "syn_ts", "synack_ts", "rtt", "handshake_rtt",
+        "next_seq", "last_data_ts", "segments", "retransmits", "out_of_order",
+    )
+
+    def __init__(self):
+        self.syn_ts: Optional[float] = None
+        self.synack_ts: Optional[float] = None
+        self.rtt: Optional[float] = None  # SYN → SYN/ACK (hacia el remoto)
+        self.handshake_rtt: Optional[float] = None  # SYN → ACK del iniciador
+        self.next_seq: List[Optional[int]] = [None, None]
+        self.last_data_ts = [0.0, 0.0]
+        self.segments = 0
+        self.retransmits = 0
+        self.out_of_order = 0
+
+    def update(self, direction: int, flags: int, record: PacketRecord,
+               metrics: TcpMetrics, remote: str, process: Optional[str]):
+        timestamp = record.timestamp
+        if flags & TCP_SYN:
+            if not flags & TCP_ACK:
+                if direction == FORWARD and self.synack_ts is None:
+                    # Con SYN retransmitidos se mide desde el último
+                    self.syn_ts = timestamp
+            elif direction == REVERSE and self.syn_ts is not None and self.synack_ts is None:
+                self.synack_ts = timestamp
+                self.rtt = timestamp - self.syn_ts
+        elif (flags & TCP_ACK and direction == FORWARD
+              and self.synack_ts is not None and self.handshake_rtt is None):
+            self.handshake_rtt = timestamp - self.syn_ts
+            metrics.add_handshake(remote, process, self.rtt, self.handshake_rtt)
+
+        if record.tcp_seq is None:
+            return
+        # SYN y FIN ocupan un número de secuencia
+        length = (record.tcp_len or 0) + bool(flags & TCP_SYN) + bool(flags & TCP_FIN)
+        if not length:
+            return
+        start = record.tcp_seq
+        expected = self.next_seq[direction]
+        if (expected is not None and (record.tcp_len or 0) <= 1
+                and not flags & (TCP_SYN | TCP_FIN) and start == (expected - 1) & SEQ_MASK):
+            return  # Keepalive: repite el último byte ya confirmado
+        end = (start + length) & SEQ_MASK
+        retransmit = out_of_order = False
+        if expected is None or not _seq_before(start, expected):
+            self.next_seq[direction] = end
+        else:
+            # Empieza antes de lo esperado: hueco rellenado enseguida o retransmisión
+            threshold = self.rtt if self.rtt is not None else REORDER_THRESHOLD
+            if timestamp - self.last_data_ts[direction] < threshold:
+                out_of_order = True
+                self.out_of_order += 1
+            else:
+                retransmit = True
+                self.retransmits += 1
+            if _seq_before(expected, end):
+                self.next_seq[direction] = end
+        self.last_data_ts[direction] = timestamp
+        self.segments += 1
+        metrics.add_segment(remote, process, retransmit, out_of_order)
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "rtt_ms": round(self.rtt * 1000, 3) if self.rtt is not None else None,
+            "handshake_ms": round(self.handshake_rtt * 1000, 3) if self.handshake_rtt is not None else None,
+            "segments": self.segments,
+            "retransmits": self.retransmits,
+            "out_of_order": self.out_of_order,
+        }
@@ -0,0 +1,134 @@
+"""
+Rueda de temporizadores jerárquica.
+
+El tiempo se discretiza en ticks de ``tick`` segundos. El nivel 0 tiene un
+slot por tick; cada nivel superior cubre ``slots`` veces más tiempo por slot.
+Un temporizador se guarda en el nivel más bajo cuyo bloque actual contiene su
+tick, y cuando el nivel inferior da la vuelta se reparte (cascada) el slot
+correspondiente del nivel superior. Programar un temporizador es O(1) y
+``advance`` salta los ticks sin slots que vencer o repartir, así que su coste
+depende de los slots ocupados y no del tiempo transcurrido (un timestamp
+corrupto o muy adelantado no recorre millones de ticks), sin colas de
+prioridad ni recorridos de la tabla.
+
+Los temporizadores no se cancelan: quien los usa comprueba al vencer si
+siguen vigentes (el tick devuelto permite descartar los obsoletos).
+"""
+from typing import Any, List, Optional, Tuple
+
+TIMER_WHEEL_SLOTS = 64
+TIMER_WHEEL_LEVELS = 3
+
+
+class TimerWheel:
+    """Temporizadores agrupados por tick en varios niveles de slots"""
+
+    def __init__(self, tick: float = 1.0, slots: int = TIMER_WHEEL_SLOTS, levels: int = TIMER_WHEEL_LEVELS):
+        if tick <= 0 or slots < 2 or levels < 1:
+            raise ValueError("Geometría de la rueda de temporizadores inválida")
+        self.tick = tick
+        self.slots = slots
+        self.levels = levels
+        self._spans = [slots ** level for level in range(levels + 1)]
+        self._wheels: List[List[List[Tuple[int, Any]]]] = [
+            [[] for _ in range(slots)] for _ in range(levels)
+        ]
+        self._overflow: List[Tuple[int, Any]] = []  # Más allá del último nivel
+        self._current: Optional[int] = None  # Último tick procesado
+        self.pending = 0
+
+    @property
+    def started(self) -> bool:
+        """True una vez fijado el reloj con el primer ``advance``"""
+        return self._current is not None
+
+    def to_tick(self, timestamp: float) -> int:
+        return int(timestamp // self.tick)
+
+    def schedule(self, item: Any, deadline: float) -> int:
+        """Programa ``item`` para ``deadline``; retorna el tick asignado"""
+        if self._current is None:
+            raise RuntimeError("La rueda de temporizadores no tiene reloj: llama antes a advance()")
+        tick = self.to_tick(deadline)
+        # El slot del tick actual ya se procesó: lo vencido sale en el siguiente
+        tick = max(tick, self._current + 1)
+        self._insert(tick, item)
+        self.pending += 1
+        return tick
+
+    def _insert(self, tick: int, item: Any):
+        current = self._current
+        for level in range(self.levels):
+            block = self._spans[level + 1]
+            if tick // block == current // block:
+                self._wheels[level][(tick // self._spans[level]) % self.slots].append((tick, item))
+                return
+        self._overflow.append((tick, item))
+
+    def advance(self, timestamp: float) -> List[Tuple[int, Any]]:
+        """Avanza hasta ``timestamp`` y retorna los ``(tick, item)`` vencidos"""
+        target = self.to_tick(timestamp)
+        if self._current is None:
+            self._current = target
+            return []
+        fired: List[Tuple[int, Any]] = []
+        wheel0 = self._wheels[0]
+        while self._current < target:
+            current = self._next_event(self._current) if self.pending else None
+            if current is None or current > target:
+                # Nada que vencer ni repartir hasta el destino: saltar directamente
+                self._current = target
+                break
+            self._current = current
+            self._cascade(current)
+            slot = current % self.slots
+            bucket = wheel0[slot]
+            if bucket:
+                wheel0[slot] = []
+                fired.extend(bucket)
+        self.pending -= len(fired)
+        return fired
+
+    def _next_event(self, current: int) -> Optional[int]:
+        """
+        Primer tick posterior a ``current`` con un slot que vence o que se
+        reparte: los ticks intermedios no tienen nada, así que ``advance`` los
+        salta (un timestamp muy adelantado no cuesta un paso por tick)
+        """
+        for level in range(self.levels):
+            span = self._spans[level]
+            index = (current // span) % self.slots
+            slots = self._wheels[level]
+            for offset in range(1, self.slots - index):
+                if slots[index + offset]:
+                    return (current // span + offset) * span
+        if self._overflow:
+            # Bloque del último nivel que contiene el temporizador más próximo
+            block = self._spans[self.levels]
+            first = min(tick for tick, _ in self._overflow) // block * block
+            return max(first, (current // block + 1) * block)
+        return None
+
+    def _cascade(self, current: int):
+        """Al dar la vuelta un nivel, reparte el slot que empieza del nivel superior"""
+        top = 0
+        while top < self.levels and current % self._spans[top + 1] == 0:
+            top += 1
+        # De arriba abajo: lo que baja de un nivel puede caer en el slot que se reparte después
+        for level in range(top, 0, -1):
+            if level == self.levels:
+                entries, self._overflow = self._overflow, []
+            else:
+                slot = (current // self._spans[level]) % self.slots
+                entries = self._wheels[level][slot]
+                self._wheels[level][slot] = []
+            for tick, item in entries:
+                self._insert(tick, item)
+
+    def clear(self):
+        for wheel in self._wheels:
+            for slot in range(self.slots):
+                wheel[slot] = []
+        self._overflow = []
+        self._current = None
+        self.pending = 0
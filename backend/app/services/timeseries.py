@@ -0,0 +1,109 @@
+"""
+Series temporales de tráfico a resolución de segundo, minuto y hora.
+
+Cada resolución es un ring de buckets indexado por época (``timestamp //
+step``, con el reloj de los paquetes) con paquetes, bytes y paquetes por
+protocolo. ``_update_stats`` agrega el lote por segundo y suma cada segundo
+una vez en cada nivel (el minuto y la hora que lo contienen), así que el
+coste es O(1) por lote y segundo, no por paquete.
+
+Los buckets se guardan dispersos (dict época → contadores) y se descartan
+los que salen de la ventana de cada nivel: la memoria está acotada por
+``capacity`` buckets por nivel y los deltas de los workers solo llevan los
+segundos que han tocado. ``series`` devuelve arrays contiguos (huecos a 0)
+listos para dibujar.
+"""
+from typing import Dict, List, Optional, Tuple
+
+SERIES_FIELDS = ("packets", "bytes", "tcp", "udp", "icmp", "other")
+FIELD_INDEX = {name: index for index, name in enumerate(SERIES_FIELDS)}
+
+# Nombre → segundos por bucket
+RESOLUTIONS = {"second": 1, "minute": 60, "hour": 3600}
+
+
+class TrafficTimeSeries:
+    """Buckets de tráfico por segundo, minuto y hora con ventana acotada por nivel"""
+
+    def __init__(self, capacities: Dict[str, int]):
+        self.capacities = dict(capacities)
+        self._levels: Dict[str, Dict[int, List[int]]] = {name: {} for name in RESOLUTIONS}
+        self._latest: Dict[str, Optional[int]] = {name: None for name in RESOLUTIONS}
+
+    def add_seconds(self, seconds: Dict[int, List[int]]):
+        """Suma contadores agregados por segundo (época → valores de SERIES_FIELDS)"""
+        for second, values in seconds.items():
+            for name, step in RESOLUTIONS.items():
+                self._add(name, second // step, values)
+
+    def _add(self, name: str, epoch: int, values: List[int]):
+        level = self._levels[name]
+        bucket = level.get(epoch)
+        if bucket is None:
+            latest = self._latest[name]
+            capacity = self.capacities[name]
+            if latest is not None and epoch <= latest - capacity:
+                return  # Fuera de la ventana del nivel
+            bucket = level[epoch] = [0] * len(SERIES_FIELDS)
+            if latest is None or epoch > latest:
+                self._latest[name] = latest = epoch
+                self._prune(name, latest - capacity)
+        for index, value in enumerate(values):
+            bucket[index] += value
+
+    def _prune(self, name: str, cutoff: int):
+        level = self._levels[name]
+        # Inserción casi siempre en orden: se descarta desde el principio
+        while level:
+            oldest = next(iter(level))
+            if oldest > cutoff and len(level) <= self.capacities[name]:
+                break
+            del level[oldest]
+
+    def merge(self, other: "TrafficTimeSeries") -> "TrafficTimeSeries":
+        for name in RESOLUTIONS:
+            for epoch in sorted(other._levels[name]):
+                self._add(name, epoch, other._levels[name][epoch])
+        return self
+
+    def copy(self) -> "TrafficTimeSeries":
+        clone = TrafficTimeSeries(self.capacities)
+        clone._levels = {
+            name: {epoch: list(bucket) for epoch, bucket in level.items()}
+            for name, level in self._levels.items()
+        }
+        clone._latest = dict(self._latest)
+        return clone
+
+    def scaled(self, scale: float) -> "TrafficTimeSeries":
+        """Copia con los contadores multiplicados por ``scale`` (totales estimados)"""
+        clone = self.copy()
+        for level in clone._levels.values():
+            for epoch, bucket in level.items():
+                level[epoch] = [round(value * scale) for value in bucket]
+        return clone
+
+    def series(self, resolution: str, points: Optional[int] = None) -> Dict:
+        """Arrays contiguos de los últimos ``points`` buckets (por defecto la ventana entera)"""
+        step = RESOLUTIONS[resolution]
+        level = self._levels[resolution]
+        latest = self._latest[resolution]
+        points = min(points or self.capacities[resolution], self.capacities[resolution])
+        result: Dict = {"resolution": resolution, "step": step}
+        if latest is None:
+            result.update({"start": None, "timestamps": []})
+            result.update({field: [] for field in SERIES_FIELDS})
+            result.update({"pps": [], "bps": []})
+            return result
+        first = latest - points + 1
+        empty = [0] * len(SERIES_FIELDS)
+        buckets: List[Tuple[int, List[int]]] = [
+            (epoch, level.get(epoch, empty)) for epoch in range(first, latest + 1)
+        ]
+        result["start"] = first * step
+        result["timestamps"] = [epoch * step for epoch, _ in buckets]
+        for index, field in enumerate(SERIES_FIELDS):
+            result[field] = [bucket[index] for _, bucket in buckets]
+        result["pps"] = [packets / step for packets in result["packets"]]
+        result["bps"] = [volume * 8 / step for volume in result["bytes"]]
+        return result
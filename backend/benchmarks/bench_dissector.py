@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: disector struct vs. ruta scapy de ``_parse_packet``.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_dissector                 # corpus sintético fijo
+    python -m benchmarks.bench_dissector --pcap captura.pcap
+
+Sin ``--pcap`` se genera un corpus determinista (semilla fija) de tramas
+Ethernet/VLAN con IPv4/IPv6 y TCP/UDP/ICMP para que los resultados sean
+comparables entre ejecuciones.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from scapy.all import Ether, Dot1Q, IP, IPv6, TCP, UDP, ICMP, Raw, wrpcap, rdpcap, RawPcapReader
+
+from app.services.packet_dissector import dissect, LINKTYPE_ETHERNET
+
+CORPUS_SEED = 1337
+CORPUS_SIZE = 5000
+BENCH_SRC_MAC = "02:00:00:00:00:01"
+BENCH_DST_MAC = "02:00:00:00:00:02"
+
+
+def build_corpus(path: str, size: int = CORPUS_SIZE):
+    """Genera un pcap determinista con una mezcla de tráfico típica"""
+    rng = random.Random(CORPUS_SEED)
+    packets = []
+    for i in range(size):
+        kind = rng.random()
+        payload = Raw(rng.randbytes(rng.choice((0, 0, 32, 200, 1200))))
+        src = f"192.168.{rng.randint(0, 3)}.{rng.randint(1, 254)}"
+        dst = f"{rng.randint(1, 223)}.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}"
+        if kind < 0.55:
+            l4 = TCP(sport=rng.randint(1024, 65535), dport=rng.choice((80, 443, 22, 8080)),
+                     flags=rng.choice(("S", "SA", "A", "PA", "FA", "R")))
+        elif kind < 0.85:
+            l4 = UDP(sport=rng.randint(1024, 65535), dport=rng.choice((53, 123, 443)))
+        else:
+            l4 = ICMP()
+        l3 = IP(src=src, dst=dst)
+        if i % 10 == 0:
+            l3 = IPv6(src=f"fd00::{rng.randint(1, 0xffff):x}", dst=f"2001:db8::{rng.randint(1, 0xffff):x}")
+            if isinstance(l4, ICMP):
+                l4 = UDP(sport=5353, dport=5353)
+        # MACs explícitas: Ether() sin destino resolvería por ARP
+        link = Ether(src=BENCH_SRC_MAC, dst=BENCH_DST_MAC)
+        if i % 7 == 0:
+            link = link / Dot1Q(vlan=10)
+        packets.append(link / l3 / l4 / payload)
+    # Escribir en un temporal para no dejar un corpus a medias si se interrumpe
+    wrpcap(path + ".tmp", packets)
+    os.replace(path + ".tmp", path)
+
+
+def parse_scapy(packet):
+    """Ruta scapy original de _parse_packet (solo extracción de campos)"""
+    if IP not in packet:
+        return None
+    src_port = None
+    dst_port = None
+    protocol = "UNKNOWN"
+    payload = None
+    flags = None
+    tcp_seq = None
+    tcp_len = None
+    if TCP in packet:
+        protocol = "TCP"
+        src_port = packet[TCP].sport
+        dst_port = packet[TCP].dport
+        flags = str(packet[TCP].flags)
+        tcp_seq = packet[TCP].seq
+        tcp_len = 0
+        if packet[TCP].payload:
+            payload = bytes(packet[TCP].payload)
+            tcp_len = len(payload)
+            payload = payload[:50]
+    elif UDP in packet:
+        protocol = "UDP"
+        src_port = packet[UDP].sport
+        dst_port = packet[UDP].dport
+        if packet[UDP].payload:
+            payload = bytes(packet[UDP].payload)[:50]
+    elif packet[IP].proto == 1:
+        protocol = "ICMP"
+    return {
+        "src_ip": packet[IP].src,
+        "dst_ip": packet[IP].dst,
+        "src_port": src_port,
+        "dst_port": dst_port,
+        "protocol": protocol,
+        "length": len(packet),
+        "payload": payload,
+        "flags": flags,
+        "tcp_seq": tcp_seq,
+        "tcp_len": tcp_len,
+    }
+
+
+def timed(label: str, func, items, repeat: int):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for item in items:
+            func(item)
+        best = min(best, time.perf_counter() - start)
+    per_packet_us = best / len(items) * 1e6
+    print(f"{label:<32} {per_packet_us:8.2f} µs/paquete  {len(items) / best:12,.0f} pps")
+    return per_packet_us
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pcap", help="Corpus pcap (por defecto se genera uno sintético)")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    path = args.pcap
+    if not path:
+        path = os.path.join(tempfile.gettempdir(), f"leireye_bench_corpus_{CORPUS_SEED}.pcap")
+        if not os.path.exists(path):
+            build_corpus(path)
+
+    raw_frames = [data for data, _ in RawPcapReader(path)]
+    scapy_packets = rdpcap(path)
+    print(f"Corpus: {path} ({len(raw_frames)} tramas)\n")
+
+    # Verificar que ambas rutas producen los mismos campos para IPv4
+    mismatches = 0
+    for frame, packet in zip(raw_frames, scapy_packets):
+        expected = parse_scapy(packet)
+        if expected is None:
+            continue
+        fields = dissect(frame, LINKTYPE_ETHERNET)
+        fields.pop("payload_span")
+        if fields != expected:
+            mismatches += 1
+    print(f"Diferencias con la ruta scapy (IPv4): {mismatches}\n")
+
+    scapy_us = timed("scapy (solo extracción)", parse_scapy, scapy_packets, args.repeat)
+    full_us = timed("scapy (disección + extracción)", lambda f: parse_scapy(Ether(f)), raw_frames, args.repeat)
+    fast_us = timed("struct dissect()", lambda f: dissect(f, LINKTYPE_ETHERNET), raw_frames, args.repeat)
+    print(f"\nAceleración: x{scapy_us / fast_us:.1f} (extracción), x{full_us / fast_us:.1f} (total)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: ``PacketData`` (pydantic) vs. ``PacketRecord`` (__slots__).
+
+Uso (desde backend/):
+    python -m benchmarks.bench_packet_record
+    python -m benchmarks.bench_packet_record --clients 4
+
+Mide el coste por paquete de construir el objeto en el thread de captura y
+de serializarlo para ``--clients`` clientes WebSocket: antes
+``PacketData(...)`` + ``model_dump(mode='json')`` por cliente, ahora
+``PacketRecord(...)`` + ``to_json()`` (cacheado tras el primer cliente).
+Los campos salen de un generador determinista (semilla fija).
+"""
+import argparse
+import random
+import time
+from datetime import datetime
+
+from app.models import PacketData
+from app.services.packet_record import PacketRecord
+
+FIELDS_SEED = 1337
+FIELDS_SIZE = 20000
+
+
+def build_fields(size: int = FIELDS_SIZE):
+    """Campos de paquete como los que produce ``dissect()`` más timestamp y proceso"""
+    rng = random.Random(FIELDS_SEED)
+    base_ts = 1_700_000_000.0
+    items = []
+    for i in range(size):
+        protocol = rng.choice(("TCP", "TCP", "UDP", "ICMP"))
+        has_ports = protocol != "ICMP"
+        items.append({
+            "timestamp": base_ts + i * 0.001,
+            "src_ip": f"192.168.{rng.randint(0, 3)}.{rng.randint(1, 254)}",
+            "dst_ip": f"{rng.randint(1, 223)}.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}",
+            "src_port": rng.randint(1024, 65535) if has_ports else None,
+            "dst_port": rng.choice((80, 443, 53)) if has_ports else None,
+            "protocol": protocol,
+            "length": rng.randint(60, 1514),
+            "payload": rng.randbytes(16) if rng.random() < 0.5 else None,
+            "flags": rng.choice(("S", "SA", "A", "PA")) if protocol == "TCP" else None,
+            "process_name": rng.choice((None, "firefox", "sshd")),
+            "pid": rng.randint(100, 50000) if rng.random() < 0.3 else None,
+        })
+    return items
+
+
+def to_packet_data(fields) -> PacketData:
+    """Ruta anterior: modelo pydantic con el payload ya convertido a hex"""
+    payload = fields["payload"]
+    data = {key: value for key, value in fields.items() if key != "payload"}
+    data["timestamp"] = datetime.fromtimestamp(fields["timestamp"])
+    data["payload_preview"] = payload.hex() if payload else None
+    return PacketData(**data)
+
+
+def pydantic_path(fields, clients: int):
+    packet = to_packet_data(fields)
+    for _ in range(clients):
+        packet.model_dump(mode="json")
+
+
+def record_path(fields, clients: int):
+    packet = PacketRecord(**fields)
+    for _ in range(clients):
+        packet.to_json()
+
+
+def timed(label: str, func, items, repeat: int):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for item in items:
+            func(item)
+        best = min(best, time.perf_counter() - start)
+    per_packet_us = best / len(items) * 1e6
+    print(f"{label:<40} {per_packet_us:8.2f} µs/paquete  {len(items) / best:12,.0f} pps")
+    return per_packet_us
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=FIELDS_SIZE)
+    parser.add_argument("--clients", type=int, default=1, help="Clientes WebSocket simulados")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    items = build_fields(args.size)
+    print(f"{len(items)} paquetes, {args.clients} cliente(s) WebSocket\n")
+
+    # Verificar que ambas rutas producen el mismo JSON
+    mismatches = sum(
+        1 for fields in items
+        if PacketRecord(**fields).to_json()
+        != to_packet_data(fields).model_dump(mode="json")
+    )
+    print(f"Diferencias en el JSON generado: {mismatches}\n")
+
+    timed("construcción PacketData", lambda f: pydantic_path(f, 0), items, args.repeat)
+    timed("construcción PacketRecord", lambda f: record_path(f, 0), items, args.repeat)
+    before = timed("PacketData + model_dump(mode='json')", lambda f: pydantic_path(f, args.clients), items, args.repeat)
+    after = timed("PacketRecord + to_json()", lambda f: record_path(f, args.clients), items, args.repeat)
+    print(f"\nAceleración por paquete: x{before / after:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,6 @@
+"""Configuración común de las pruebas del backend"""
+import os
+import sys
+
+# Permite ejecutar ``pytest`` desde la raíz del repositorio o desde backend/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
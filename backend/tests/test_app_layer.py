@@ -0,0 +1,45 @@
+"""Pruebas de la extracción de SNI y Host"""
+import struct
+
+from app.services.app_layer import FirstPayloadFilter, client_hostname
+
+
+def _client_hello(name: str) -> bytes:
+    """Registro TLS con un ClientHello mínimo (una extensión server_name)"""
+    encoded = name.encode()
+    server_name = struct.pack("!HBH", len(encoded) + 3, 0, len(encoded)) + encoded
+    padding = struct.pack("!HH", 0x0015, 4) + b"\0" * 4
+    extensions = struct.pack("!HH", 0x0000, len(server_name)) + server_name + padding
+    body = (
+        b"\x03\x03" + b"\x11" * 32  # versión y random
+        + b"\x00"  # session_id vacío
+        + struct.pack("!HH", 2, 0x1301)  # cipher_suites
+        + b"\x01\x00"  # compression_methods
+        + struct.pack("!H", len(extensions)) + extensions
+    )
+    handshake = b"\x01" + len(body).to_bytes(3, "big") + body
+    return b"\x16\x03\x01" + struct.pack("!H", len(handshake)) + handshake
+
+
+def test_tls_sni():
+    assert client_hostname(_client_hello("Api.Example.COM")) == "api.example.com"
+
+
+def test_http_host_without_port():
+    request = b"GET / HTTP/1.1\r\nUser-Agent: x\r\nHost: www.example.org:8080\r\n\r\n"
+    assert client_hostname(request) == "www.example.org"
+
+
+def test_other_payloads():
+    assert client_hostname(b"SSH-2.0-OpenSSH_9.6\r\n") is None
+    assert client_hostname(b"GET / HTTP/1.1\r\nHost: [::1]\r\n\r\n") is None
+    assert client_hostname(b"\x16\x03\x01") is None
+    assert client_hostname(_client_hello("example.com")[:60]) is None
+
+
+def test_first_payload_filter_is_bounded():
+    seen = FirstPayloadFilter(capacity=2)
+    assert seen.first("a") and not seen.first("a")
+    assert seen.first("b") and seen.first("c")
+    assert len(seen) == 2
+    assert seen.first("a")  # Olvidado al llenarse
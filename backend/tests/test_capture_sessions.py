@@ -0,0 +1,81 @@
+"""Pruebas del registro de sesiones de captura y su vista agregada"""
+import pytest
+from scapy.all import IP, TCP, UDP, Ether, raw
+
+from app.core.config import settings
+from app.services.capture_sessions import AGGREGATE_SESSION, CaptureSessionManager
+from app.services.packet_capture import PacketCaptureService
+from app.services.packet_dissector import LINKTYPE_ETHERNET
+from app.services.pcap_writer import EXPORT_WRITERS, stream_frames
+
+
+def _write_pcap(directory, name, layers):
+    frames = []
+    for index, layer in enumerate(layers):
+        data = raw(Ether() / IP(src="10.0.0.1", dst="10.0.0.2") / layer)
+        frames.append((1700000000.0 + index, LINKTYPE_ETHERNET, data, len(data)))
+    (directory / name).write_bytes(b"".join(stream_frames(EXPORT_WRITERS["pcap"](), [frames])))
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "PCAP_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "MAX_CAPTURE_SESSIONS", 3)
+    _write_pcap(tmp_path, "tcp.pcap", [TCP(sport=1000, dport=80)] * 3)
+    _write_pcap(tmp_path, "udp.pcap", [UDP(sport=1000, dport=53)] * 2)
+    manager = CaptureSessionManager(PacketCaptureService())
+    yield manager
+    for status in manager.list_sessions():
+        manager.remove(status["session_id"])
+
+
+def _replay(manager, session_id, pcap_file):
+    service = manager.start(session_id, backend="pcap", pcap_file=pcap_file, max_packets=0)
+    service.sniff_thread.join(timeout=5)
+    return service
+
+
+def test_sessions_are_independent(manager):
+    tcp = _replay(manager, "tcp", "tcp.pcap")
+    udp = _replay(manager, "udp", "udp.pcap")
+    assert manager.get("tcp") is tcp
+    assert (tcp.stats["total"], tcp.stats["tcp"]) == (3, 3)
+    assert (udp.stats["total"], udp.stats["udp"]) == (2, 2)
+    assert {status["session_id"] for status in manager.list_sessions()} == {"default", "tcp", "udp"}
+
+
+def test_aggregate_merges_all_sessions(manager):
+    _replay(manager, "tcp", "tcp.pcap")
+    version = manager.get_stats_version(AGGREGATE_SESSION)
+    _replay(manager, "udp", "udp.pcap")
+    stats = manager.get_stats(AGGREGATE_SESSION)
+    assert (stats["total"], stats["tcp"], stats["udp"]) == (5, 3, 2)
+    assert manager.get_stats_version(AGGREGATE_SESSION) != version
+
+
+def test_failed_start_does_not_register(manager):
+    with pytest.raises(RuntimeError):
+        manager.start("missing", backend="pcap", pcap_file="missing.pcap")
+    with pytest.raises(KeyError):
+        manager.get("missing")
+    # El nombre queda libre para otro intento
+    _replay(manager, "missing", "tcp.pcap")
+
+
+def test_session_limit_and_reserved_id(manager):
+    _replay(manager, "one", "tcp.pcap")
+    _replay(manager, "two", "tcp.pcap")
+    with pytest.raises(RuntimeError):
+        manager.start("three", backend="pcap", pcap_file="tcp.pcap")
+    with pytest.raises(ValueError):
+        manager.start(AGGREGATE_SESSION, backend="pcap", pcap_file="tcp.pcap")
+
+
+def test_remove_session(manager):
+    _replay(manager, "tcp", "tcp.pcap")
+    manager.remove("tcp")
+    with pytest.raises(KeyError):
+        manager.get("tcp")
+    # La sesión por defecto solo se resetea
+    manager.remove("default")
+    assert manager.get("default").stats["total"] == 0
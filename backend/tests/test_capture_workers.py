@@ -0,0 +1,65 @@
+"""Pruebas de los informes de los workers de captura"""
+from scapy.all import IP, TCP, UDP, Ether, raw
+
+from app.services.capture_workers import WorkerCapture
+from app.services.packet_capture import PacketCaptureService
+from app.services.packet_dissector import LINKTYPE_ETHERNET, SNAPLEN_MAX
+from app.services.packet_sampler import PacketSampler
+
+
+def _frame(layer):
+    frame = raw(Ether() / IP(src="10.0.0.1", dst="10.0.0.2") / layer)
+    return frame, 1000.0, LINKTYPE_ETHERNET, len(frame)
+
+
+def _worker_report(tcp: int, udp: int):
+    worker = WorkerCapture(PacketSampler(), SNAPLEN_MAX)
+    worker.process_batch(
+        [_frame(TCP(sport=1234, dport=80)) for _ in range(tcp)]
+        + [_frame(UDP(sport=1234, dport=5000)) for _ in range(udp)]
+    )
+    return worker.take_report()
+
+
+def test_idle_worker_sends_no_delta():
+    worker = WorkerCapture(PacketSampler(), SNAPLEN_MAX)
+    stats = worker.stats
+    assert worker.take_report() == ([], None, [], [])
+    # Sin paquetes no se recrean las estadísticas
+    assert worker.stats is stats
+
+
+def test_report_hands_off_delta_and_resets():
+    worker = WorkerCapture(PacketSampler(), SNAPLEN_MAX)
+    worker.process_batch([_frame(TCP(sport=1234, dport=80))] * 3)
+    packets, delta, _, _ = worker.take_report()
+    assert len(packets) == 3
+    assert delta["total"] == delta["tcp"] == 3
+    assert worker.stats["total"] == 0
+    assert worker.take_report()[1] is None
+
+
+def test_ingest_merges_worker_delta():
+    service = PacketCaptureService("test-workers")
+    service.max_packets = 0
+    service._ingest_worker_report(*_worker_report(tcp=4, udp=2))
+    assert service.stats["total"] == 6
+    assert service.stats["tcp"] == 4
+    assert len(service.get_packets(limit=10)) == 6
+    version = service.stats_version
+    service._ingest_worker_report([], None, [], [])
+    assert service.stats_version == version
+
+
+def test_ingest_truncates_delta_to_max_packets():
+    service = PacketCaptureService("test-workers")
+    service.max_packets = 5
+    service._ingest_worker_report(*_worker_report(tcp=6, udp=4))
+    stats = service.stats
+    # Solo cuenta la parte que cabe, con los contadores en proporción
+    assert stats["total"] == 5
+    assert (stats["tcp"], stats["udp"]) == (3, 2)
+    assert stats["bytes"] == stats["tcp_bytes"] + stats["udp_bytes"]
+    assert len(service.get_packets(limit=10)) == 5
+    service._ingest_worker_report(*_worker_report(tcp=1, udp=0))
+    assert service.stats["total"] == 5
@@ -0,0 +1,65 @@
+"""Pruebas de los contadores de distintos (HyperLogLog)"""
+import pickle
+
+import pytest
+
+from app.services.cardinality import DistinctWindow, HyperLogLog
+from app.services.packet_dissector import SNAPLEN_MAX
+from app.services.packet_pipeline import PacketPipeline
+from app.services.packet_record import PacketRecord
+from app.services.passive_dns import HostnameBuffer
+
+
+def test_hyperloglog_merge_is_union():
+    a, b = HyperLogLog(12), HyperLogLog(12)
+    a.update(range(0, 6000))
+    b.update(range(4000, 10000))
+    union = a.copy().merge(b)
+    assert union.count() == pytest.approx(10000, rel=4 * union.relative_error)
+    # Las cardinalidades no se escalan con el muestreo
+    assert union.scaled(10).count() == union.count()
+    with pytest.raises(ValueError):
+        a.merge(HyperLogLog(10))
+
+
+def test_hyperloglog_small_range_is_exact_enough():
+    sketch = HyperLogLog(12)
+    sketch.update(f"192.168.0.{host}" for host in range(50))
+    assert abs(sketch.count() - 50) <= 2
+
+
+@pytest.mark.parametrize("keys", [0, 40, 100_000])
+def test_hyperloglog_pickle_roundtrip(keys):
+    sketch = HyperLogLog(12)
+    sketch.update(range(keys))
+    data = pickle.dumps(sketch)
+    clone = pickle.loads(data)
+    assert clone.precision == 12
+    assert clone.registers == sketch.registers
+    if keys <= 40:
+        # Poco poblado: solo viajan los registros no nulos
+        assert len(data) < 512
+
+
+def test_distinct_window_keeps_last_minutes():
+    window = DistinctWindow(minutes=2, precision=10)
+    window.update(0, ["a", "b"])
+    window.update(60, ["a"])
+    window.update(150, ["c", "d", "e"])
+    window.update(10, ["late"])  # Más antiguo que la ventana: se descarta
+    assert window.to_json() == [{"minute": 60, "distinct": 1}, {"minute": 120, "distinct": 3}]
+
+
+def test_batch_across_minutes_counts_each_destination_in_its_minute():
+    pipeline = PacketPipeline(SNAPLEN_MAX, HostnameBuffer())
+    records = [
+        PacketRecord(119.5, "10.0.0.1", f"1.1.1.{host}", 1000, 80, "TCP", 60)
+        for host in range(3)
+    ] + [
+        PacketRecord(120.5, "10.0.0.1", "2.2.2.2", 1000, 80, "TCP", 60),
+    ]
+    pipeline._update_stats(records)
+    assert pipeline.stats["distinct_dst_per_minute"].to_json() == [
+        {"minute": 60, "distinct": 3},
+        {"minute": 120, "distinct": 1},
+    ]
@@ -0,0 +1,76 @@
+"""Pruebas de la tabla de flujos y su expiración"""
+from app.services.flow_table import FLOW_FIN_TIMEOUT, FlowTable
+from app.services.packet_record import PacketRecord
+
+CLIENT, SERVER = "192.168.1.10", "93.184.216.34"
+
+
+def _packet(timestamp, src, sport, dst, dport, protocol="UDP", length=100, flags=None):
+    return PacketRecord(timestamp, src, dst, sport, dport, protocol, length, flags=flags)
+
+
+def _table(idle=30, active=300):
+    return FlowTable(idle_timeout=idle, active_timeout=active, max_flows=100, history=100)
+
+
+def test_both_directions_share_a_flow():
+    table = _table()
+    table.update([
+        _packet(10.0, CLIENT, 5353, SERVER, 53),
+        _packet(10.1, SERVER, 53, CLIENT, 5353, length=300),
+    ])
+    [flow] = table.active()
+    assert (flow["src_ip"], flow["dst_ip"]) == (CLIENT, SERVER)
+    assert (flow["packets_fwd"], flow["packets_rev"]) == (1, 1)
+    assert (flow["bytes_fwd"], flow["bytes_rev"]) == (100, 300)
+
+
+def test_syn_ack_first_makes_the_other_end_the_initiator():
+    table = _table()
+    table.update([_packet(1.0, SERVER, 443, CLIENT, 50000, protocol="TCP", flags="SA")])
+    [flow] = table.active()
+    assert (flow["src_ip"], flow["src_port"]) == (CLIENT, 50000)
+
+
+def test_idle_flows_expire_on_packet_clock():
+    table = _table(idle=30)
+    table.update([_packet(100.0, CLIENT, 1000, SERVER, 53)])
+    table.update([_packet(120.0, CLIENT, 1000, SERVER, 53)])  # Renueva el flujo
+    table.update([_packet(149.0, CLIENT, 2000, SERVER, 53)])
+    assert len(table) == 2
+    table.update([_packet(151.0, CLIENT, 2000, SERVER, 53)])
+    assert len(table) == 1
+    [record] = table.recent_expired()
+    assert record["src_port"] == 1000 and record["end_reason"] == "idle"
+    assert record["packets_fwd"] == 2
+
+
+def test_finished_tcp_flow_expires_after_fin_timeout():
+    table = _table()
+    table.update([
+        _packet(1.0, CLIENT, 50000, SERVER, 443, protocol="TCP", flags="FA"),
+        _packet(1.1, SERVER, 443, CLIENT, 50000, protocol="TCP", flags="FA"),
+    ])
+    table.advance(1.1 + FLOW_FIN_TIMEOUT + 1)
+    [record] = table.recent_expired()
+    assert record["end_reason"] == "finished"
+    assert record["tcp_state_fwd"] == "FIN" and record["tcp_state_rev"] == "FIN"
+
+
+def test_active_timeout_emits_partial_records():
+    table = _table(idle=30, active=60)
+    for second in range(0, 130, 10):
+        table.update([_packet(float(second), CLIENT, 1000, SERVER, 53)])
+    table.update([_packet(125.0, CLIENT, 1000, SERVER, 53)])
+    records = table.recent_expired()
+    assert [record["end_reason"] for record in records] == ["active", "active"]
+    assert sum(record["packets_fwd"] for record in records) + table.active()[0]["packets_fwd"] == 14
+    table.flush()
+    assert table.recent_expired(1)[0]["end_reason"] == "end"
+    assert len(table) == 0 and table.get_stats()["timers"] == 0
+
+
+def test_full_table_drops_new_flows():
+    table = FlowTable(idle_timeout=30, active_timeout=300, max_flows=1, history=10)
+    table.update([_packet(1.0, CLIENT, 1000, SERVER, 53), _packet(1.0, CLIENT, 1001, SERVER, 53)])
+    assert table.get_stats()["active"] == 1 and table.get_stats()["dropped"] == 1
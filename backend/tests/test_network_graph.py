@@ -0,0 +1,71 @@
+"""Pruebas del grafo incremental del mapa de red"""
+from app.services.network_graph import NetworkGraph
+
+LAN, DNS, WEB = "192.168.1.10", "8.8.8.8", "93.184.216.34"
+
+
+def _graph(max_nodes=100, max_edges=100):
+    return NetworkGraph(max_nodes, max_edges)
+
+
+def test_full_view():
+    graph = _graph()
+    graph.update({(LAN, DNS): (2, 200), (LAN, WEB): (3, 3000)})
+    view = graph.view()
+    assert view["full"]
+    assert {node["ip"]: node["packets"] for node in view["nodes"]} == {LAN: 5, DNS: 2, WEB: 3}
+    assert len(view["links"]) == 2
+    assert view["summary"]["total_connections"] == 5
+    assert (view["summary"]["local_nodes"], view["summary"]["external_nodes"]) == (1, 2)
+    by_bytes = graph.view(metric="bytes")
+    assert sorted(link["value"] for link in by_bytes["links"]) == [200, 3000]
+
+
+def test_view_since_returns_only_changes():
+    graph = _graph()
+    graph.update({(LAN, DNS): (1, 100), (LAN, WEB): (1, 100)})
+    version = graph.view()["version"]
+    assert graph.view(version)["nodes"] == []
+    graph.update({(LAN, DNS): (4, 400)})
+    delta = graph.view(version)
+    assert not delta["full"]
+    assert {node["ip"] for node in delta["nodes"]} == {LAN, DNS}
+    [link] = delta["links"]
+    assert link["packets"] == 5
+    # Los IDs son estables entre vistas
+    ids = {node["ip"]: node["id"] for node in graph.view()["nodes"]}
+    assert (link["source"], link["target"]) == (ids[LAN], ids[DNS])
+
+
+def test_since_before_reset_returns_full_graph():
+    old = _graph()
+    old.update({(LAN, DNS): (1, 100)})
+    version = old.view()["version"]
+    graph = _graph()  # La sesión se ha reseteado
+    graph.update({(LAN, WEB): (1, 100)})
+    view = graph.view(version - 1)
+    assert view["full"]
+    assert {node["ip"] for node in view["nodes"]} == {LAN, WEB}
+
+
+def test_limits_count_dropped_connections():
+    graph = _graph(max_nodes=2, max_edges=1)
+    graph.update({(LAN, DNS): (1, 100), (LAN, WEB): (2, 200), (DNS, LAN): (3, 300)})
+    summary = graph.view()["summary"]
+    assert summary["total_nodes"] == 2
+    assert summary["total_links"] == 1
+    assert summary["dropped_connections"] == 5
+    assert summary["total_connections"] == 6
+
+
+def test_merge_and_scaled():
+    a, b = _graph(), _graph()
+    a.update({(LAN, DNS): (1, 100)})
+    b.update({(WEB, LAN): (2, 200), (LAN, DNS): (3, 300)})
+    a.merge(b)
+    view = a.view()
+    assert {node["ip"]: node["packets"] for node in view["nodes"]} == {LAN: 6, DNS: 4, WEB: 2}
+    scaled = a.scaled(10).view()
+    assert scaled["summary"]["total_connections"] == 60
+    assert sorted(link["packets"] for link in scaled["links"]) == [20, 40]
+    assert a.view()["summary"]["total_connections"] == 6
@@ -0,0 +1,68 @@
+"""Pruebas del puente entre el thread de captura y los clientes asyncio"""
+import asyncio
+import threading
+
+from app.services.packet_bridge import PacketBridge
+from app.services.packet_record import PacketRecord
+
+
+def _records(count, start=0):
+    return [PacketRecord(float(start + i), "10.0.0.1", "10.0.0.2", 1000, 80, "TCP", 60) for i in range(count)]
+
+
+def test_publish_from_thread_wakes_subscribers():
+    async def scenario():
+        bridge = PacketBridge()
+        loop = asyncio.get_running_loop()
+        first, second = bridge.subscribe(loop), bridge.subscribe(loop)
+        publisher = threading.Thread(target=lambda: (bridge.publish(_records(3)), bridge.publish(_records(2, 3))))
+        publisher.start()
+        publisher.join()
+        # Cada suscriptor recibe todos los lotes pendientes de una vez
+        for subscription in (first, second):
+            packets = await asyncio.wait_for(subscription.get(), timeout=1)
+            assert [p.timestamp for p in packets] == [0.0, 1.0, 2.0, 3.0, 4.0]
+        return bridge.get_stats()
+
+    stats = asyncio.run(scenario())
+    assert (stats["subscribers"], stats["published"], stats["drops"]) == (2, 5, 0)
+
+
+def test_slow_subscriber_drops_oldest():
+    async def scenario():
+        bridge = PacketBridge(capacity=4)
+        subscription = bridge.subscribe(asyncio.get_running_loop())
+        bridge.publish(_records(3))
+        bridge.publish(_records(3, 3))
+        packets = await asyncio.wait_for(subscription.get(), timeout=1)
+        return bridge, subscription, packets
+
+    bridge, subscription, packets = asyncio.run(scenario())
+    assert [p.timestamp for p in packets] == [2.0, 3.0, 4.0, 5.0]
+    assert subscription.drops == bridge.drops == 2
+    assert bridge.high_water == 4
+    bridge.reset_counters()
+    assert (bridge.published, bridge.drops, bridge.high_water) == (0, 0, 0)
+
+
+def test_unsubscribed_client_receives_nothing():
+    async def scenario():
+        bridge = PacketBridge()
+        subscription = bridge.subscribe(asyncio.get_running_loop())
+        bridge.unsubscribe(subscription)
+        bridge.unsubscribe(subscription)  # Idempotente
+        bridge.publish(_records(2))
+        return bridge, subscription
+
+    bridge, subscription = asyncio.run(scenario())
+    assert not subscription.ring
+    assert bridge.get_stats()["subscribers"] == 0
+
+
+def test_publish_after_loop_closed_is_ignored():
+    loop = asyncio.new_event_loop()
+    bridge = PacketBridge()
+    subscription = bridge.subscribe(loop)
+    loop.close()
+    bridge.publish(_records(1))
+    assert len(subscription.ring) == 1
@@ -0,0 +1,61 @@
+"""Pruebas del disector de cabeceras"""
+from scapy.all import Dot1Q, Ether, ICMP, IP, IPv6, Raw, TCP, UDP
+
+from app.services.packet_dissector import (
+    LINKTYPE_ETHERNET, LINKTYPE_RAW, PAYLOAD_PREVIEW_BYTES, dissect,
+)
+
+
+def test_ipv4_tcp():
+    frame = bytes(Ether() / IP(src="10.0.0.1", dst="8.8.8.8") / TCP(sport=40000, dport=443, flags="PA", seq=1234) / Raw(b"x" * 100))
+    fields = dissect(frame, LINKTYPE_ETHERNET)
+    assert fields["src_ip"] == "10.0.0.1"
+    assert fields["dst_ip"] == "8.8.8.8"
+    assert (fields["src_port"], fields["dst_port"]) == (40000, 443)
+    assert fields["protocol"] == "TCP"
+    assert fields["flags"] == "PA"
+    assert fields["tcp_seq"] == 1234
+    assert fields["tcp_len"] == 100
+    assert fields["length"] == len(frame)
+    assert fields["payload"] == b"x" * PAYLOAD_PREVIEW_BYTES
+    start, end = fields["payload_span"]
+    assert frame[start:end] == b"x" * 100
+
+
+def test_vlan_ipv6_udp():
+    frame = bytes(Ether() / Dot1Q(vlan=7) / IPv6(src="2001:db8::1", dst="2001:db8::2") / UDP(sport=5353, dport=53) / Raw(b"abc"))
+    fields = dissect(frame)
+    assert fields["src_ip"] == "2001:db8::1"
+    assert fields["dst_ip"] == "2001:db8::2"
+    assert fields["protocol"] == "UDP"
+    assert (fields["src_port"], fields["dst_port"]) == (5353, 53)
+    assert fields["payload"] == b"abc"
+    assert fields["flags"] is None
+
+
+def test_raw_icmp():
+    frame = bytes(IP(src="192.168.1.2", dst="1.1.1.1") / ICMP())
+    fields = dissect(frame, LINKTYPE_RAW)
+    assert fields["protocol"] == "ICMP"
+    assert fields["src_port"] is None and fields["dst_port"] is None
+
+
+def test_truncated_frame_keeps_wire_length():
+    full = bytes(Ether() / IP() / TCP() / Raw(b"y" * 500))
+    fields = dissect(full[:64], LINKTYPE_ETHERNET, wire_len=len(full))
+    assert fields["length"] == len(full)
+    assert fields["tcp_len"] == 500  # Según las cabeceras, no según lo capturado
+    start, end = fields["payload_span"]
+    assert end == 64
+
+
+def test_non_initial_fragment_has_no_ports():
+    frame = bytes(Ether() / IP(frag=10, proto=6) / Raw(b"z" * 40))
+    fields = dissect(frame)
+    assert fields["protocol"] == "UNKNOWN"
+    assert fields["src_port"] is None
+
+
+def test_not_ip():
+    assert dissect(bytes(Ether(type=0x0806) / Raw(b"\0" * 28))) is None
+    assert dissect(b"\0" * 10) is None
@@ -0,0 +1,72 @@
+"""Pruebas del muestreo de paquetes y de la estimación de totales"""
+import pytest
+from scapy.all import IP, TCP, Ether, raw
+
+from app.services.packet_dissector import LINKTYPE_ETHERNET, SNAPLEN_MAX
+from app.services.packet_pipeline import PacketPipeline, new_capture_stats
+from app.services.packet_record import PacketRecord
+from app.services.packet_sampler import PacketSampler, estimate_stats, sampling_summary
+from app.services.passive_dns import HostnameBuffer
+
+
+def _record(src, sport, dst, dport):
+    return PacketRecord(1.0, src, dst, sport, dport, "TCP", 60)
+
+
+def test_invalid_options():
+    with pytest.raises(ValueError):
+        PacketSampler("sometimes")
+    with pytest.raises(ValueError):
+        PacketSampler("count", sample_every=0)
+    with pytest.raises(ValueError):
+        PacketSampler("random", sample_probability=0.0)
+
+
+def test_disabled_sampler_has_unit_scale():
+    for sampler in (PacketSampler(), PacketSampler("count", 1), PacketSampler("flow", sample_probability=1.0)):
+        assert not sampler.enabled
+        assert sampler.scale == 1.0
+        assert sampler.describe()["mode"] == "none"
+
+
+def test_count_keeps_one_in_n():
+    sampler = PacketSampler("count", sample_every=4)
+    assert sampler.samples_frames and not sampler.samples_flows
+    kept = [sampler.keep_frame() for _ in range(12)]
+    assert kept == [False, False, False, True] * 3
+    assert sampler.scale == 4.0
+
+
+def test_flow_decision_is_symmetric_and_stable():
+    sampler = PacketSampler("flow", sample_probability=0.5)
+    assert sampler.samples_flows and not sampler.samples_frames
+    kept = 0
+    for port in range(1000, 1400):
+        forward = sampler.keep_flow(_record("10.0.0.1", port, "10.0.0.2", 443))
+        assert forward == sampler.keep_flow(_record("10.0.0.2", 443, "10.0.0.1", port))
+        assert forward == PacketSampler("flow", sample_probability=0.5).keep_flow(_record("10.0.0.1", port, "10.0.0.2", 443))
+        kept += forward
+    assert 140 < kept < 260
+
+
+def test_pipeline_samples_before_stats():
+    pipeline = PacketPipeline(SNAPLEN_MAX, HostnameBuffer())
+    pipeline.sampler = PacketSampler("count", sample_every=3)
+    frame = raw(Ether() / IP(src="10.0.0.1", dst="10.0.0.2") / TCP(sport=1000, dport=80))
+    records, frames = pipeline._parse_batch([(frame, 1.0, LINKTYPE_ETHERNET, len(frame))] * 9, retain=True)
+    assert len(records) == len(frames) == 3
+
+
+def test_estimate_stats_scales_counters():
+    stats = new_capture_stats()
+    stats["total"] = stats["tcp"] = 3
+    stats["bytes"] = stats["tcp_bytes"] = 180
+    stats["ports"].update({80: (3, 180)})
+    assert estimate_stats(stats, 1.0) is stats
+    estimated = estimate_stats(stats, 4.0)
+    assert (estimated["total"], estimated["tcp"], estimated["bytes"]) == (12, 12, 720)
+    assert tuple(estimated["ports"].get(80)) == (12, 720)
+    # La muestra no cambia
+    assert stats["total"] == 3 and tuple(stats["ports"].get(80)) == (3, 180)
+    summary = sampling_summary(stats, estimated, PacketSampler("count", sample_every=4))
+    assert (summary["sampled_packets"], summary["estimated_packets"], summary["scale"]) == (3, 12, 4.0)
@@ -0,0 +1,65 @@
+"""Pruebas del análisis de respuestas DNS"""
+from scapy.all import DNS, DNSQR, DNSRR
+
+from app.services.passive_dns import PassiveDNSCache, parse_dns_response
+
+
+def _response(*answers, **fields):
+    return bytes(DNS(id=1, qr=1, qd=DNSQR(qname="www.example.com"), an=list(answers) or None, **fields))
+
+
+def test_a_and_aaaa_records_use_question_name():
+    message = _response(
+        DNSRR(rrname="www.example.com", type="CNAME", rdata="edge.cdn.net", ttl=60),
+        DNSRR(rrname="edge.cdn.net", type="A", rdata="93.184.216.34", ttl=300),
+        DNSRR(rrname="edge.cdn.net", type="AAAA", rdata="2606:2800:220:1::1", ttl=120),
+    )
+    assert parse_dns_response(message) == [
+        ("93.184.216.34", "www.example.com", 300),
+        ("2606:2800:220:1::1", "www.example.com", 120),
+    ]
+
+
+def test_queries_and_errors_are_ignored():
+    query = bytes(DNS(id=1, qr=0, qd=DNSQR(qname="www.example.com")))
+    assert parse_dns_response(query) == []
+    nxdomain = _response(DNSRR(rrname="www.example.com", type="A", rdata="1.2.3.4"), rcode=3)
+    assert parse_dns_response(nxdomain) == []
+
+
+def test_truncated_message():
+    message = _response(DNSRR(rrname="www.example.com", type="A", rdata="1.2.3.4", ttl=30))
+    assert parse_dns_response(message[:-2]) == []
+    assert parse_dns_response(message[:5]) == []
+
+
+def test_compression_loop_does_not_hang():
+    # Cabecera de respuesta con una pregunta cuyo nombre apunta a sí mismo
+    message = bytes.fromhex("0001 8180 0001 0001 0000 0000") + b"\xc0\x0c" + b"\x00\x01\x00\x01"
+    assert parse_dns_response(message) == []
+
+
+def test_cache_evicts_least_recently_used():
+    cache = PassiveDNSCache(capacity=2, min_ttl=60, max_ttl=3600)
+    cache.add([("1.1.1.1", "one.example", 300), ("2.2.2.2", "two.example", 300)])
+    assert cache.lookup("1.1.1.1") == "one.example"  # Pasa a ser la más reciente
+    cache.add([("3.3.3.3", "three.example", 300)])
+    assert cache.lookup_many(["1.1.1.1", "2.2.2.2", "3.3.3.3"]) == {
+        "1.1.1.1": "one.example",
+        "3.3.3.3": "three.example",
+    }
+    assert cache.get_stats()["evictions"] == 1
+
+
+def test_cache_ttl_is_clamped_and_expires(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("app.services.passive_dns.time.monotonic", lambda: now[0])
+    cache = PassiveDNSCache(capacity=10, min_ttl=60, max_ttl=3600)
+    cache.add([("1.1.1.1", "short.example", 1)])
+    version = cache.version
+    now[0] += 59
+    assert cache.lookup("1.1.1.1") == "short.example"
+    now[0] += 2
+    assert cache.lookup("1.1.1.1") is None
+    cache.add([("1.1.1.1", "short.example", 300)])
+    assert cache.version == version + 1
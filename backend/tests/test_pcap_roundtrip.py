@@ -0,0 +1,59 @@
+"""Pruebas de escritura y lectura de ficheros pcap/pcapng"""
+import pytest
+
+from app.services.packet_dissector import LINKTYPE_ETHERNET, LINKTYPE_RAW
+from app.services.pcap_reader import PcapFormatError, PcapReader
+from app.services.pcap_writer import EXPORT_WRITERS, stream_frames
+
+FRAMES = [
+    (1700000000.123456789, LINKTYPE_ETHERNET, b"\x01" * 60, 60),
+    (1700000000.5, LINKTYPE_ETHERNET, b"\x02" * 64, 1514),  # Recortada por el snaplen
+    (1700000001.0, LINKTYPE_RAW, b"\x45" + b"\0" * 39, 40),
+]
+
+
+def _read(path):
+    with PcapReader(str(path)) as reader:
+        return [(bytes(data), timestamp, linktype, orig_len) for data, timestamp, linktype, orig_len in reader.iter_records()]
+
+
+def _write(tmp_path, extension, frames):
+    path = tmp_path / f"capture.{extension}"
+    path.write_bytes(b"".join(stream_frames(EXPORT_WRITERS[extension](), [frames])))
+    return path
+
+
+def test_pcapng_roundtrip(tmp_path):
+    records = _read(_write(tmp_path, "pcapng", FRAMES))
+    assert len(records) == len(FRAMES)
+    for (timestamp, linktype, data, orig_len), record in zip(FRAMES, records):
+        assert record[0] == data
+        assert record[1] == pytest.approx(timestamp, abs=1e-6)
+        assert record[2] == linktype
+        assert record[3] == orig_len
+
+
+def test_pcap_roundtrip_skips_other_linktypes(tmp_path):
+    writer = EXPORT_WRITERS["pcap"]()
+    path = tmp_path / "capture.pcap"
+    path.write_bytes(b"".join(stream_frames(writer, [FRAMES])))
+    records = _read(path)
+    assert writer.skipped == 1
+    assert [(data, orig_len) for data, _, _, orig_len in records] == [(data, orig_len) for _, _, data, orig_len in FRAMES[:2]]
+    assert records[0][1] == pytest.approx(FRAMES[0][0], abs=1e-6)
+
+
+def test_empty_export_is_valid(tmp_path):
+    for extension in EXPORT_WRITERS:
+        assert _read(_write(tmp_path, extension, [])) == []
+
+
+def test_invalid_files(tmp_path):
+    bad = tmp_path / "bad.pcap"
+    bad.write_bytes(b"not a capture file at all, really")
+    with PcapReader(str(bad)) as reader, pytest.raises(PcapFormatError):
+        list(reader.iter_records())
+    bad_ng = tmp_path / "bad.pcapng"
+    bad_ng.write_bytes(b"\x0a\x0d\x0d\x0a" + b"\0" * 40)
+    with PcapReader(str(bad_ng)) as reader, pytest.raises(PcapFormatError):
+        reader.iter_records()  # Se valida sin empezar a recorrer
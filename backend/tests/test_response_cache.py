@@ -0,0 +1,32 @@
+"""Pruebas de la caché de respuestas versionadas y de los ETag"""
+from app.services.response_cache import VersionedResponseCache, etag_for, etag_matches
+
+
+def test_etag_depends_on_the_whole_key():
+    key = ("summary", None, (), 7)
+    assert etag_for(key) == etag_for(("summary", None, (), 7))
+    assert etag_for(key) != etag_for(("summary", None, (), 8))
+    assert etag_for(key) != etag_for(("protocols", None, (), 7))
+    assert etag_for(key).startswith('"') and etag_for(key).endswith('"')
+
+
+def test_if_none_match():
+    etag = etag_for(("top-ips", "s1", (10, "packets"), 3))
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'"other", W/{etag}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches(None, etag)
+    assert not etag_matches('"other"', etag)
+
+
+def test_lru_and_counters():
+    cache = VersionedResponseCache(2)
+    cache.put("a", b"1")
+    cache.put("b", b"2")
+    assert cache.get("a") == b"1"  # "a" pasa a ser el más reciente
+    cache.put("c", b"3")
+    assert cache.get("b") is None
+    assert cache.get("c") == b"3"
+    assert cache.get_stats() == {"entries": 2, "capacity": 2, "hits": 2, "misses": 1}
+    cache.clear()
+    assert len(cache) == 0
@@ -0,0 +1,98 @@
+"""Pruebas de las rutas de estadísticas: caché versionada, ETag y mapa de red"""
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.routes import stats as stats_routes
+from app.services import geoip, packet_capture
+from app.services.packet_capture import capture_service
+from app.services.packet_record import PacketRecord
+from app.services.response_cache import stats_cache
+
+PEERS = ("93.184.216.34", "239.255.255.250", "8.8.8.8")
+
+
+@pytest.fixture
+def client():
+    capture_service.reset()
+    stats_cache.clear()
+    records = [PacketRecord(1.0, "192.168.1.10", peer, 50000, 443, "UDP", 100) for peer in PEERS]
+    with capture_service._lock:
+        capture_service._update_stats(records)
+        capture_service.stats['total'] += len(records)
+        capture_service.stats_version = next(packet_capture._STATS_VERSIONS)
+    app = FastAPI()
+    app.include_router(stats_routes.router)
+    yield TestClient(app)
+    capture_service.reset()
+    stats_cache.clear()
+
+
+def _locations(missing=()):
+    async def get_batch_locations(ips):
+        return {ip: {"country": "X"} for ip in ips if ip not in missing}
+    return get_batch_locations
+
+
+def test_summary_etag_and_304(client):
+    first = client.get("/api/stats/summary")
+    assert first.status_code == 200 and first.json()["total_packets"] == 3
+    etag = first.headers["etag"]
+    assert client.get("/api/stats/summary", headers={"If-None-Match": etag}).status_code == 304
+    capture_service.reset()  # Nueva versión: el ETag anterior deja de valer
+    second = client.get("/api/stats/summary", headers={"If-None-Match": etag})
+    assert second.status_code == 200 and second.headers["etag"] != etag
+
+
+def test_network_map_is_cached_when_every_node_resolved(client, monkeypatch):
+    monkeypatch.setattr(stats_routes, "get_batch_locations", _locations())
+    response = client.get("/api/stats/network-map")
+    assert response.status_code == 200 and "etag" in response.headers
+    assert len(stats_cache) == 1
+    again = client.get("/api/stats/network-map", headers={"If-None-Match": response.headers["etag"]})
+    assert again.status_code == 304
+
+
+def test_network_map_with_transient_geo_failure_is_not_cached(client, monkeypatch):
+    monkeypatch.setattr(stats_routes, "get_batch_locations", _locations(missing={"8.8.8.8"}))
+    response = client.get("/api/stats/network-map")
+    assert response.status_code == 200
+    assert "etag" not in response.headers and response.headers["cache-control"] == "no-store"
+    assert len(stats_cache) == 0
+    nodes = {node["ip"]: node for node in response.json()["nodes"]}
+    assert nodes["8.8.8.8"]["geo"] is None and nodes["93.184.216.34"]["geo"]["country"] == "X"
+
+
+def test_unlocatable_addresses_do_not_block_caching(client, monkeypatch):
+    # ip-api responde "fail" a una IP: se recuerda como sin ubicación, no como fallo transitorio
+    class Response:
+        status_code = 200
+
+        def json(self):
+            return [{"status": "fail", "message": "reserved range", "query": "93.184.216.34"},
+                    {"status": "success", "query": "8.8.8.8", "country": "United States"}]
+
+    class Client:
+        def __init__(self, *args, **kwargs):
+            pass
+
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc):
+            return False
+
+        async def post(self, url, json):
+            assert {entry["query"] for entry in json} == {"93.184.216.34", "8.8.8.8"}  # Multicast no se consulta
+            return Response()
+
+    monkeypatch.setattr(geoip.httpx, "AsyncClient", Client)
+    monkeypatch.setattr(geoip, "geo_cache", {})
+    monkeypatch.setattr(geoip, "geo_failures", {})
+    response = client.get("/api/stats/network-map")
+    assert "etag" in response.headers
+    nodes = {node["ip"]: node for node in response.json()["nodes"]}
+    assert nodes["239.255.255.250"]["isLocal"]
+    assert nodes["93.184.216.34"]["geo"] is None
+    assert nodes["8.8.8.8"]["geo"]["country"] == "United States"
+    assert "93.184.216.34" in geoip.geo_failures
@@ -0,0 +1,93 @@
+"""Pruebas de fusión y escalado de los resúmenes de estadísticas"""
+import random
+
+import pytest
+
+from app.services.cardinality import hash64
+from app.services.heavy_hitters import SpaceSaving
+from app.services.sketches import CountMinSketch, ExactCounts
+
+
+def _stream(seed: int, size: int = 5000):
+    """Claves con distribución sesgada: unas pocas muy frecuentes"""
+    rng = random.Random(seed)
+    return [f"10.0.{int(rng.paretovariate(1.2)) % 200}.1" for _ in range(size)]
+
+
+def _exact(keys):
+    counts = {}
+    for key in keys:
+        counts[key] = counts.get(key, 0) + 1
+    return counts
+
+
+def test_space_saving_bounds():
+    keys = _stream(1)
+    exact = _exact(keys)
+    summary = SpaceSaving(20)
+    for key in keys:
+        summary.add(key, 1, 100)
+    assert summary.total == len(keys)
+    assert summary.total_volume == 100 * len(keys)
+    for key, count, error in summary.top(10):
+        assert count - error <= exact[key] <= count
+    assert summary.min_count <= len(keys) / 20
+
+
+def test_space_saving_merge_matches_single_stream():
+    left, right = _stream(2), _stream(3)
+    exact = _exact(left + right)
+    a, b = SpaceSaving(30), SpaceSaving(30)
+    for key in left:
+        a.add(key)
+    for key in right:
+        b.add(key)
+    a.merge(b)
+    assert a.total == len(left) + len(right)
+    assert len(a) <= 30
+    for key, count, error in a.top(10):
+        assert count - error <= exact[key] <= count
+    heaviest = max(exact, key=exact.get)
+    assert a.top(1)[0][0] == heaviest
+
+
+def test_space_saving_scaled():
+    summary = SpaceSaving(4)
+    summary.update_pairs({"a": (10, 1000), "b": (4, 40)})
+    scaled = summary.scaled(2.5)
+    assert scaled.get("a") == 25 and scaled.get_volume("a") == 2500
+    assert scaled.total == 35 and scaled.total_volume == 2600
+    assert summary.get("a") == 10  # El original no cambia
+
+
+def test_count_min_never_underestimates_and_merges():
+    keys = _stream(4)
+    exact = _exact(keys)
+    items = {key: (count, count * 60) for key, count in exact.items()}
+    half = dict(list(items.items())[::2])
+    rest = {key: value for key, value in items.items() if key not in half}
+    wide, narrow = CountMinSketch(256, 4), CountMinSketch(64, 3)
+    wide.update(half, [hash64(key) for key in half])
+    narrow.update(rest)
+    wide.merge(narrow)
+    assert (wide.width, wide.depth) == (64, 3)
+    assert list(wide.totals) == [len(keys), 60 * len(keys)]
+    max_error = wide.error_bound()["max_error"]
+    for key, (packets, volume) in items.items():
+        estimate = wide.get(key)
+        assert estimate[0] >= packets and estimate[1] >= volume
+    assert sum(wide.get(key)[0] - packets <= max_error[0] for key, (packets, _) in items.items()) >= 0.9 * len(items)
+
+
+def test_count_min_rejects_bad_width():
+    with pytest.raises(ValueError):
+        CountMinSketch(100, 4)
+
+
+def test_exact_counts_merge_and_scale():
+    a, b = ExactCounts(), ExactCounts()
+    a.update({"x": (1, 100)})
+    b.update({"x": (2, 50), "y": (3, 30)})
+    a.merge(b)
+    assert a.get("x") == (3, 150) and a.get("y") == (3, 30) and a.get("z") == (0, 0)
+    assert a.scaled(2).get("y") == (6, 60)
@@ -0,0 +1,92 @@
+"""Pruebas de las métricas TCP por flujo (RTT, retransmisiones, desorden)"""
+import pytest
+
+from app.services.packet_record import PacketRecord
+from app.services.tcp_metrics import (
+    FORWARD, REVERSE, TCP_ACK, TCP_SYN, LatencyHistogram, TcpFlowState, TcpMetrics,
+)
+
+REMOTE = "93.184.216.34"
+
+
+def _segment(state, metrics, timestamp, direction, flags=TCP_ACK, seq=None, length=0):
+    record = PacketRecord(timestamp, "a", "b", 1, 2, "TCP", 60, tcp_seq=seq, tcp_len=length)
+    state.update(direction, flags, record, metrics, REMOTE, "curl")
+
+
+def _established(rtt=0.020):
+    """Flujo tras el handshake: el iniciador envía desde 1001 y el remoto desde 5001"""
+    state, metrics = TcpFlowState(), TcpMetrics()
+    _segment(state, metrics, 10.0, FORWARD, TCP_SYN, seq=1000)
+    _segment(state, metrics, 10.0 + rtt, REVERSE, TCP_SYN | TCP_ACK, seq=5000)
+    _segment(state, metrics, 10.0 + rtt + 0.001, FORWARD, TCP_ACK, seq=1001)
+    return state, metrics
+
+
+def test_handshake_rtt():
+    state, metrics = _established(rtt=0.020)
+    assert state.rtt == pytest.approx(0.020)
+    assert state.handshake_rtt == pytest.approx(0.021)
+    [row] = metrics.top("remote")
+    assert row["key"] == REMOTE
+    assert row["rtt_ms"]["count"] == row["handshake_ms"]["count"] == 1
+
+
+def test_retransmitted_syn_measures_from_last():
+    state, metrics = TcpFlowState(), TcpMetrics()
+    _segment(state, metrics, 10.0, FORWARD, TCP_SYN, seq=1000)
+    _segment(state, metrics, 11.0, FORWARD, TCP_SYN, seq=1000)
+    _segment(state, metrics, 11.05, REVERSE, TCP_SYN | TCP_ACK, seq=5000)
+    assert state.rtt == pytest.approx(0.05)
+
+
+def test_in_order_data_is_not_retransmitted():
+    state, metrics = _established()
+    _segment(state, metrics, 11.0, FORWARD, seq=1001, length=100)
+    _segment(state, metrics, 11.1, FORWARD, seq=1101, length=100)
+    assert (state.retransmits, state.out_of_order) == (0, 0)
+    assert state.next_seq[FORWARD] == 1201
+
+
+def test_repeated_segment_after_rtt_is_retransmit():
+    state, metrics = _established(rtt=0.020)
+    _segment(state, metrics, 11.0, FORWARD, seq=1001, length=100)
+    _segment(state, metrics, 11.5, FORWARD, seq=1001, length=100)
+    assert (state.retransmits, state.out_of_order) == (1, 0)
+    assert metrics.top("process")[0]["retransmits"] == 1
+
+
+def test_gap_filled_within_rtt_is_out_of_order():
+    state, metrics = _established(rtt=0.020)
+    _segment(state, metrics, 11.0, FORWARD, seq=1101, length=100)  # Llega antes el segundo
+    _segment(state, metrics, 11.001, FORWARD, seq=1001, length=100)
+    assert (state.retransmits, state.out_of_order) == (0, 1)
+    assert state.next_seq[FORWARD] == 1201
+
+
+def test_keepalive_is_not_counted():
+    state, metrics = _established()
+    _segment(state, metrics, 11.0, FORWARD, seq=1001, length=100)
+    segments = state.segments
+    _segment(state, metrics, 80.0, FORWARD, seq=1100, length=1)
+    _segment(state, metrics, 81.0, FORWARD, seq=1100, length=0)
+    assert state.segments == segments
+    assert state.retransmits == 0
+
+
+def test_sequence_wraparound():
+    state, metrics = TcpFlowState(), TcpMetrics()
+    _segment(state, metrics, 1.0, REVERSE, seq=0xFFFFFF00, length=0x100)
+    assert state.next_seq[REVERSE] == 0
+    _segment(state, metrics, 1.1, REVERSE, seq=0, length=100)
+    assert state.retransmits == 0
+
+
+def test_latency_histogram_percentiles():
+    histogram = LatencyHistogram()
+    for millis in range(1, 101):
+        histogram.add(millis / 1000)
+    # Buckets logarítmicos de 4 por octava: error relativo < 19%
+    assert histogram.percentile(50) == pytest.approx(0.050, rel=0.19)
+    assert histogram.percentile(99) == pytest.approx(0.099, rel=0.19)
+    assert histogram.percentile(100) <= histogram.max == 0.1
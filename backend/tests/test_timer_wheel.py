@@ -0,0 +1,77 @@
+"""Pruebas de la rueda de temporizadores"""
+import random
+import time
+
+import pytest
+
+from app.services.timer_wheel import TimerWheel
+
+
+def test_requires_clock():
+    with pytest.raises(RuntimeError):
+        TimerWheel().schedule("a", 10)
+
+
+def test_fires_each_timer_once_at_its_tick():
+    wheel = TimerWheel(tick=1.0, slots=4, levels=2)
+    wheel.advance(100)
+    deadlines = {"near": 101.5, "level1": 106, "far": 130, "overflow": 200}
+    for item, deadline in deadlines.items():
+        wheel.schedule(item, deadline)
+    fired = {}
+    for now in range(101, 260):
+        for tick, item in wheel.advance(now):
+            assert item not in fired
+            fired[item] = (tick, now)
+    assert fired == {item: (int(deadline), int(deadline)) for item, deadline in deadlines.items()}
+    assert wheel.pending == 0
+
+
+def test_past_deadline_fires_on_next_tick():
+    wheel = TimerWheel(tick=1.0)
+    wheel.advance(50)
+    assert wheel.schedule("late", 10) == 51
+    assert wheel.advance(50.9) == []
+    assert wheel.advance(51) == [(51, "late")]
+
+
+def test_large_jump_and_clear():
+    wheel = TimerWheel(tick=0.5, slots=8, levels=2)
+    wheel.advance(0)
+    wheel.schedule("a", 3)
+    wheel.schedule("b", 1000)
+    assert [item for _, item in wheel.advance(2000)] == ["a", "b"]
+    wheel.schedule("c", 2100)
+    wheel.clear()
+    assert not wheel.started and wheel.pending == 0
+
+
+def test_matches_reference_with_random_jumps():
+    rng = random.Random(7)
+    wheel = TimerWheel(tick=1.0, slots=8, levels=2)
+    now = 0
+    wheel.advance(now)
+    expected = {}  # item → tick en el que debe vencer
+    for step in range(3000):
+        if rng.random() < 0.6:
+            deadline = now + rng.choice((0, 1, 5, 30, 70, 500, 5000, 100000)) * rng.random()
+            item = ("timer", step)
+            expected[item] = wheel.schedule(item, deadline)
+            assert expected[item] == max(int(deadline), now + 1)
+        else:
+            now += rng.choice((1, 2, 10, 64, 600, 70000))
+            for tick, item in wheel.advance(now):
+                assert expected.pop(item) == tick <= now
+            assert all(tick > now for tick in expected.values())
+    assert wheel.pending == len(expected)
+
+
+def test_far_future_timestamp_does_not_walk_every_tick():
+    wheel = TimerWheel(tick=1.0)
+    wheel.advance(1_700_000_000)
+    wheel.schedule("idle", 1_700_000_060)
+    wheel.schedule("corrupt", 1e15 + 60)
+    started = time.perf_counter()
+    assert wheel.advance(1e15) == [(1_700_000_060, "idle")]
+    assert wheel.advance(1e15 + 60) == [(int(1e15 + 60), "corrupt")]
+    assert time.perf_counter() - started < 1.0
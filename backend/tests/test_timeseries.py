@@ -0,0 +1,61 @@
+"""Pruebas de las series temporales de tráfico"""
+from app.services.timeseries import FIELD_INDEX, SERIES_FIELDS, TrafficTimeSeries
+
+CAPACITIES = {"second": 5, "minute": 3, "hour": 2}
+
+
+def _values(packets, volume, protocol="tcp"):
+    values = [0] * len(SERIES_FIELDS)
+    values[FIELD_INDEX["packets"]] = packets
+    values[FIELD_INDEX["bytes"]] = volume
+    values[FIELD_INDEX[protocol]] = packets
+    return values
+
+
+def test_seconds_roll_up_into_minutes_and_hours():
+    series = TrafficTimeSeries(CAPACITIES)
+    series.add_seconds({7198: _values(1, 100), 7199: _values(2, 200), 7200: _values(4, 400, "udp")})
+    minutes = series.series("minute")
+    assert minutes["timestamps"] == [7080, 7140, 7200]
+    assert minutes["packets"] == [0, 3, 4]
+    hours = series.series("hour")
+    assert hours["timestamps"] == [3600, 7200]
+    assert (hours["tcp"], hours["udp"]) == ([3, 0], [0, 4])
+
+
+def test_gaps_are_zero_and_rates_per_step():
+    series = TrafficTimeSeries(CAPACITIES)
+    series.add_seconds({100: _values(10, 1000), 103: _values(5, 500)})
+    seconds = series.series("second")
+    assert seconds["start"] == 99
+    assert seconds["packets"] == [0, 10, 0, 0, 5]
+    assert seconds["bps"][1] == 8000
+    assert series.series("second", points=2)["timestamps"] == [102, 103]
+
+
+def test_window_drops_old_buckets():
+    series = TrafficTimeSeries(CAPACITIES)
+    series.add_seconds({second: _values(1, 60) for second in range(100, 110)})
+    series.add_seconds({101: _values(1, 60)})  # Fuera de la ventana: se ignora
+    seconds = series.series("second")
+    assert seconds["timestamps"] == [105, 106, 107, 108, 109]
+    assert seconds["packets"] == [1] * 5
+    assert len(series._levels["second"]) == CAPACITIES["second"]
+
+
+def test_merge_and_scaled():
+    a, b = TrafficTimeSeries(CAPACITIES), TrafficTimeSeries(CAPACITIES)
+    a.add_seconds({100: _values(1, 100)})
+    b.add_seconds({100: _values(2, 200), 101: _values(3, 300)})
+    a.merge(b)
+    assert a.series("second")["packets"][-2:] == [3, 3]
+    scaled = a.scaled(10)
+    assert scaled.series("second")["packets"][-2:] == [30, 30]
+    # La original no cambia
+    assert a.series("second")["packets"][-2:] == [3, 3]
+
+
+def test_empty_series():
+    seconds = TrafficTimeSeries(CAPACITIES).series("second")
+    assert seconds["start"] is None
+    assert seconds["timestamps"] == seconds["packets"] == []
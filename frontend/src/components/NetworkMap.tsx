@@ -3,7 +3,7 @@ import { Network, DataSet, Options } from 'vis-network/standalone';
 import { MapContainer, TileLayer, CircleMarker, Popup, Polyline, useMap } from 'react-leaflet';
 import L from 'leaflet';
 import 'leaflet/dist/leaflet.css';
-import apiService, { NetworkMapData, NetworkMapNode } from '../services/api';
+import apiService, { NetworkMapData, NetworkMapLink, NetworkMapNode } from '../services/api';
 import './NetworkMap.css';
 
 // Fix para iconos de Leaflet
@@ -14,6 +14,18 @@ L.Icon.Default.mergeOptions({
   shadowUrl: 'https://unpkg.com/leaflet@1.9.4/dist/images/marker-shadow.png',
 });
 
+// Fusiona un delta del mapa (nodos por ID, enlaces por origen→destino) con el
+// grafo actual; con full (primera petición o sesión reseteada) lo sustituye
+const mergeNetworkMap = (current: NetworkMapData | null, delta: NetworkMapData): NetworkMapData => {
+  if (!current || delta.full) return delta;
+  const nodes = new Map(current.nodes.map(node => [node.id, node]));
+  delta.nodes.forEach(node => nodes.set(node.id, node));
+  const linkKey = (link: NetworkMapLink) => `${link.source}->${link.target}`;
+  const links = new Map(current.links.map(link => [linkKey(link), link]));
+  delta.links.forEach(link => links.set(linkKey(link), link));
+  return { ...delta, nodes: Array.from(nodes.values()), links: Array.from(links.values()) };
+};
+
 // Componente para ajustar los bounds del mapa
 const FitBounds: React.FC<{ positions: [number, number][] }> = ({ positions }) => {
   const map = useMap();
@@ -39,6 +51,8 @@ const NetworkMap: React.FC = () => {
   
   const networkRef = useRef<HTMLDivElement>(null);
   const networkInstance = useRef<Network | null>(null);
+  // Versión del grafo ya recibida: las siguientes peticiones solo traen lo cambiado
+  const versionRef = useRef<number | undefined>(undefined);
 
   // Obtener ubicación del usuario
   useEffect(() => {
@@ -60,8 +74,10 @@ const NetworkMap: React.FC = () => {
     try {
       if (showLoading) setLoading(true);
       setError(null);
-      const data = await apiService.getNetworkMap();
-      setMapData(data);
+      const data = await apiService.getNetworkMap(versionRef.current);
+      versionRef.current = data.version;
+      if (!data.full && data.nodes.length === 0 && data.links.length === 0) return;
+      setMapData(current => mergeNetworkMap(current, data));
     } catch (err) {
       setError('Error al cargar el mapa de red');
       console.error(err);
@@ -35,11 +35,15 @@ export interface StatsData {
 }
 
 export interface NetworkMapNode {
-  id: string;
+  id: number;
+  ip: string;
   label: string;
+  hostname?: string | null;
   isLocal: boolean;
   networkType: string;
   traffic: number;
+  packets: number;
+  bytes: number;
   geo?: {
     country: string;
     countryCode: string;
@@ -51,12 +55,18 @@ export interface NetworkMapNode {
 }
 
 export interface NetworkMapLink {
-  source: string;
-  target: string;
+  source: number;
+  target: number;
   value: number;
+  packets: number;
+  bytes: number;
 }
 
 export interface NetworkMapData {
+  version: number;
+  since: number | null;
+  full: boolean;
+  metric: 'packets' | 'bytes';
   nodes: NetworkMapNode[];
   links: NetworkMapLink[];
   summary: {
@@ -65,6 +75,8 @@ export interface NetworkMapData {
     external_nodes: number;
     total_links: number;
     total_connections: number;
+    total_bytes: number;
+    dropped_connections: number;
   };
 }
 
@@ -166,8 +178,10 @@ class ApiService {
 
   // ============ Network Map ============
 
-  async getNetworkMap(): Promise<NetworkMapData> {
-    const response = await axios.get<NetworkMapData>(`${API_BASE}/stats/network-map`);
+  async getNetworkMap(since?: number, metric: 'packets' | 'bytes' = 'packets'): Promise<NetworkMapData> {
+    const response = await axios.get<NetworkMapData>(`${API_BASE}/stats/network-map`, {
+      params: since !== undefined ? { since, metric } : { metric },
+    });
     return response.data;
   }
 }